@@ -0,0 +1,140 @@
+"""
+调试档案写入模块
+验证码图片、失败时的页面 HTML 与截图交给背景线程编码与写入；队列已满时直接丢弃，不阻塞选课流程，
+并依档案数量与总大小轮替删除最旧的档案
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+from metrics import count
+
+# 队列中的结束信号
+_STOP = object()
+
+
+class ArtifactWriter:
+    """背景调试档案写入器"""
+
+    def __init__(self, directory="artifacts", max_queue=32, max_files=200, max_bytes=50 * 1024 * 1024):
+        """
+        初始化写入器并启动背景线程
+
+        Args:
+            directory (str): 输出目录
+            max_queue (int): 队列上限，满了就丢弃新的档案
+            max_files (int): 目录中最多保留的档案数（0 表示不限）
+            max_bytes (int): 目录中最多保留的总大小（0 表示不限）
+        """
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.sequence = 0
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(directory, exist_ok=True)
+        # 已存在的档案（由旧到新）也纳入轮替
+        existing = sorted((entry.stat().st_mtime, entry.path, entry.stat().st_size)
+                          for entry in os.scandir(directory) if entry.is_file())
+        self.files = [(path, size) for _, path, size in existing]
+        self.total_bytes = sum(size for _, size in self.files)
+        self.thread = threading.Thread(target=self._loop, name="artifact-writer", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_config(cls, artifacts_config=None):
+        """
+        由 config.json 的 artifacts 区块建立
+
+        Args:
+            artifacts_config (dict, optional): artifacts 区块
+
+        Returns:
+            ArtifactWriter: 写入器，enabled 为 false 时返回None
+        """
+        artifacts_config = artifacts_config or {}
+        if not artifacts_config.get('enabled', True):
+            return None
+        return cls(artifacts_config.get('directory', 'artifacts'),
+                   artifacts_config.get('max_queue', 32),
+                   artifacts_config.get('max_files', 200),
+                   artifacts_config.get('max_bytes', 50 * 1024 * 1024))
+
+    def submit(self, kind, payload, extension):
+        """
+        把档案放进队列（不等待）
+
+        Args:
+            kind (str): 档案类型，用作档名前缀，例如 captcha、page
+            payload: bytes、str，或有 save(file, format) 方法的 PIL 图片（在背景线程编码）
+            extension (str): 副档名，例如 png、html
+
+        Returns:
+            bool: 已排入队列返回True，队列已满被丢弃返回False
+        """
+        self.sequence += 1
+        filename = f"{kind}_{time.strftime('%Y%m%d_%H%M%S')}_{self.sequence:04d}.{extension}"
+        try:
+            self.queue.put_nowait((filename, payload, extension))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            count("artifacts_dropped_total", kind=kind)
+            return False
+
+    def _write(self, filename, payload, extension):
+        path = os.path.join(self.directory, filename)
+        if isinstance(payload, str):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+        elif isinstance(payload, (bytes, bytearray)):
+            with open(path, 'wb') as f:
+                f.write(payload)
+        else:
+            payload.save(path, format=extension.upper())
+        size = os.path.getsize(path)
+        self.files.append((path, size))
+        self.total_bytes += size
+        self.written += 1
+        self._rotate()
+
+    def _rotate(self):
+        while self.files and ((self.max_files and len(self.files) > self.max_files)
+                              or (self.max_bytes and self.total_bytes > self.max_bytes)):
+            path, size = self.files.pop(0)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._write(*item)
+            except Exception as e:
+                self.logger.warning("寫入調試檔案失敗: %s", e)
+            finally:
+                self.queue.task_done()
+
+    def close(self, timeout=5):
+        """写完队列中剩余的档案后停止背景线程"""
+        if not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self.logger.warning("調試檔案佇列已滿，未寫完即結束")
+            return
+        self.thread.join(timeout)
+        if self.dropped:
+            self.logger.warning("佇列已滿而丟棄 %d 個調試檔案", self.dropped)
+        self.logger.info("已寫入 %d 個調試檔案到 %s", self.written, self.directory)
@@ -0,0 +1,179 @@
+"""
+端到端效能基准模块
+启动本地替身网站（可重放录制内容），以完整的机器人流程完成登入与选课，
+量测从启动到所有课程确认的时间，并按阶段拆分，全程离线
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+from captcha_solver import CaptchaSolver
+from course_bot import NCKUCourseBot
+from interaction import ExitCode
+from metrics import reset_metrics
+from standin_server import StandinCourseSite
+
+
+class ReplayCaptchaSolver(CaptchaSolver):
+    """以替身网站的已知答案取代 OpenAI 识别，可模拟 API 延迟"""
+
+    def __init__(self, answer_source, solve_latency=0.0):
+        """
+        初始化识别器（不建立 OpenAI 客户端）
+
+        Args:
+            answer_source (callable): 返回当前验证码答案
+            solve_latency (float): 模拟的识别耗时（秒）
+        """
+        self.answer_source = answer_source
+        self.solve_latency = solve_latency
+        self.model = "replay"
+        self.logger = logging.getLogger(__name__)
+
+    def solve_captcha(self, image, max_retries=3):
+        if self.solve_latency:
+            time.sleep(self.solve_latency)
+        return self.answer_source()
+
+
+def synthetic_courses(count):
+    """产生 count 门各有一个名额的课程"""
+    return [{"department_code": "M1", "course_number": f"{index + 1:03d}",
+             "course_name": f"基準測試課程 {index + 1}", "seats": 1} for index in range(count)]
+
+
+def run_benchmark(courses, recording=None, latency=0.0, solve_latency=0.0, overrides=None):
+    """
+    执行一次完整流程并量测
+
+    Args:
+        courses (list): 要选的课程
+        recording (str, optional): site_recorder 的录制目录
+        latency (float): 替身网站每个请求的延迟（秒）
+        solve_latency (float): 模拟的验证码识别耗时（秒）
+        overrides (dict, optional): 覆盖机器人配置（browser、selection、http_engine 等区块）
+
+    Returns:
+        dict: total_s、phases、waits、metrics、results、all_confirmed、server_requests
+    """
+    site = StandinCourseSite(courses=courses, latency=latency, recording=recording).start()
+    config = {
+        "course_selection_url": site.course_url,
+        "login_info": {"username": "benchmark", "password": "benchmark"},
+        "verification": {"auto_captcha": True},
+        "browser": {"profile": "lean"},
+        "session": {"persist": False},
+        "interaction": {"mode": "fail"},
+        "courses": [{key: course[key] for key in ("department_code", "course_number", "course_name")}
+                    for course in courses],
+    }
+    config.update(overrides or {})
+
+    phases = {}
+    results = {}
+    run_metrics = reset_metrics()
+    bot = NCKUCourseBot(config=config, log_file="benchmark.log")
+    bot.captcha_solver = ReplayCaptchaSolver(lambda: site.expected_answer, solve_latency)
+
+    def timed(name, func):
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            phases[name] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        timed("browser_start", bot.setup_driver)
+        if timed("login", bot.auto_login):
+            timed("course_check", bot.check_all_courses)
+            results = timed("selection", bot.select_all_courses) or {}
+        total = time.perf_counter() - started
+        waits = defaultdict(float)
+        for item in bot.waiter.timings:
+            waits[item["name"].split(":")[0]] += item["elapsed"]
+    finally:
+        bot.close()
+        site.stop()
+
+    return {
+        "total_s": round(total, 3),
+        "phases": {name: round(elapsed, 3) for name, elapsed in phases.items()},
+        "waits": {name: round(elapsed, 3) for name, elapsed in waits.items()},
+        "metrics": run_metrics.summary(),
+        "results": results,
+        "all_confirmed": bool(results) and all(results.values()),
+        "server_requests": len(site.requests),
+    }
+
+
+def confirm_ms(run):
+    """一次执行中每次送出（填入验证码并点击确认）的平均耗时（毫秒）"""
+    confirm = run["metrics"]["phases"].get("confirm")
+    return confirm["total_s"] / confirm["count"] * 1000 if confirm else 0.0
+
+
+def summarize(runs):
+    """各阶段耗时的中位数"""
+    names = {name for run in runs for name in run["phases"]}
+    return {
+        "runs": len(runs),
+        "total_s_median": round(statistics.median(run["total_s"] for run in runs), 3),
+        "phases_median": {name: round(statistics.median(run["phases"].get(name, 0) for run in runs), 3)
+                          for name in sorted(names)},
+        "confirm_ms_median": round(statistics.median(confirm_ms(run) for run in runs), 1),
+        "all_confirmed": all(run["all_confirmed"] for run in runs),
+    }
+
+
+def main(argv=None):
+    """
+    命令列入口
+
+    Returns:
+        ExitCode: 所有执行都确认选上为 OK，否则为 PARTIAL
+    """
+    parser = argparse.ArgumentParser(description="離線端到端選課基準測試")
+    parser.add_argument("--courses", type=int, default=3, help="合成課程數量（未提供 --config 時使用）")
+    parser.add_argument("--config", help="從此設定檔讀取 courses 與 browser/selection/http_engine 區塊")
+    parser.add_argument("--recording", help="重放 site_recorder 錄製的目錄")
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的伺服器延遲（秒）")
+    parser.add_argument("--solve-latency", type=float, default=0.0, help="模擬驗證碼識別耗時（秒）")
+    parser.add_argument("--submit-mode", choices=("script", "webdriver"), default="script",
+                        help="驗證碼送出方式：script（一次腳本呼叫）或 webdriver（逐一命令，舊做法）")
+    parser.add_argument("--login-mode", choices=("pipelined", "sequential"), default="pipelined",
+                        help="登入方式：pipelined（識別驗證碼同時填寫帳號密碼）或 sequential（識別完才填寫，舊做法）")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    courses = synthetic_courses(args.courses)
+    overrides = {}
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            base_config = json.load(f)
+        courses = [dict(course, seats=1) for course in base_config.get("courses", [])]
+        overrides = {key: base_config[key] for key in ("browser", "selection", "http_engine", "retry")
+                     if key in base_config}
+    overrides["verification"] = {"auto_captcha": True, "submit_mode": args.submit_mode, "login_mode": args.login_mode}
+
+    runs = []
+    for index in range(args.runs):
+        run = run_benchmark(courses, args.recording, args.latency, args.solve_latency, overrides)
+        print(f"第 {index + 1} 次: 總耗時 {run['total_s']} 秒，階段 {run['phases']}，全部確認 {run['all_confirmed']}")
+        runs.append(run)
+
+    report = {"summary": dict(summarize(runs), submit_mode=args.submit_mode, login_mode=args.login_mode), "runs": runs}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report["summary"], ensure_ascii=False, indent=2))
+    return ExitCode.OK if report["summary"]["all_confirmed"] else ExitCode.PARTIAL
+
+
+if __name__ == "__main__":
+    sys.exit(main())
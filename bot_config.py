@@ -0,0 +1,485 @@
+"""
+配置编译模块
+载入 config.json 时一次性依结构检查所有字段，编译为不可变的配置对象（课程预先算好索引键与转义后的 XPath），
+并支持在长时间监控期间从磁盘热重载，不需重新启动浏览器
+"""
+
+import copy
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+
+from log_setup import LEVELS
+
+NUMBER = (int, float)
+
+# 各区块已知字段与类型；未列出的字段只会警告，不会阻止执行
+SECTION_SCHEMA = {
+    "login_info": {"username": str, "password": str},
+    "openai_config": {"api_key": str, "model": str, "max_tokens": int, "max_completion_tokens": int,
+                      "temperature": NUMBER},
+    "verification": {"wait_time": NUMBER, "max_retries": int, "auto_captcha": bool, "captcha_retry_count": int,
+                     "submit_mode": str, "login_mode": str},
+    "session": {"persist": bool, "cookie_file": str, "max_age": NUMBER, "watchdog_interval": NUMBER,
+                "profile_dir": str},
+    "logging": {"level": str},
+    "browser": {"profile": str, "headless": bool, "page_load_strategy": str, "window_size": str,
+                "block_resources": bool, "block_url_patterns": list},
+    "schedule": {"opening_time": str, "clock_samples": int, "spin_window_ms": NUMBER, "prearm_seconds": NUMBER},
+    "pool": {"enabled": bool, "size": int, "warmup_lead_seconds": NUMBER, "keepalive_interval": NUMBER,
+             "acquire_timeout": NUMBER},
+    "selection": {"concurrent_tabs": bool},
+    "watch": {"enabled": bool, "interval": NUMBER, "fast_interval": NUMBER, "release_times": list,
+              "fast_window_seconds": NUMBER, "max_backoff": NUMBER, "max_duration": NUMBER},
+    "retry": {"max_attempts": int, "base_backoff": NUMBER, "max_backoff": NUMBER},
+    "recording": {"enabled": bool, "directory": str},
+    "metrics": {"enabled": bool, "directory": str},
+    "artifacts": {"enabled": bool, "directory": str, "max_queue": int, "max_files": int, "max_bytes": int,
+                  "page_on_failure": bool, "screenshot_on_failure": bool},
+    "interaction": {"mode": str, "timeout": NUMBER, "notify_url": str},
+    "http_engine": {"enabled": bool, "timeout": NUMBER, "captcha_url": str, "add_course_url": str,
+                    "captcha_field": str, "course_fields": dict, "pool_size": int},
+}
+
+# 限定取值的字段（browser.profile 与 browser_profiles.PROFILES 一致）
+CHOICES = {
+    ("logging", "level"): tuple(LEVELS),
+    ("browser", "profile"): ("standard", "lean"),
+    ("browser", "page_load_strategy"): ("normal", "eager", "none"),
+    ("interaction", "mode"): ("auto", "interactive", "fail", "timeout", "notify"),
+    ("verification", "submit_mode"): ("script", "webdriver"),
+    ("verification", "login_mode"): ("pipelined", "sequential"),
+}
+
+# 时间字段（ISO 格式，与 start_scheduler.parse_opening_time 相同）
+TIME_FIELDS = {("schedule", "opening_time")}
+
+COURSE_SCHEMA = {"department_code": str, "course_number": str, "course_name": str,
+                 "priority": int, "max_attempts": int, "deadline": str}
+REQUIRED_COURSE_FIELDS = ("department_code", "course_number", "course_name")
+# CourseSpec.to_dict 附加的字段；再次编译时忽略并重新计算
+DERIVED_COURSE_FIELDS = ("key", "label", "name_xpath", "code_xpath")
+
+DEPARTMENT_CODE_PATTERN = re.compile(r"^[A-Z][A-Z0-9]$")
+COURSE_NUMBER_PATTERN = re.compile(r"^\d{3}$")
+
+# 重载后不需重新启动浏览器即可生效的区块
+RELOADABLE_SECTIONS = {"courses", "watch", "retry", "selection", "verification", "http_engine", "metrics"}
+
+
+class ConfigError(ValueError):
+    """配置内容不合法"""
+
+    def __init__(self, problems, source=None):
+        self.problems = list(problems)
+        self.source = source
+        prefix = f"{source}: " if source else ""
+        super().__init__(prefix + "；".join(self.problems))
+
+
+def xpath_literal(text):
+    """
+    把任意文字转为 XPath 字串常量（同时含单引号与双引号时使用 concat）
+
+    Args:
+        text (str): 原始文字
+
+    Returns:
+        str: 可直接嵌入 XPath 的常量
+    """
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    parts = text.split("'")
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in parts) + ")"
+
+
+def _is_type(value, expected):
+    # bool 是 int 的子类，数字字段不接受 true/false
+    if isinstance(value, bool) and expected is not bool:
+        return False
+    return isinstance(value, expected)
+
+
+def _type_name(expected):
+    if expected is NUMBER:
+        return "數字"
+    return {str: "字串", bool: "布林值", int: "整數", list: "陣列", dict: "物件"}.get(expected, expected.__name__)
+
+
+def _valid_time(value):
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def validate_config(raw):
+    """
+    依结构检查配置
+
+    Args:
+        raw (dict): config.json 的内容
+
+    Returns:
+        tuple: (errors, warnings)，皆为问题描述列表
+    """
+    errors = []
+    warnings = []
+    if not isinstance(raw, dict):
+        return ["設定檔最外層必須是物件"], warnings
+
+    if not isinstance(raw.get("course_selection_url"), str) or not raw.get("course_selection_url"):
+        errors.append("缺少 course_selection_url")
+    login_info = raw.get("login_info") if isinstance(raw.get("login_info"), dict) else {}
+    if not login_info.get("username") or not login_info.get("password"):
+        errors.append("login_info 缺少 username 或 password")
+
+    for name, value in raw.items():
+        if name in ("course_selection_url", "courses"):
+            continue
+        schema = SECTION_SCHEMA.get(name)
+        if schema is None:
+            warnings.append(f"未知的設定區塊 {name}")
+            continue
+        if not isinstance(value, dict):
+            errors.append(f"{name} 必須是物件")
+            continue
+        for key, item in value.items():
+            expected = schema.get(key)
+            if expected is None:
+                warnings.append(f"未知的設定欄位 {name}.{key}")
+            elif not _is_type(item, expected):
+                errors.append(f"{name}.{key} 必須是{_type_name(expected)}")
+            elif (name, key) in CHOICES and item not in CHOICES[(name, key)]:
+                errors.append(f"{name}.{key} 只能是 {' / '.join(CHOICES[(name, key)])}")
+            elif (name, key) in TIME_FIELDS and item and not _valid_time(item):
+                errors.append(f"{name}.{key} 不是有效的時間: {item}")
+    watch_config = raw.get("watch") if isinstance(raw.get("watch"), dict) else {}
+    release_times = watch_config.get("release_times") if isinstance(watch_config.get("release_times"), list) else []
+    for index, value in enumerate(release_times, 1):
+        if not _valid_time(value):
+            errors.append(f"watch.release_times 第 {index} 項不是有效的時間: {value}")
+
+    http_config = raw.get("http_engine") if isinstance(raw.get("http_engine"), dict) else {}
+    course_fields = http_config.get("course_fields")
+    extra_course_fields = set(course_fields) if isinstance(course_fields, dict) else set()
+    courses = raw.get("courses")
+    if not courses:
+        errors.append("沒有設定任何課程 (courses)")
+    elif not isinstance(courses, list):
+        errors.append("courses 必須是陣列")
+        courses = []
+    seen = {}
+    for index, course in enumerate(courses or [], 1):
+        if not isinstance(course, dict):
+            errors.append(f"第 {index} 門課程必須是物件")
+            continue
+        missing = [name for name in REQUIRED_COURSE_FIELDS if not course.get(name)]
+        if missing:
+            errors.append(f"第 {index} 門課程缺少 {', '.join(missing)}")
+        for key, item in course.items():
+            expected = COURSE_SCHEMA.get(key)
+            if expected is None:
+                # http_engine.course_fields 可引用自订的课程字段
+                if key not in extra_course_fields and key not in DERIVED_COURSE_FIELDS:
+                    errors.append(f"第 {index} 門課程有未知欄位 {key}")
+            elif not _is_type(item, expected):
+                errors.append(f"第 {index} 門課程的 {key} 必須是{_type_name(expected)}")
+        department_code = course.get("department_code")
+        course_number = course.get("course_number")
+        if (isinstance(department_code, str) and department_code
+                and not DEPARTMENT_CODE_PATTERN.match(department_code.strip().upper())):
+            errors.append(f"第 {index} 門課程的 department_code 格式不正確: {department_code}")
+        if (isinstance(course_number, str) and course_number
+                and not COURSE_NUMBER_PATTERN.match(course_number.strip())):
+            errors.append(f"第 {index} 門課程的 course_number 應為三位數字: {course_number}")
+        if isinstance(course.get("deadline"), str) and not _valid_time(course["deadline"]):
+            errors.append(f"第 {index} 門課程的 deadline 不是有效的時間: {course['deadline']}")
+        if isinstance(department_code, str) and isinstance(course_number, str):
+            key = course_key(department_code, course_number)
+            if key in seen:
+                errors.append(f"第 {index} 門課程與第 {seen[key]} 門重複 ({department_code}-{course_number})")
+            seen.setdefault(key, index)
+    return errors, warnings
+
+
+def validate_accounts(accounts):
+    """
+    检查多帐号设定（fleet.py 的帐号档）
+
+    Args:
+        accounts (list): 帐号设定，未提供 name 时以 account<序号> 命名
+
+    Returns:
+        list: 问题描述列表（名称重复会使结果与登入状态档互相覆盖）
+    """
+    if not isinstance(accounts, list):
+        return ["帳號設定檔必須是陣列"]
+    errors = []
+    seen = {}
+    for index, account in enumerate(accounts, 1):
+        if not isinstance(account, dict):
+            errors.append(f"第 {index} 個帳號必須是物件")
+            continue
+        name = account.get("name") or f"account{index}"
+        if not isinstance(name, str):
+            errors.append(f"第 {index} 個帳號的 name 必須是字串")
+            continue
+        if name in seen:
+            errors.append(f"第 {index} 個帳號與第 {seen[name]} 個帳號名稱重複 ({name})")
+        seen.setdefault(name, index)
+    return errors
+
+
+def course_key(department_code, course_number):
+    """
+    课程索引键（与 CourseTable.make_key 相同）
+
+    Args:
+        department_code (str): 系所代码，例如 'M1'
+        course_number (str): 课程编号，例如 '023'
+
+    Returns:
+        str: 例如 'M1023'
+    """
+    return f"{(department_code or '').strip().upper()}{(course_number or '').strip()}"
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class CourseSpec:
+    """编译后的课程（不可变）"""
+
+    department_code: str
+    course_number: str
+    course_name: str
+    priority: int = 0
+    max_attempts: int = None
+    deadline: str = None
+    extra: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    key: str = ""
+    label: str = ""
+    name_xpath: str = ""
+    code_xpath: str = ""
+
+    @classmethod
+    def from_dict(cls, course):
+        """由已通过检查的课程字段建立，并预先算好索引键与 XPath"""
+        department_code = course["department_code"].strip().upper()
+        course_number = course["course_number"].strip()
+        course_name = course["course_name"].strip()
+        extra = {key: value for key, value in course.items()
+                 if key not in COURSE_SCHEMA and key not in DERIVED_COURSE_FIELDS}
+        return cls(
+            department_code=department_code,
+            course_number=course_number,
+            course_name=course_name,
+            priority=course.get("priority", 0),
+            max_attempts=course.get("max_attempts"),
+            deadline=course.get("deadline"),
+            extra=_freeze(extra),
+            key=course_key(department_code, course_number),
+            label=f"{department_code}-{course_number}",
+            name_xpath=f"//td[contains(text(), {xpath_literal(course_name)})]",
+            code_xpath=(f"//td[contains(text(), {xpath_literal(department_code)}) "
+                        f"and contains(text(), {xpath_literal(course_number)})]"),
+        )
+
+    def to_dict(self):
+        """
+        建立选课流程使用的课程字典（每次返回新的字典，流程中可附加按钮等执行期状态）
+
+        Returns:
+            dict: 原有字段加上 key、label、name_xpath、code_xpath
+        """
+        course = {"department_code": self.department_code, "course_number": self.course_number,
+                  "course_name": self.course_name}
+        if self.priority:
+            course["priority"] = self.priority
+        if self.max_attempts is not None:
+            course["max_attempts"] = self.max_attempts
+        if self.deadline:
+            course["deadline"] = self.deadline
+        course.update(_thaw(self.extra))
+        course.update(key=self.key, label=self.label, name_xpath=self.name_xpath, code_xpath=self.code_xpath)
+        return course
+
+
+@dataclass(frozen=True)
+class BotConfig:
+    """编译后的完整配置（不可变）"""
+
+    course_selection_url: str
+    courses: tuple
+    sections: MappingProxyType
+    source: str = None
+    mtime: float = None
+
+    def section(self, name):
+        """
+        读取区块（不存在时返回空映射）
+
+        Args:
+            name (str): 区块名称，例如 'watch'
+
+        Returns:
+            Mapping: 只读的区块内容
+        """
+        return self.sections.get(name, MappingProxyType({}))
+
+    def to_dict(self):
+        """
+        转为选课流程使用的一般字典（与原 config.json 结构相同，课程附带预先算好的字段）
+
+        Returns:
+            dict: 配置
+        """
+        config = {"course_selection_url": self.course_selection_url}
+        config.update(_thaw(self.sections))
+        config["courses"] = [course.to_dict() for course in self.courses]
+        return config
+
+    def changed_sections(self, other):
+        """
+        与另一份配置相比有变化的区块
+
+        Args:
+            other (BotConfig): 旧配置
+
+        Returns:
+            set: 区块名称（课程变化以 'courses' 表示）
+        """
+        changed = {name for name in set(self.sections) | set(other.sections)
+                   if self.sections.get(name) != other.sections.get(name)}
+        if self.courses != other.courses:
+            changed.add("courses")
+        if self.course_selection_url != other.course_selection_url:
+            changed.add("course_selection_url")
+        return changed
+
+
+def compile_config(raw, source=None, mtime=None):
+    """
+    检查并编译配置
+
+    Args:
+        raw (dict): config.json 的内容
+        source (str, optional): 设定档路径（用于错误讯息与重载）
+        mtime (float, optional): 设定档的修改时间
+
+    Returns:
+        BotConfig: 编译后的配置
+
+    Raises:
+        ConfigError: 配置不合法
+    """
+    errors, warnings = validate_config(raw)
+    if errors:
+        raise ConfigError(errors, source)
+    for warning in warnings:
+        logging.warning("設定檔%s: %s", f" {source}" if source else "", warning)
+    sections = {name: copy.deepcopy(value) for name, value in raw.items()
+                if name not in ("course_selection_url", "courses")}
+    return BotConfig(
+        course_selection_url=raw["course_selection_url"],
+        courses=tuple(CourseSpec.from_dict(course) for course in raw["courses"]),
+        sections=_freeze(sections),
+        source=source,
+        mtime=mtime,
+    )
+
+
+def load_config_file(path):
+    """
+    读取并编译设定档
+
+    Args:
+        path (str): 设定档路径
+
+    Returns:
+        BotConfig: 编译后的配置
+
+    Raises:
+        ConfigError: 无法读取、不是合法 JSON 或内容不合法
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except ValueError as e:
+        raise ConfigError([f"JSON 格式錯誤: {e}"], path) from e
+    except OSError as e:
+        raise ConfigError([f"無法讀取: {e}"], path) from e
+    return compile_config(raw, source=path, mtime=mtime)
+
+
+class ConfigReloader:
+    """设定档修改时重新载入（编译失败时保留目前的配置）"""
+
+    def __init__(self, config):
+        """
+        初始化重载器
+
+        Args:
+            config (BotConfig): 目前的配置（需由 load_config_file 载入，带有 source 与 mtime）
+        """
+        self.current = config
+        self.logger = logging.getLogger(__name__)
+
+    def poll(self):
+        """
+        检查设定档是否修改
+
+        Returns:
+            BotConfig: 修改且合法时返回新配置，否则返回None
+        """
+        path = self.current.source
+        if not path:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if mtime == self.current.mtime:
+            return None
+        try:
+            config = load_config_file(path)
+        except ConfigError as e:
+            self.logger.warning("設定檔已修改但內容不合法，沿用目前的設定: %s", e)
+            # 记录这次的修改时间，避免每次轮询重复警告
+            self.current = BotConfig(self.current.course_selection_url, self.current.courses,
+                                     self.current.sections, path, mtime)
+            return None
+        changed = config.changed_sections(self.current)
+        restart_needed = changed - RELOADABLE_SECTIONS
+        if restart_needed:
+            self.logger.warning("以下設定需重新啟動才會生效，本次執行沿用原設定: %s", ", ".join(sorted(restart_needed)))
+        # 只套用可重载的区块，浏览器、登入等设定维持启动时的值
+        sections = {name: value for name, value in self.current.sections.items() if name not in RELOADABLE_SECTIONS}
+        sections.update({name: value for name, value in config.sections.items() if name in RELOADABLE_SECTIONS})
+        self.current = BotConfig(self.current.course_selection_url, config.courses,
+                                 MappingProxyType(sections), path, mtime)
+        self.logger.info("已重新載入設定檔 %s（變更: %s）", path, ", ".join(sorted(changed)) or "無")
+        return self.current
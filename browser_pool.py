@@ -0,0 +1,239 @@
+"""
+预热浏览器池模块
+在开放时间前启动浏览器、完成登入并停在选课页面，定期保持 session 活跃；
+开放时所有预热的浏览器各自负责一部分课程并行选课
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from interaction import HumanInputRequired
+from start_scheduler import PrecisionScheduler, ServerClock, parse_opening_time
+
+# 在页面内发出轻量请求：不跟随重定向，被导回登入页即视为 session 过期
+KEEPALIVE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+fetch(window.location.href, {method: 'HEAD', credentials: 'same-origin', redirect: 'manual', cache: 'no-store'})
+    .then(function (r) { done(r.type === 'opaqueredirect' ? 'expired' : r.status); })
+    .catch(function (e) { done('error: ' + e); });
+"""
+
+
+class BrowserPool:
+    """已登入浏览器的预热池"""
+
+    def __init__(self, bot_factory, size=1, keepalive_interval=60):
+        """
+        初始化浏览器池
+
+        Args:
+            bot_factory (callable): 返回新 NCKUCourseBot 实例的函数
+            size (int): 预热的浏览器数量
+            keepalive_interval (float): 保持 session 活跃的间隔（秒）
+        """
+        self.bot_factory = bot_factory
+        self.size = size
+        self.keepalive_interval = keepalive_interval
+        self.bots = []
+        self.lock = threading.Lock()
+        # 选课与保持活跃共用：同一时间只有一方操作浏览器（WebDriver 不是线程安全的）
+        self.busy = threading.Lock()
+        self.stop_event = threading.Event()
+        self.keepalive_thread = None
+        self.logger = logging.getLogger(__name__)
+
+    def _warm_one(self, index):
+        """启动一个浏览器并完成登入"""
+        started = time.perf_counter()
+        bot = self.bot_factory()
+        session_config = bot.config.get('session', {})
+        if self.size > 1 and session_config.get('profile_dir'):
+            # 同一个使用者资料目录只能被一个 Chrome 使用：每个浏览器各自一个目录
+            bot.config['session'] = dict(session_config, profile_dir=f"{session_config['profile_dir']}_{index}")
+        try:
+            bot.setup_driver()
+            if not bot.restore_session():
+                bot.driver.get(bot.config['course_selection_url'])
+            if not bot.check_login_status() and not bot.auto_login():
+                self.logger.error("預熱瀏覽器 #%s 登入失敗", index)
+                bot.close()
+                return
+            with self.lock:
+                self.bots.append(bot)
+            self.logger.info("✅ 預熱瀏覽器 #%s 就緒，耗時 %.1f 秒", index, time.perf_counter() - started)
+        except Exception as e:
+            self.logger.error("預熱瀏覽器 #%s 時發生錯誤: %s", index, e)
+            bot.close()
+
+    def warm_up(self):
+        """并行启动所有浏览器并登入，完成后开始保持活跃"""
+        threads = [threading.Thread(target=self._warm_one, args=(i,), daemon=True) for i in range(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.logger.info("瀏覽器池預熱完成: %s/%s 個可用", len(self.bots), self.size)
+        if self.keepalive_thread is None:
+            self.keepalive_thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+            self.keepalive_thread.start()
+        return len(self.bots)
+
+    def warm_up_before(self, opening_time, lead_seconds=300):
+        """
+        等到开放时间前 lead_seconds 秒再开始预热
+
+        Args:
+            opening_time (float): 开放时间（Unix 时间戳）
+            lead_seconds (float): 提前预热的秒数
+        """
+        delay = opening_time - lead_seconds - time.time()
+        if delay > 0:
+            self.logger.info("將於 %.0f 秒後開始預熱瀏覽器", delay)
+            if self.stop_event.wait(delay):
+                return 0
+        return self.warm_up()
+
+    def _keepalive_loop(self):
+        """定期对闲置的浏览器发出轻量请求，过期则重新登入（持有 busy，不与选课同时操作浏览器）"""
+        while not self.stop_event.wait(self.keepalive_interval):
+            if not self.busy.acquire(blocking=False):
+                # 选课进行中
+                continue
+            try:
+                if self.stop_event.is_set():
+                    return
+                with self.lock:
+                    bots = list(self.bots)
+                for bot in bots:
+                    try:
+                        status = bot.driver.execute_async_script(KEEPALIVE_SCRIPT)
+                        if status == 'expired':
+                            self.logger.warning("預熱瀏覽器 session 已過期，重新登入...")
+                            bot.auto_login()
+                        else:
+                            self.logger.debug("保持活躍: %s", status)
+                    except Exception as e:
+                        self.logger.warning("保持活躍時發生錯誤: %s", e)
+            finally:
+                self.busy.release()
+
+    def acquire(self, timeout=None):
+        """
+        取得所有已登入并停在选课页面的机器人（持有 busy 直到 release）
+
+        Args:
+            timeout (float, optional): 等待保持活跃完成的最长时间（秒）
+
+        Returns:
+            list: 可直接选课的机器人，逾时或没有可用的浏览器返回空列表
+        """
+        if not self.busy.acquire(timeout=-1 if timeout is None else timeout):
+            self.logger.error("等待保持活躍完成逾時")
+            return []
+        with self.lock:
+            bots = list(self.bots)
+        if not bots:
+            self.busy.release()
+            self.logger.error("瀏覽器池沒有可用的瀏覽器")
+            return []
+        self.logger.info("已從瀏覽器池取得 %s 個就緒的瀏覽器", len(bots))
+        return bots
+
+    def release(self):
+        """选课结束，交还浏览器"""
+        self.busy.release()
+
+    def shutdown(self):
+        """停止保持活跃并关闭所有浏览器"""
+        self.stop_event.set()
+        with self.busy, self.lock:
+            for bot in self.bots:
+                bot.close()
+            self.bots = []
+
+
+def split_courses(courses, count):
+    """
+    把课程依配置顺序轮流分给 count 个浏览器
+
+    Args:
+        courses (list): 配置中的课程
+        count (int): 浏览器数量
+
+    Returns:
+        list: 每个浏览器负责的课程列表（不含空列表）
+    """
+    shares = [courses[index::count] for index in range(count)]
+    return [share for share in shares if share]
+
+
+def select_with_bots(bots, courses):
+    """
+    每个浏览器负责一部分课程并行选课（各自独立的 WebDriver）
+
+    Args:
+        bots (list): 已登入的机器人
+        courses (list): 配置中的课程
+
+    Returns:
+        dict: 'department_code-course_number' -> 是否成功
+    """
+    shares = split_courses(courses, len(bots))
+    for bot, share in zip(bots, shares):
+        bot.config['courses'] = share
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(shares)) as executor:
+        futures = [executor.submit(bot.select_at_opening) for bot in bots[:len(shares)]]
+        for future, share in zip(futures, shares):
+            try:
+                results.update(future.result() or {})
+            except HumanInputRequired:
+                raise
+            except Exception as e:
+                logging.error("預熱瀏覽器選課時發生錯誤: %s", e)
+                results.update({f"{c['department_code']}-{c['course_number']}": False for c in share})
+    return results
+
+
+def run_with_pool(bot_factory, config):
+    """
+    以预热浏览器池执行选课：开放时间前预热，开放时立即选课
+
+    Args:
+        bot_factory (callable): 返回新 NCKUCourseBot 实例的函数
+        config (dict): 机器人配置（使用 schedule 与 pool 区块）
+
+    Returns:
+        dict: 选课结果，没有执行选课（预热失败或取不到浏览器）返回None
+    """
+    pool_config = config.get('pool', {})
+    schedule_config = config['schedule']
+    opening_time = parse_opening_time(schedule_config['opening_time'])
+    courses = config.get('courses', [])
+    # 每个浏览器至少负责一门课程；多余的浏览器只会增加登入次数与被踢出的风险
+    size = max(1, min(pool_config.get('size', 1), len(courses)))
+    if size < pool_config.get('size', 1):
+        logging.info("瀏覽器池大小調整為課程數 %s", size)
+    pool = BrowserPool(bot_factory, size, pool_config.get('keepalive_interval', 60))
+    try:
+        if not pool.warm_up_before(opening_time, pool_config.get('warmup_lead_seconds', 300)):
+            return None
+
+        # 以伺服器時間為準：開放前幾秒取出瀏覽器，T0 準時觸發
+        clock = ServerClock(config['course_selection_url'], samples=schedule_config.get('clock_samples', 8))
+        clock.estimate()
+        scheduler = PrecisionScheduler(clock, schedule_config.get('spin_window_ms', 20) / 1000)
+        logging.info("瀏覽器已就緒，等待開放時間...")
+        scheduler.sleep_until(opening_time - 2)
+
+        bots = pool.acquire(timeout=pool_config.get('acquire_timeout', 30))
+        if not bots:
+            return None
+        try:
+            return scheduler.fire_at(opening_time, select_with_bots, bots, courses) or {}
+        finally:
+            pool.release()
+    finally:
+        pool.shutdown()
@@ -0,0 +1,237 @@
+"""
+浏览器效能配置模块
+提供 standard / lean 两种浏览器配置，并量测页面就绪时间与内存占用
+"""
+
+import json
+import logging
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from network_results import enable_performance_logging
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# 预设配置：standard 为原本的完整浏览器，lean 为无头 + eager + 阻挡非必要资源
+PROFILES = {
+    "standard": {
+        "headless": False,
+        "page_load_strategy": "normal",
+        "window_size": "1920,1080",
+        "block_resources": False,
+    },
+    "lean": {
+        "headless": True,
+        "page_load_strategy": "eager",
+        "window_size": "1280,800",
+        "block_resources": True,
+    },
+}
+
+# 默认阻挡的资源（字体、图示、追踪脚本）
+# 样式表不阻挡：Bootstrap 的 CSS 负责隐藏 .modal，少了它所有弹窗都会被判定为可见
+DEFAULT_BLOCK_PATTERNS = [
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.eot",
+    "*.svg",
+    "*.ico",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+]
+
+# 必须放行的资源关键字：验证码图片、页面脚本与样式表
+ESSENTIAL_KEYWORDS = ["captcha", "verifycode", ".js", ".css"]
+
+# 验证码端点可能使用的图片副档名；含这些副档名的规则可能挡到验证码，一律忽略
+CAPTCHA_IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".gif", ".png", ".bmp", ".webp"]
+
+
+def resolve_profile(browser_config=None):
+    """
+    合并预设配置与使用者配置
+
+    Args:
+        browser_config (dict, optional): config.json 中的 browser 区块
+
+    Returns:
+        dict: 最终使用的浏览器配置
+    """
+    browser_config = browser_config or {}
+    name = browser_config.get("profile", "standard")
+    if name not in PROFILES:
+        logging.warning("未知的瀏覽器配置 %s，改用 standard", name)
+        name = "standard"
+    profile = dict(PROFILES[name])
+    profile["name"] = name
+    for key in ("headless", "page_load_strategy", "window_size", "block_resources"):
+        if key in browser_config:
+            profile[key] = browser_config[key]
+    profile["block_url_patterns"] = filter_block_patterns(
+        browser_config.get("block_url_patterns", DEFAULT_BLOCK_PATTERNS)
+    )
+    return profile
+
+
+def filter_block_patterns(patterns):
+    """
+    移除可能挡到验证码图片、页面脚本或样式表的阻挡规则（包括所有点阵图片副档名的规则）
+
+    Args:
+        patterns (list): URL 阻挡规则（支持 * 通配符）
+
+    Returns:
+        list: 过滤后的规则
+    """
+    safe_patterns = []
+    for pattern in patterns:
+        stripped = pattern.strip("*")
+        lowered = pattern.lower()
+        if (not stripped or any(keyword in lowered for keyword in ESSENTIAL_KEYWORDS)
+                or any(extension in lowered for extension in CAPTCHA_IMAGE_EXTENSIONS)):
+            logging.warning("忽略會阻擋必要資源的規則: %s", pattern)
+            continue
+        safe_patterns.append(pattern)
+    return safe_patterns
+
+
+def build_chrome_options(profile):
+    """
+    根据配置建立 Chrome 选项
+
+    Args:
+        profile (dict): resolve_profile 返回的配置
+
+    Returns:
+        Options: Chrome 选项
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+    chrome_options.add_argument(f"--window-size={profile['window_size']}")
+    chrome_options.page_load_strategy = profile["page_load_strategy"]
+    # 以 performance 日志读取加选回应
+    enable_performance_logging(chrome_options)
+
+    if profile.get("user_data_dir"):
+        # 使用固定的使用者資料目錄，瀏覽器重新啟動後仍保有登入狀態
+        chrome_options.add_argument(f"--user-data-dir={profile['user_data_dir']}")
+    if profile["headless"]:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--disable-gpu")
+    if profile["block_resources"]:
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+
+    return chrome_options
+
+
+def apply_resource_blocking(driver, profile):
+    """
+    通过 DevTools 阻挡非必要资源
+
+    Args:
+        driver: Selenium WebDriver实例
+        profile (dict): resolve_profile 返回的配置
+
+    Returns:
+        bool: 是否成功套用
+    """
+    if not profile["block_resources"] or not profile["block_url_patterns"]:
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": profile["block_url_patterns"]})
+        logging.info("已阻擋 %s 類非必要資源", len(profile['block_url_patterns']))
+        return True
+    except Exception as e:
+        logging.warning("無法套用資源阻擋: %s", e)
+        return False
+
+
+def collect_page_metrics(driver):
+    """
+    收集当前页面的就绪时间与内存占用
+
+    Args:
+        driver: Selenium WebDriver实例
+
+    Returns:
+        dict: dom_content_loaded_ms, load_ms, js_heap_used_mb, js_heap_total_mb, nodes
+    """
+    metrics = {}
+    try:
+        timing = driver.execute_script(
+            "var nav = performance.getEntriesByType('navigation')[0];"
+            "return nav ? {dcl: nav.domContentLoadedEventEnd, load: nav.loadEventEnd} : null;"
+        )
+        if timing:
+            metrics["dom_content_loaded_ms"] = round(timing["dcl"], 1)
+            metrics["load_ms"] = round(timing["load"], 1)
+    except Exception as e:
+        logging.warning("無法取得頁面載入時間: %s", e)
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        raw = driver.execute_cdp_cmd("Performance.getMetrics", {})
+        values = {item["name"]: item["value"] for item in raw.get("metrics", [])}
+        metrics["js_heap_used_mb"] = round(values.get("JSHeapUsedSize", 0) / 1048576, 2)
+        metrics["js_heap_total_mb"] = round(values.get("JSHeapTotalSize", 0) / 1048576, 2)
+        metrics["nodes"] = int(values.get("Nodes", 0))
+    except Exception as e:
+        logging.warning("無法取得記憶體資訊: %s", e)
+    return metrics
+
+
+def measure_profiles(url, browser_config=None, profiles=("standard", "lean")):
+    """
+    依序以各配置开启浏览器载入页面并量测
+
+    Args:
+        url (str): 要载入的页面
+        browser_config (dict, optional): config.json 中的 browser 区块（profile 字段会被覆盖）
+        profiles (tuple): 要比较的配置名称
+
+    Returns:
+        dict: 配置名称 -> 量测结果
+    """
+    results = {}
+    for name in profiles:
+        profile = resolve_profile(dict(browser_config or {}, profile=name))
+        driver = None
+        try:
+            started = time.perf_counter()
+            driver = webdriver.Chrome(options=build_chrome_options(profile))
+            apply_resource_blocking(driver, profile)
+            launched = time.perf_counter()
+            driver.get(url)
+            ready = time.perf_counter()
+            metrics = collect_page_metrics(driver)
+            metrics["launch_s"] = round(launched - started, 3)
+            metrics["get_s"] = round(ready - launched, 3)
+            results[name] = metrics
+            logging.info("瀏覽器配置 %s: %s", name, metrics)
+        except Exception as e:
+            logging.error("量測瀏覽器配置 %s 時發生錯誤: %s", name, e)
+            results[name] = {"error": str(e)}
+        finally:
+            if driver:
+                driver.quit()
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        with open("config.json", 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+    target_url = config.get("course_selection_url", "https://course.ncku.edu.tw/index.php?c=cos21322")
+    print(json.dumps(measure_profiles(target_url, config.get("browser")), ensure_ascii=False, indent=2))
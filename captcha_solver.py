@@ -6,15 +6,32 @@
 import base64
 import io
 import logging
-from PIL import Image
+import re
+import time
+from collections import Counter
+from PIL import Image, ImageEnhance, ImageFilter, ImageMorph, ImageOps
 import openai
+
+from log_setup import TIMING
+from metrics import span, count
+from captcha_submit import LOGIN_CAPTCHA_INPUT_XPATHS, submit_captcha
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# 预先编译的十六进制验证码规则
+NON_HEX_PATTERN = re.compile(r'[^0-9A-Fa-f]')
+HEX4_PATTERN = re.compile(r'^[0-9A-F]{4}$')
+HEX4_SEARCH_PATTERN = re.compile(r'[0-9A-Fa-f]{4}')
+
 class CaptchaSolver:
     """验证码识别器"""
     
+    # 调试图片的背景写入器（artifacts.ArtifactWriter），为None时不保存
+    artifacts = None
+    # 填入验证码的方式（captcha_submit.SUBMIT_MODES）
+    submit_mode = "script"
+    
     def __init__(self, openai_api_key, model="gpt-4o-mini"):
         """
         初始化验证码识别器
@@ -27,6 +44,7 @@ class CaptchaSolver:
         self.model = model
         self.logger = logging.getLogger(__name__)
     
+    @span("captcha_capture")
     def capture_captcha_image(self, driver, captcha_selector=None):
         """
         截取验证码图片
@@ -56,7 +74,7 @@ class CaptchaSolver:
                         captcha_img = WebDriverWait(driver, 3).until(
                             EC.presence_of_element_located((By.XPATH, selector))
                         )
-                        self.logger.info(f"找到验证码图片: {selector}")
+                        self.logger.info("找到验证码图片: %s", selector)
                         break
                     except:
                         continue
@@ -71,25 +89,20 @@ class CaptchaSolver:
             try:
                 screenshot = captcha_img.screenshot_as_png
                 image = Image.open(io.BytesIO(screenshot))
-                self.logger.info(f"成功截取验证码图片，尺寸: {image.size}, 模式: {image.mode}")
+                self.logger.info("成功截取验证码图片，尺寸: %s, 模式: %s", image.size, image.mode)
                 
-                # 保存图片用于调试（可选）
-                try:
-                    import time
-                    debug_path = f"captcha_debug_{int(time.time())}.png"
-                    image.save(debug_path)
-                    self.logger.info(f"验证码图片已保存到: {debug_path}")
-                except Exception as e:
-                    self.logger.warning(f"无法保存调试图片: {e}")
+                # 调试图片交给背景线程编码与写入，截图耗时不包含磁盘写入
+                if self.artifacts is not None:
+                    self.artifacts.submit("captcha", image.copy(), "png")
                 
                 return image
                 
             except Exception as e:
-                self.logger.error(f"截图失败: {e}")
+                self.logger.error("截图失败: %s", e)
                 return None
             
         except Exception as e:
-            self.logger.error(f"截取验证码图片时发生错误: {e}")
+            self.logger.error("截取验证码图片时发生错误: %s", e)
             return None
     
     def capture_captcha_image_original(self, driver, captcha_selector=None):
@@ -106,6 +119,7 @@ class CaptchaSolver:
         # 直接调用主要的截图方法
         return self.capture_captcha_image(driver, captcha_selector)
     
+    @span("captcha_preprocess")
     def preprocess_image(self, image):
         """
         图像预处理：针对十六进制验证码进行优化
@@ -117,7 +131,7 @@ class CaptchaSolver:
             PIL.Image.Image: 预处理后的图片
         """
         try:
-            self.logger.info("开始图像预处理...")
+            self.logger.debug("开始图像预处理...")
             
             # 转换为RGB模式
             if image.mode != 'RGB':
@@ -128,8 +142,6 @@ class CaptchaSolver:
             
             # 策略1: 十六进制验证码专用预处理
             try:
-                from PIL import ImageFilter, ImageEnhance
-                
                 # 转换为灰度图
                 gray = image.convert('L')
                 
@@ -147,15 +159,13 @@ class CaptchaSolver:
                 # 转换为RGB
                 final_image = enhanced.convert('RGB')
                 processed_images.append(("十六进制专用预处理", final_image))
-                self.logger.info("策略1完成：十六进制验证码专用预处理")
+                self.logger.debug("策略1完成：十六进制验证码专用预处理")
                 
             except Exception as e:
-                self.logger.warning(f"策略1失败: {e}")
+                self.logger.warning("策略1失败: %s", e)
             
             # 策略2: 字符分割优化
             try:
-                from PIL import ImageFilter, ImageEnhance
-                
                 # 转换为灰度图
                 gray = image.convert('L')
                 
@@ -175,15 +185,13 @@ class CaptchaSolver:
                 # 转换为RGB
                 final_image = enhanced.convert('RGB')
                 processed_images.append(("字符分割优化", final_image))
-                self.logger.info("策略2完成：字符分割优化")
+                self.logger.debug("策略2完成：字符分割优化")
                 
             except Exception as e:
-                self.logger.warning(f"策略2失败: {e}")
+                self.logger.warning("策略2失败: %s", e)
             
             # 策略3: 高对比度模式
             try:
-                from PIL import ImageFilter, ImageEnhance, ImageOps
-                
                 # 转换为灰度图
                 gray = image.convert('L')
                 
@@ -207,15 +215,13 @@ class CaptchaSolver:
                 # 转换为RGB
                 final_image = final_image.convert('RGB')
                 processed_images.append(("高对比度模式", final_image))
-                self.logger.info("策略3完成：高对比度模式")
+                self.logger.debug("策略3完成：高对比度模式")
                 
             except Exception as e:
-                self.logger.warning(f"策略3失败: {e}")
+                self.logger.warning("策略3失败: %s", e)
             
             # 策略4: 原始策略（作为备用）
             try:
-                from PIL import ImageFilter, ImageEnhance
-                
                 # 应用高斯模糊来减少杂讯
                 blurred = image.filter(ImageFilter.GaussianBlur(radius=0.5))
                 
@@ -231,10 +237,10 @@ class CaptchaSolver:
                 final_image = brightness_enhancer.enhance(1.2)
                 
                 processed_images.append(("原始策略", final_image))
-                self.logger.info("策略4完成：原始策略")
+                self.logger.debug("策略4完成：原始策略")
                 
             except Exception as e:
-                self.logger.warning(f"策略4失败: {e}")
+                self.logger.warning("策略4失败: %s", e)
             
             # 如果没有成功处理，返回原图
             if not processed_images:
@@ -243,12 +249,12 @@ class CaptchaSolver:
             
             # 选择第一个成功的处理结果
             strategy_name, processed_image = processed_images[0]
-            self.logger.info(f"使用预处理策略: {strategy_name}")
+            self.logger.debug("使用预处理策略: %s", strategy_name)
             
             return processed_image
             
         except Exception as e:
-            self.logger.warning(f"图像预处理失败: {e}，返回原图")
+            self.logger.warning("图像预处理失败: %s，返回原图", e)
             return image
     
     def _get_adaptive_threshold(self, gray_image):
@@ -276,7 +282,7 @@ class CaptchaSolver:
             return max(50, min(200, threshold))  # 限制阈值范围
             
         except Exception as e:
-            self.logger.warning(f"自适应阈值计算失败: {e}")
+            self.logger.warning("自适应阈值计算失败: %s", e)
             return 128  # 返回默认阈值
     
     def solve_captcha(self, image, max_retries=3):
@@ -300,17 +306,20 @@ class CaptchaSolver:
                 image.save(buffered, format="JPEG", quality=95)
                 img_base64 = base64.b64encode(buffered.getvalue()).decode()
                 
-                self.logger.info(f"图片已转换为JPEG格式，base64长度: {len(img_base64)}")
+                self.logger.debug("图片已转换为JPEG格式，base64长度: %s", len(img_base64))
                 
                 # 构建OpenAI API请求 - 针对4位十六进制验证码优化
-                self.logger.info(f"正在调用OpenAI API，模型: {self.model}")
-                
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": """你是一个专业的验证码识别专家。请快速识别图片中的4位十六进制验证码。
+                self.logger.debug("正在调用OpenAI API，模型: %s", self.model)
+                
+                api_started = time.perf_counter()
+                count("openai_requests_total", model=self.model)
+                with span("captcha_api"):
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": """你是一个专业的验证码识别专家。请快速识别图片中的4位十六进制验证码。
 
 规则：
 - 只输出4位十六进制字符（0-9, A-F）
@@ -337,63 +346,64 @@ E: 垂直线+三条水平线
 F: 垂直线+两条水平线
 
 快速识别，只输出结果。"""
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "快速识别4位十六进制验证码。只输出结果，不要解释。"
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{img_base64}"
+                            },
+                            {
+                                "role": "user",
+                                "content": [
+                                    {
+                                        "type": "text",
+                                        "text": "快速识别4位十六进制验证码。只输出结果，不要解释。"
+                                    },
+                                    {
+                                        "type": "image_url",
+                                        "image_url": {
+                                            "url": f"data:image/jpeg;base64,{img_base64}"
+                                        }
                                     }
-                                }
-                            ]
-                        }
-                    ]
-                )
+                                ]
+                            }
+                        ]
+                    )
                 
-                self.logger.info(f"OpenAI API 响应状态: {response.choices[0].finish_reason}")
-                self.logger.info(f"OpenAI API 响应ID: {response.id}")
+                self.logger.log(TIMING, "OpenAI API 耗时 %.0f ms", (time.perf_counter() - api_started) * 1000)
+                self.logger.debug("OpenAI API 响应状态: %s", response.choices[0].finish_reason)
+                self.logger.debug("OpenAI API 响应ID: %s", response.id)
                 
                 # 提取验证码文本
                 captcha_text = response.choices[0].message.content.strip()
                 
                 # 记录原始响应内容用于调试
-                self.logger.info(f"第{attempt + 1}次尝试 - 原始响应: '{captcha_text}'")
+                self.logger.debug("第%s次尝试 - 原始响应: '%s'", attempt + 1, captcha_text)
                 
                 # 针对4位十六进制验证码进行精确清理和验证
                 cleaned_text = self._clean_hex_captcha(captcha_text)
                 
                 if cleaned_text:
-                    self.logger.info(f"成功识别验证码: '{captcha_text}' -> 清理后: '{cleaned_text}'")
+                    self.logger.info("成功识别验证码: '%s' -> 清理后: '%s'", captcha_text, cleaned_text)
                     return cleaned_text
                 else:
-                    self.logger.warning(f"第{attempt + 1}次尝试：识别结果为空或无法清理")
-                    self.logger.warning(f"原始内容: '{captcha_text}'")
+                    self.logger.warning("第%s次尝试：识别结果为空或无法清理", attempt + 1)
+                    self.logger.warning("原始内容: '%s'", captcha_text)
                     
                     # 尝试其他清理方法
                     if captcha_text:
                         # 如果原始内容不为空，尝试提取任何可能的4位十六进制验证码
                         possible_codes = self._extract_hex_codes(captcha_text)
                         if possible_codes:
-                            self.logger.info(f"找到可能的验证码: {possible_codes[0]}")
+                            self.logger.info("找到可能的验证码: %s", possible_codes[0])
                             return possible_codes[0]
                     
             except Exception as e:
-                self.logger.error(f"第{attempt + 1}次尝试识别验证码时发生错误: {e}")
+                self.logger.error("第%s次尝试识别验证码时发生错误: %s", attempt + 1, e)
                 
             if attempt < max_retries - 1:
-                self.logger.info(f"等待1秒后重试...")
-                import time
+                self.logger.info("等待1秒后重试...")
                 time.sleep(1)
         
-        self.logger.error(f"验证码识别失败，已尝试{max_retries}次")
+        self.logger.error("验证码识别失败，已尝试%s次", max_retries)
         return None
     
+    @span("captcha_cleanup")
     def _clean_hex_captcha(self, text):
         """
         清理并验证4位十六进制验证码
@@ -404,16 +414,14 @@ F: 垂直线+两条水平线
         Returns:
             str: 清理后的4位十六进制验证码，如果无效返回None
         """
-        import re
-        
         # 移除所有非十六进制字符
-        hex_chars = re.sub(r'[^0-9A-Fa-f]', '', text)
+        hex_chars = NON_HEX_PATTERN.sub('', text)
         
         # 转换为大写
         hex_chars = hex_chars.upper()
         
         # 验证是否为4位十六进制
-        if len(hex_chars) == 4 and re.match(r'^[0-9A-F]{4}$', hex_chars):
+        if len(hex_chars) == 4 and HEX4_PATTERN.match(hex_chars):
             return hex_chars
         
         # 如果不是4位，尝试从更长的字符串中提取4位
@@ -421,11 +429,11 @@ F: 垂直线+两条水平线
             # 尝试找到连续的4位十六进制
             for i in range(len(hex_chars) - 3):
                 candidate = hex_chars[i:i+4]
-                if re.match(r'^[0-9A-F]{4}$', candidate):
+                if HEX4_PATTERN.match(candidate):
                     return candidate
         
         # 如果还是找不到，尝试从原始文本中提取
-        hex_patterns = re.findall(r'[0-9A-Fa-f]{4}', text.upper())
+        hex_patterns = HEX4_SEARCH_PATTERN.findall(text.upper())
         if hex_patterns:
             return hex_patterns[0]
         
@@ -441,10 +449,8 @@ F: 垂直线+两条水平线
         Returns:
             list: 找到的4位十六进制验证码列表
         """
-        import re
-        
         # 查找所有4位十六进制模式
-        hex_codes = re.findall(r'[0-9A-Fa-f]{4}', text.upper())
+        hex_codes = HEX4_SEARCH_PATTERN.findall(text.upper())
         
         # 过滤掉明显不是验证码的（比如全是0或全是F）
         valid_codes = []
@@ -491,6 +497,7 @@ F: 垂直线+两条水平线
                 img_base64 = base64.b64encode(buffered.getvalue()).decode()
                 
                 # 调用OpenAI API
+                count("openai_requests_total", model=self.model)
                 response = self.client.chat.completions.create(
                     model=self.model,
                     messages=[
@@ -544,31 +551,29 @@ F: 垂直线+两条水平线
                 
                 if cleaned_text:
                     results.append(cleaned_text)
-                    self.logger.info(f"第{attempt + 1}次尝试成功: '{cleaned_text}'")
+                    self.logger.info("第%s次尝试成功: '%s'", attempt + 1, cleaned_text)
                 else:
-                    self.logger.warning(f"第{attempt + 1}次尝试结果为空")
+                    self.logger.warning("第%s次尝试结果为空", attempt + 1)
                     
             except Exception as e:
-                self.logger.error(f"第{attempt + 1}次尝试失败: {e}")
+                self.logger.error("第%s次尝试失败: %s", attempt + 1, e)
             
             if attempt < max_attempts - 1:
-                import time
                 time.sleep(1)
         
         # 选择最佳结果
         if results:
             # 如果有多个结果，选择出现次数最多的
-            from collections import Counter
             counter = Counter(results)
             best_result = counter.most_common(1)[0][0]
-            self.logger.info(f"多次识别完成，选择最佳结果: '{best_result}' (出现{counter[best_result]}次)")
+            self.logger.info("多次识别完成，选择最佳结果: '%s' (出现%s次)", best_result, counter[best_result])
             return best_result
         
         return None
     
-    def auto_solve_captcha(self, driver, captcha_selector=None, max_retries=3):
+    def recognize_captcha(self, driver, captcha_selector=None, max_retries=3):
         """
-        自动识别并填写验证码
+        依序尝试多种策略识别页面上的验证码（不填写）
         
         Args:
             driver: Selenium WebDriver实例
@@ -576,7 +581,7 @@ F: 垂直线+两条水平线
             max_retries (int): 最大重试次数
             
         Returns:
-            bool: 是否成功识别并填写验证码
+            str: 识别出的验证码，所有策略都失败返回None
         """
         try:
             # 尝试多种识别策略
@@ -617,50 +622,46 @@ F: 垂直线+两条水平线
             
             if not captcha_text:
                 self.logger.error("所有识别策略都失败")
-                return False
+                return None
             
             # 记录所有成功的结果
             if all_results:
                 self.logger.info("所有识别结果:")
                 for method, result in all_results:
-                    self.logger.info(f"  {method}: {result}")
-            
-            # 查找验证码输入框
-            input_selectors = [
-                "//input[@name='code']",
-                "//input[@id='code']",
-                "//input[@placeholder*='验证码']",
-                "//input[@placeholder*='驗證碼']",
-                "//input[contains(@class, 'captcha')]",
-                "//input[@type='text'][@maxlength='4']",
-                "//input[@type='text'][@maxlength='6']"
-            ]
+                    self.logger.info("  %s: %s", method, result)
             
-            captcha_input = None
-            for selector in input_selectors:
-                try:
-                    captcha_input = WebDriverWait(driver, 3).until(
-                        EC.presence_of_element_located((By.XPATH, selector))
-                    )
-                    self.logger.info(f"找到验证码输入框: {selector}")
-                    break
-                except:
-                    continue
+            return captcha_text
             
-            if not captcha_input:
-                self.logger.error("无法找到验证码输入框")
-                return False
-            
-            # 填写验证码
-            captcha_input.clear()
-            captcha_input.send_keys(captcha_text)
-            self.logger.info(f"已填写验证码: {captcha_text}")
-            
-            return True
+        except Exception as e:
+            self.logger.error("自动识别验证码时发生错误: %s", e)
+            return None
+    
+    def auto_solve_captcha(self, driver, captcha_selector=None, max_retries=3):
+        """
+        自动识别并填写验证码（以一次脚本呼叫填入并触发 input/change 事件）
+        
+        Args:
+            driver: Selenium WebDriver实例
+            captcha_selector (str, optional): 验证码图片的选择器
+            max_retries (int): 最大重试次数
             
+        Returns:
+            bool: 是否成功识别并填写验证码
+        """
+        captcha_text = self.recognize_captcha(driver, captcha_selector, max_retries)
+        if not captcha_text:
+            return False
+        try:
+            result = submit_captcha(driver, captcha_text, self.submit_mode,
+                                    input_xpaths=LOGIN_CAPTCHA_INPUT_XPATHS, button_xpaths=())
         except Exception as e:
-            self.logger.error(f"自动识别验证码时发生错误: {e}")
+            self.logger.error("填写验证码时发生错误: %s", e)
             return False
+        if not result["filled"]:
+            self.logger.error("无法找到验证码输入框")
+            return False
+        self.logger.info("已填写验证码: %s（输入框 %s）", captcha_text, result["input"])
+        return True
     
     def _smart_retry_with_different_preprocessing(self, image, max_retries=3):
         """
@@ -684,28 +685,26 @@ F: 垂直线+两条水平线
             
             for variation_name, preprocessing_func in preprocessing_variations:
                 try:
-                    self.logger.info(f"尝试 {variation_name} 预处理...")
+                    self.logger.debug("尝试 %s 预处理...", variation_name)
                     processed_image = preprocessing_func(image)
                     if processed_image:
                         result = self.solve_captcha(processed_image, max_retries=2)
                         if result:
-                            self.logger.info(f"{variation_name} 预处理成功识别: {result}")
+                            self.logger.info("%s 预处理成功识别: %s", variation_name, result)
                             return result
                 except Exception as e:
-                    self.logger.warning(f"{variation_name} 预处理失败: {e}")
+                    self.logger.warning("%s 预处理失败: %s", variation_name, e)
                     continue
             
             return None
             
         except Exception as e:
-            self.logger.error(f"智能重试失败: {e}")
+            self.logger.error("智能重试失败: %s", e)
             return None
     
     def _apply_high_contrast_preprocessing(self, image):
         """应用高对比度预处理"""
         try:
-            from PIL import ImageEnhance, ImageFilter
-            
             # 转换为灰度图
             gray = image.convert('L')
             
@@ -719,14 +718,12 @@ F: 垂直线+两条水平线
             # 转换为RGB
             return enhanced.convert('RGB')
         except Exception as e:
-            self.logger.warning(f"高对比度预处理失败: {e}")
+            self.logger.warning("高对比度预处理失败: %s", e)
             return None
     
     def _apply_edge_enhancement_preprocessing(self, image):
         """应用边缘增强预处理"""
         try:
-            from PIL import ImageFilter, ImageEnhance
-            
             # 转换为灰度图
             gray = image.convert('L')
             
@@ -743,14 +740,12 @@ F: 垂直线+两条水平线
             # 转换为RGB
             return enhanced.convert('RGB')
         except Exception as e:
-            self.logger.warning(f"边缘增强预处理失败: {e}")
+            self.logger.warning("边缘增强预处理失败: %s", e)
             return None
     
     def _apply_morphological_preprocessing(self, image):
         """应用形态学预处理"""
         try:
-            from PIL import ImageFilter, ImageEnhance, ImageMorph
-            
             # 转换为灰度图
             gray = image.convert('L')
             
@@ -767,14 +762,12 @@ F: 垂直线+两条水平线
             # 转换为RGB
             return sharpened.convert('RGB')
         except Exception as e:
-            self.logger.warning(f"形态学预处理失败: {e}")
+            self.logger.warning("形态学预处理失败: %s", e)
             return None
     
     def _apply_adaptive_threshold_preprocessing(self, image):
         """应用自适应阈值预处理"""
         try:
-            from PIL import ImageEnhance
-            
             # 转换为灰度图
             gray = image.convert('L')
             
@@ -791,5 +784,5 @@ F: 垂直线+两条水平线
             # 转换为RGB
             return enhanced.convert('RGB')
         except Exception as e:
-            self.logger.warning(f"自适应阈值预处理失败: {e}")
+            self.logger.warning("自适应阈值预处理失败: %s", e)
             return None
@@ -0,0 +1,194 @@
+"""
+验证码送出模块
+以一次 execute_script 完成填入验证码、触发 input/change 事件、依优先顺序寻找确认按钮并点击，
+取代 clear、send_keys、多次 find_element、scrollIntoView 与 click 的多次 WebDriver 往返
+"""
+
+import logging
+import time
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+from log_setup import TIMING
+from metrics import observe
+
+SUBMIT_MODES = ("script", "webdriver")
+
+# 选课弹窗中的验证码输入框（依优先顺序）
+COURSE_CAPTCHA_INPUT_XPATHS = (
+    "//input[@name='cos_qry_confirm_validation_code']",
+    "//input[@id='cos_qry_confirm_validation_code']",
+    "//input[contains(@placeholder, '請輸入驗證碼')]",
+    "//div[contains(@class, 'modal-body')]//input[@type='text']",
+)
+
+# 登入页的验证码输入框（依优先顺序）
+LOGIN_CAPTCHA_INPUT_XPATHS = (
+    "//input[@name='code']",
+    "//input[@id='code']",
+    "//input[contains(@placeholder, '验证码')]",
+    "//input[contains(@placeholder, '驗證碼')]",
+    "//input[contains(@class, 'captcha')]",
+    "//input[@type='text'][@maxlength='4']",
+    "//input[@type='text'][@maxlength='6']",
+)
+
+# 选课弹窗的确认按钮（依优先顺序）
+CONFIRM_BUTTON_XPATHS = (
+    "//button[contains(@class, 'addcourse_confirm_save_button')]",
+    "//button[contains(text(), '確定') or contains(text(), '確認') or contains(text(), '提交')]",
+    "//button[contains(@class, 'confirm') or contains(@class, 'save')]",
+    "//button[@type='button' and contains(@class, 'btn-danger')]",
+    "//button[@data-dismiss='modal' and contains(text(), '確定')]",
+)
+
+# arguments: 输入框元素（可为 null）、验证码（null 表示不填）、输入框 XPath 列表、确认按钮 XPath 列表
+# 以原生 setter 设值，让监听 input 事件的页面框架也能察觉；填入失败时不点击，避免送出空白验证码
+# 确认按钮只在目前显示的弹窗（判断同 page_waits.MODAL_VISIBLE_SCRIPT）中寻找，并跳过隐藏与停用的按钮
+FILL_AND_CONFIRM_SCRIPT = """
+var input = arguments[0], value = arguments[1], inputXpaths = arguments[2], buttonXpaths = arguments[3];
+var result = {filled: false, input: null, button: null, clicked: false};
+function first(xpath) {
+    return document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function visibleModal() {
+    var modals = document.querySelectorAll('.modal');
+    for (var i = 0; i < modals.length; i++) {
+        var style = window.getComputedStyle(modals[i]);
+        if (style.display !== 'none' && style.visibility !== 'hidden' && modals[i].offsetHeight > 0) return modals[i];
+    }
+    return null;
+}
+function clickable(xpath, scope) {
+    var nodes = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var i = 0; i < nodes.snapshotLength; i++) {
+        var node = nodes.snapshotItem(i);
+        if (scope.contains(node) && node.offsetParent !== null && !node.disabled) return node;
+    }
+    return null;
+}
+if (value !== null) {
+    if (input) {
+        result.input = 'element';
+    } else {
+        for (var i = 0; i < inputXpaths.length && !input; i++) {
+            input = first(inputXpaths[i]);
+            if (input) result.input = inputXpaths[i];
+        }
+    }
+    if (!input) return result;
+    var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+    input.focus();
+    setter.call(input, value);
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    input.dispatchEvent(new Event('change', {bubbles: true}));
+    result.filled = input.value === value;
+    if (!result.filled) return result;
+}
+var modal = buttonXpaths.length ? visibleModal() : null;
+for (var j = 0; modal && j < buttonXpaths.length; j++) {
+    var button = clickable(buttonXpaths[j], modal);
+    if (button) {
+        result.button = buttonXpaths[j];
+        button.scrollIntoView({block: 'center'});
+        button.click();
+        result.clicked = true;
+        break;
+    }
+}
+return result;
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def submit_by_script(driver, captcha_text, input_element=None, input_xpaths=COURSE_CAPTCHA_INPUT_XPATHS,
+                     button_xpaths=CONFIRM_BUTTON_XPATHS):
+    """
+    以一次 execute_script 填入验证码并点击目前弹窗中可见、可用的确认按钮
+
+    Args:
+        driver: Selenium WebDriver实例
+        captcha_text (str): 验证码，None 表示只点击确认（例如使用者已手动输入）
+        input_element (WebElement, optional): 已找到的输入框，None 时依 input_xpaths 寻找
+        input_xpaths (tuple): 输入框 XPath（依优先顺序）
+        button_xpaths (tuple): 确认按钮 XPath（依优先顺序），空的表示只填入不点击
+
+    Returns:
+        dict: filled、input（使用的 XPath）、button（使用的 XPath）、clicked
+    """
+    return driver.execute_script(FILL_AND_CONFIRM_SCRIPT, input_element, captcha_text,
+                                 list(input_xpaths), list(button_xpaths))
+
+
+def submit_by_webdriver(driver, captcha_text, input_element=None, input_xpaths=COURSE_CAPTCHA_INPUT_XPATHS,
+                        button_xpaths=CONFIRM_BUTTON_XPATHS):
+    """
+    以逐一的 WebDriver 命令填入验证码并点击第一个显示中且可用的确认按钮（旧做法，供比较与脚本失败时备援）
+
+    Args 与 Returns 同 submit_by_script
+    """
+    result = {"filled": False, "input": None, "button": None, "clicked": False}
+    if captcha_text is not None:
+        if input_element is not None:
+            result["input"] = "element"
+        else:
+            for xpath in input_xpaths:
+                elements = driver.find_elements(By.XPATH, xpath)
+                if elements:
+                    input_element = elements[0]
+                    result["input"] = xpath
+                    break
+        if input_element is None:
+            return result
+        input_element.clear()
+        input_element.send_keys(captcha_text)
+        result["filled"] = True
+    for xpath in button_xpaths:
+        elements = [e for e in driver.find_elements(By.XPATH, xpath) if e.is_displayed() and e.is_enabled()]
+        if elements:
+            result["button"] = xpath
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", elements[0])
+            elements[0].click()
+            result["clicked"] = True
+            break
+    return result
+
+
+def submit_captcha(driver, captcha_text, mode="script", input_element=None,
+                   input_xpaths=COURSE_CAPTCHA_INPUT_XPATHS, button_xpaths=CONFIRM_BUTTON_XPATHS):
+    """
+    填入验证码并点击确认，记录送出耗时（captcha_submit_seconds{mode}）
+
+    Args:
+        driver: Selenium WebDriver实例
+        captcha_text (str): 验证码，None 表示只点击确认
+        mode (str): script（一次往返）或 webdriver（逐一命令）
+        input_element (WebElement, optional): 已找到的输入框
+        input_xpaths (tuple): 输入框 XPath（依优先顺序）
+        button_xpaths (tuple): 确认按钮 XPath（依优先顺序），空的表示只填入不点击
+
+    Returns:
+        dict: filled、input、button、clicked
+    """
+    started = time.perf_counter()
+    if mode == "script":
+        try:
+            result = submit_by_script(driver, captcha_text, input_element, input_xpaths, button_xpaths)
+        except WebDriverException as e:
+            logger.warning("送出腳本執行失敗，改用逐一命令: %s", e)
+            mode = "webdriver"
+            result = submit_by_webdriver(driver, captcha_text, input_element, input_xpaths, button_xpaths)
+        if button_xpaths and not result["clicked"] and (captcha_text is None or result["filled"]):
+            # 弹窗中没有可见的确认按钮（例如弹窗的 class 不同）：已填入的验证码保留，改以逐一命令寻找按钮
+            logger.warning("腳本在彈窗中找不到可見的確認按鈕，改用逐一命令")
+            mode = "webdriver"
+            clicked = submit_by_webdriver(driver, None, input_xpaths=input_xpaths, button_xpaths=button_xpaths)
+            result.update(button=clicked["button"], clicked=clicked["clicked"])
+    else:
+        result = submit_by_webdriver(driver, captcha_text, input_element, input_xpaths, button_xpaths)
+    elapsed = time.perf_counter() - started
+    observe("captcha_submit_seconds", elapsed, mode=mode)
+    logger.log(TIMING, "送出驗證碼耗時 %.0f ms (%s): 輸入框 %s，按鈕 %s",
+               elapsed * 1000, mode, result.get("input"), result.get("button"))
+    return result
@@ -0,0 +1,123 @@
+"""
+命令列入口模块
+轻量指令（检查设定、匯入耗时报告）不载入浏览器与验证码模块，启动只需几十毫秒；
+run / watch / bench 可在排程或服务器上无人值守执行，以结束代码回报结果（见 interaction.ExitCode）
+"""
+
+import argparse
+import json
+import sys
+
+from bot_config import ConfigError, validate_config
+from interaction import MODES, ExitCode, InteractionPolicy
+
+
+def command_check(args):
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ 無法讀取設定檔 {args.config}: {e}")
+        return 1
+    errors, warnings = validate_config(config)
+    for warning in warnings:
+        print(f"⚠️  {warning}")
+    for error in errors:
+        print(f"❌ {error}")
+    if errors:
+        return ExitCode.CONFIG_ERROR
+    print(f"✅ 設定檔 {args.config} 檢查通過，共 {len(config['courses'])} 門課程")
+    return ExitCode.OK
+
+
+def run_selection(args, watch_only):
+    # 浏览器与验证码模块只在真正执行时才载入
+    from course_bot import NCKUCourseBot, run_bot
+
+    try:
+        bot = NCKUCourseBot(args.config)
+    except ConfigError as e:
+        print(f"❌ 設定檔錯誤: {e}")
+        return ExitCode.CONFIG_ERROR
+    interaction_config = dict(bot.config.get('interaction', {}))
+    if args.interaction:
+        interaction_config['mode'] = args.interaction
+    if args.timeout is not None:
+        interaction_config['timeout'] = args.timeout
+    if args.notify_url:
+        interaction_config['notify_url'] = args.notify_url
+    # 命令列执行时不询问 Enter：未指定策略且没有终端时立即失败
+    bot.interaction = InteractionPolicy.from_config(interaction_config)
+    if args.profile:
+        bot.profile_output = args.profile
+    try:
+        return run_bot(bot, watch_only=watch_only)
+    except KeyboardInterrupt:
+        return ExitCode.INTERRUPTED
+
+
+def command_run(args):
+    return run_selection(args, watch_only=False)
+
+
+def command_watch(args):
+    return run_selection(args, watch_only=True)
+
+
+def command_bench(args):
+    from benchmark import main as benchmark_main
+    try:
+        return benchmark_main(args.benchmark_args)
+    except Exception as e:
+        print(f"❌ 基準測試失敗: {e}")
+        return ExitCode.ERROR
+
+
+def command_imports(args):
+    # 匯入报告需要时才载入
+    from import_report import print_report
+    print_report(args.modules or None)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="NCKU 自動選課系統")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check = subparsers.add_parser("check", help="檢查設定檔（不開啟瀏覽器）")
+    check.add_argument("--config", default="config.json")
+    check.set_defaults(func=command_check)
+
+    imports = subparsers.add_parser("imports", help="列出各模組的匯入耗時")
+    imports.add_argument("modules", nargs="*")
+    imports.set_defaults(func=command_imports)
+
+    for name, func, help_text in (("run", command_run, "執行選課（依設定等待開放、重試與監控）"),
+                                  ("watch", command_watch, "只監控所有課程的餘額，出現空位立即選課")):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("--config", default="config.json")
+        command.add_argument("--interaction", choices=MODES,
+                             help="需要人工操作時的策略（預設讀取設定檔，未設定時沒有終端即失敗）")
+        command.add_argument("--timeout", type=float, help="timeout / notify 策略的最長等待秒數")
+        command.add_argument("--notify-url", help="notify 策略通知的 webhook")
+        command.add_argument("--profile", nargs="?", const="profile.folded", help="取樣分析輸出檔")
+        command.set_defaults(func=func)
+
+    bench = subparsers.add_parser("bench", help="離線端到端基準測試（參數同 benchmark.py）")
+    bench.set_defaults(func=command_bench)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    # bench 的参数原样交给 benchmark.py 解析
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.benchmark_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    return int(args.func(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,116 @@
 # course_bot.py
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 import time
 import json
 import logging
 import os
+import sys
+import argparse
+import importlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
-# 导入自定义模块
-try:
-    from captcha_solver import CaptchaSolver
-    from env_config import EnvConfig
-    CAPTCHA_SOLVER_AVAILABLE = True
-except ImportError as e:
-    print(f"警告：无法导入验证码识别模块: {e}")
-    print("将使用手动输入验证码模式")
-    CAPTCHA_SOLVER_AVAILABLE = False
+# 只匯入輕量模組；WebDriver 堆疊（WebDriverWait、Chrome 選項）、頁面等待、多分頁與看門狗（requests）在使用時才匯入
+from course_table import CourseTable
+from browser_pool import run_with_pool
+from start_scheduler import PrecisionScheduler, ServerClock, parse_opening_time
+from seat_watcher import SeatWatcher, remaining_seats
+from session_store import SessionStore, to_cdp_cookie
+from network_results import NetworkResultReader
+from course_queue import CourseQueue
+from result_parser import SelectionOutcome, classify_result, parse_result_text
+from log_setup import TIMING, setup_queued_logging
+from bot_config import ConfigError, ConfigReloader, compile_config, load_config_file
+from interaction import ExitCode, HumanInputRequired, InteractionPolicy, selection_exit_code
+from metrics import span, instrument_driver, write_metrics
+from profiler import SamplingProfiler, profile_output_from_env
+from artifacts import ArtifactWriter
+from captcha_submit import COURSE_CAPTCHA_INPUT_XPATHS, LOGIN_CAPTCHA_INPUT_XPATHS, submit_captcha
+
+# 验证码识别（openai、Pillow）与 HTTP 引擎（requests、Pillow）载入较慢，延迟到第一次使用时才导入
+@lru_cache(maxsize=None)
+def load_optional_module(name):
+    """延遲匯入選用模組，無法匯入時返回None（結果會被快取）"""
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        print(f"警告：无法导入 {name}: {e}")
+        print("将使用手动输入验证码模式")
+        return None
 
 class NCKUCourseBot:
-    def __init__(self, config_file="config.json"):
-        self.config = self.load_config(config_file)
+    def __init__(self, config_file="config.json", config=None, log_file="course_bot.log"):
+        self.config_file = config_file
+        # 設定在載入時一次檢查並編譯；self.config 為選課流程使用的字典（課程已附帶索引鍵與 XPath）
+        self.settings = compile_config(config) if config is not None else self.load_config(config_file)
+        self.config = self.settings.to_dict()
+        self.config_reloader = ConfigReloader(self.settings) if self.settings.source else None
         self.driver = None
+        self.course_table = None
+        self._waiter = None
+        self.last_outcome = SelectionOutcome.UNKNOWN
+        self.course_outcomes = {}
+        # 最近一次 auto_course_selection 的各課程結果（含監控後選上的課程）
+        self.last_results = {}
+        self.http_engine = None
+        self.watchdog = None
+        self.log_file = log_file
         self.setup_logging()
         
-        # 初始化验证码识别器
-        self.captcha_solver = None
-        if CAPTCHA_SOLVER_AVAILABLE:
+        # 需要人工操作時的處理方式（無人值守時不會卡在 input()）
+        self.interaction = InteractionPolicy.from_config(self.config.get('interaction'))
+        
+        # 設定 NCKU_PROFILE（或 --profile）時在自動選課期間取樣分析
+        self.profile_output = profile_output_from_env()
+        
+        # 保存登入狀態，重新啟動時可跳過登入
+        session_config = self.config.get('session', {})
+        self.session_store = None
+        if session_config.get('persist', True):
+            self.session_store = SessionStore(session_config.get('cookie_file', 'session_cookies.json'),
+                                              session_config.get('max_age', 6 * 3600))
+        
+        # 錄製頁面與回應，供本地替身重放
+        recording_config = self.config.get('recording', {})
+        self.recorder = None
+        if recording_config.get('enabled'):
+            from site_recorder import SiteRecorder
+            self.recorder = SiteRecorder(recording_config.get('directory', 'recordings'))
+        
+        # 驗證碼圖片與失敗頁面由背景執行緒寫入 artifacts 目錄
+        self.artifacts = ArtifactWriter.from_config(self.config.get('artifacts'))
+        
+        # 验证码识别器在第一次使用时才建立
+        self._captcha_solver = None
+        self._captcha_solver_loaded = False
+    
+    @property
+    def captcha_solver(self):
+        """驗證碼識別器（第一次使用時才載入 openai 與 Pillow）"""
+        if not self._captcha_solver_loaded:
+            self._captcha_solver_loaded = True
+            self._captcha_solver = self.create_captcha_solver()
+            self.attach_captcha_solver(self._captcha_solver)
+        return self._captcha_solver
+    
+    @captcha_solver.setter
+    def captcha_solver(self, solver):
+        self._captcha_solver = solver
+        self._captcha_solver_loaded = True
+        self.attach_captcha_solver(solver)
+    
+    def attach_captcha_solver(self, solver):
+        """把调试档案写入器与送出方式交给识别器"""
+        if solver:
+            solver.artifacts = self.artifacts
+            solver.submit_mode = self.config.get('verification', {}).get('submit_mode', 'script')
+    
+    def create_captcha_solver(self):
+        """建立驗證碼識別器，沒有 API 密鑰或無法匯入時返回None"""
+        load_optional_module('env_config')  # 載入 .env 中的 OPENAI_API_KEY
+        captcha_module = load_optional_module('captcha_solver')
+        if captcha_module:
             try:
                 # 优先从环境变量获取API密钥
                 if 'OPENAI_API_KEY' in os.environ:
@@ -39,40 +122,61 @@ class NCKUCourseBot:
                 
                 if api_key:
                     model = self.config.get('openai_config', {}).get('model', 'gpt-5-mini')
-                    self.captcha_solver = CaptchaSolver(api_key, model)
+                    solver = captcha_module.CaptchaSolver(api_key, model)
                     logging.info("✅ 验证码识别器初始化成功")
-                else:
-                    logging.warning("未找到OpenAI API密钥，将使用手动输入验证码模式")
+                    return solver
+                logging.warning("未找到OpenAI API密钥，将使用手动输入验证码模式")
             except Exception as e:
-                logging.error(f"初始化验证码识别器时发生错误: {e}")
-                self.captcha_solver = None
+                logging.error("初始化验证码识别器时发生错误: %s", e)
+        return None
+    
+    @property
+    def waiter(self):
+        """綁定目前瀏覽器的頁面等待器"""
+        if self._waiter is None or self._waiter.driver is not self.driver:
+            from page_waits import PageWaiter
+            self._waiter = PageWaiter(self.driver)
+        return self._waiter
         
     def setup_logging(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('course_bot.log'),
-                logging.StreamHandler()
-            ]
-        )
+        # 日誌由背景執行緒寫入檔案與終端；level 設為 timing 時只保留耗時事件與警告
+        setup_queued_logging(self.log_file, self.config.get('logging', {}).get('level', 'info'))
         
     def load_config(self, config_file):
-        try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                logging.info(f"成功載入配置檔案: {config}")
-                return config
-        except FileNotFoundError:
-            logging.warning(f"找不到配置檔案 {config_file}，使用預設配置")
-            return self.create_default_config()
-        except Exception as e:
-            logging.error(f"載入配置檔案時發生錯誤: {e}")
-            return self.create_default_config()
+        """載入並檢查設定檔，內容不合法時拋出 ConfigError（不再等到選課時才發現）"""
+        if not os.path.exists(config_file):
+            # 第一次執行：建立預設配置後結束，預設配置沒有帳號密碼，不能直接選課
+            logging.warning("找不到配置檔案 %s，建立預設配置", config_file)
+            self.create_default_config()
+            raise ConfigError(["已建立預設配置檔案，請填入 login_info 的帳號密碼與要選的課程後重新執行"], config_file)
+        settings = load_config_file(config_file)
+        logging.info("成功載入配置檔案 %s（%d 門課程）", config_file, len(settings.courses))
+        return settings
+    
+    def reload_config(self):
+        """
+        設定檔修改時重新載入可即時生效的區塊（課程、監控、重試等），不重新啟動瀏覽器
+        
+        Returns:
+            bool: 是否已套用新的設定
+        """
+        if not self.config_reloader:
+            return False
+        settings = self.config_reloader.poll()
+        if settings is None:
+            return False
+        self.settings = settings
+        self.config = settings.to_dict()
+        self.attach_captcha_solver(self._captcha_solver)
+        return True
     
     def create_default_config(self):
         default_config = {
             "course_selection_url": "https://course.ncku.edu.tw/index.php?c=cos21322",
+            "login_info": {
+                "username": "",
+                "password": ""
+            },
             "courses": [
                 {
                     "department_code": "M1",
@@ -83,16 +187,21 @@ class NCKUCourseBot:
         }
         
         try:
-            with open("config.json", 'w', encoding='utf-8') as f:
+            with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(default_config, f, ensure_ascii=False, indent=2)
             logging.info("已創建預設配置檔案")
         except Exception as e:
-            logging.error(f"創建配置檔案時發生錯誤: {e}")
+            logging.error("創建配置檔案時發生錯誤: %s", e)
         
         return default_config
     
+    @span("login")
     def auto_login(self):
         """自動登入選課系統"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from browser_profiles import collect_page_metrics
+        
         try:
             logging.info("開始自動登入流程...")
             
@@ -108,15 +217,27 @@ class NCKUCourseBot:
                 logging.error("配置檔案中的登入資訊不完整")
                 return False
             
-            logging.info(f"使用帳號: {username}")
+            logging.info("使用帳號: %s", username)
+            login_started = time.perf_counter()
             
             # 導航到登入頁面
             login_url = self.config['course_selection_url']
-            logging.info(f"導航到登入頁面: {login_url}")
+            logging.info("導航到登入頁面: %s", login_url)
             self.driver.get(login_url)
             
             # 等待頁面載入
-            time.sleep(2)
+            self.waiter.wait_for_document_ready()
+            if self.recorder:
+                self.recorder.record_page(self.driver, "login")
+            
+            auto_captcha = self.captcha_solver and self.config.get('verification', {}).get('auto_captcha', True)
+            login_mode = self.config.get('verification', {}).get('login_mode', 'pipelined')
+            captcha_future = None
+            if auto_captcha and login_mode == 'sequential':
+                # 舊做法（供比較）：驗證碼識別完成後才查找並填寫帳號密碼
+                captcha_future = self.start_login_captcha()
+                if captcha_future:
+                    captcha_future.result()
             
             # 嘗試多種方式查找登入表單元素
             username_input = None
@@ -137,7 +258,7 @@ class NCKUCourseBot:
                     username_input = WebDriverWait(self.driver, 3).until(
                         EC.presence_of_element_located((By.XPATH, selector))
                     )
-                    logging.info(f"找到帳號輸入框: {selector}")
+                    logging.info("找到帳號輸入框: %s", selector)
                     break
                 except:
                     continue
@@ -156,7 +277,7 @@ class NCKUCourseBot:
                     password_input = WebDriverWait(self.driver, 3).until(
                         EC.presence_of_element_located((By.XPATH, selector))
                     )
-                    logging.info(f"找到密碼輸入框: {selector}")
+                    logging.info("找到密碼輸入框: %s", selector)
                     break
                 except:
                     continue
@@ -165,6 +286,10 @@ class NCKUCourseBot:
                 logging.error("無法找到登入表單元素")
                 return False
             
+            # 管線化登入：查找欄位期間驗證碼圖片已在載入；截圖後在背景識別，同時填寫帳號密碼
+            if auto_captcha and login_mode != 'sequential':
+                captcha_future = self.start_login_captcha()
+            
             # 填入帳號密碼
             logging.info("填入帳號密碼...")
             username_input.clear()
@@ -178,24 +303,32 @@ class NCKUCourseBot:
             print(f"   密碼: {'*' * len(password)}")
             
             # 尝试自动识别验证码
-            if self.captcha_solver and self.config.get('verification', {}).get('auto_captcha', True):
+            if auto_captcha:
                 print("🤖 正在使用AI自动识别验证码...")
                 
-                # 等待页面加载完成
-                time.sleep(2)
+                # 取得背景識別結果；失敗時改用完整的多策略識別
+                captcha_wait_started = time.perf_counter()
+                captcha_text = captcha_future.result() if captcha_future else None
+                logging.log(TIMING, "填寫帳號密碼後等待驗證碼識別 %.0f ms (%s)",
+                            (time.perf_counter() - captcha_wait_started) * 1000, login_mode)
+                if captcha_text and self.fill_login_captcha(captcha_text):
+                    solved = True
+                else:
+                    self.waiter.wait_for_captcha_image()
+                    solved = self.captcha_solver.auto_solve_captcha(self.driver)
                 
-                # 自动识别并填写验证码
-                if self.captcha_solver.auto_solve_captcha(self.driver):
+                if solved:
                     print("✅ AI成功识别并填写验证码！")
                     logging.info("AI自动识别验证码成功")
+                    if self.recorder:
+                        self.recorder.record_captcha(self.driver, "//input[@name='code']")
                 else:
                     print("❌ AI识别验证码失败，请手动输入")
                     logging.warning("AI识别验证码失败，切换到手动模式")
-                    print("⏰ 請在瀏覽器中輸入登入驗證碼，然後按 Enter 繼續...")
-                    input()
-            else:
-                print("⏰ 請在瀏覽器中輸入登入驗證碼，然後按 Enter 繼續...")
-                input()
+                    if not self.wait_for_login_captcha():
+                        return False
+            elif not self.wait_for_login_captcha():
+                return False
             
             # 查找登入按鈕（使用精確的選擇器）
             login_button = None
@@ -212,7 +345,7 @@ class NCKUCourseBot:
                 try:
                     login_button = self.driver.find_element(By.XPATH, selector)
                     if login_button:
-                        logging.info(f"找到登入按鈕: {selector}")
+                        logging.info("找到登入按鈕: %s", selector)
                         break
                 except:
                     continue
@@ -223,17 +356,19 @@ class NCKUCourseBot:
             
             # 點擊登入按鈕
             logging.info("點擊登入按鈕...")
+            url_before_login = self.driver.current_url
             login_button.click()
             
-            # 等待登入完成
+            # 等待登入完成（以頁面跳轉判斷）
             logging.info("等待登入完成...")
-            time.sleep(5)
+            self.waiter.wait_for_url_change(url_before_login)
+            self.waiter.wait_for_document_ready()
             
             # 檢查登入狀態
             current_url = self.driver.current_url
             page_title = self.driver.title
-            logging.info(f"登入後頁面標題: {page_title}")
-            logging.info(f"登入後頁面URL: {current_url}")
+            logging.info("登入後頁面標題: %s", page_title)
+            logging.info("登入後頁面URL: %s", current_url)
             
             # 檢查是否還在登入頁面
             if "登入" in page_title or "login" in page_title.lower():
@@ -244,31 +379,145 @@ class NCKUCourseBot:
             logging.info("✅ 登入成功！正在導向選課頁面...")
             try:
                 self.driver.get(self.config["course_selection_url"])
-                time.sleep(5)  # 等待頁面載入
+                self.waiter.wait_for_url_contains("cos21322")
+                self.waiter.wait_for_element("//table")
                 
                 # 確認已導向選課頁面
                 final_url = self.driver.current_url
                 final_title = self.driver.title
-                logging.info(f"導向後頁面標題: {final_title}")
-                logging.info(f"導向後頁面URL: {final_url}")
+                logging.info("導向後頁面標題: %s", final_title)
+                logging.info("導向後頁面URL: %s", final_url)
                 
                 if "cos21322" in final_url:
                     logging.info("✅ 成功導向選課頁面")
+                    logging.log(TIMING, "登入共耗時 %.2f 秒 (%s)", time.perf_counter() - login_started, login_mode)
+                    logging.info("選課頁面效能指標: %s", collect_page_metrics(self.driver))
+                    self.save_session()
+                    if self.watchdog:
+                        # 更新看門狗使用的 cookies
+                        self.watchdog.sync_cookies()
+                        self.watchdog.expired.clear()
+                    if self.recorder:
+                        self.recorder.record_page(self.driver, "course")
                     return True
                 else:
                     logging.warning("導向選課頁面可能失敗")
                     return False
                     
             except Exception as e:
-                logging.error(f"導向選課頁面時發生錯誤: {e}")
+                logging.error("導向選課頁面時發生錯誤: %s", e)
                 return False
                 
         except Exception as e:
-            logging.error(f"自動登入過程中發生錯誤: {e}")
+            logging.error("自動登入過程中發生錯誤: %s", e)
+            return False
+    
+    def wait_for_login_captcha(self):
+        """依介入策略等待使用者在瀏覽器中輸入登入驗證碼"""
+        def captcha_filled():
+            inputs = self.driver.find_elements(By.XPATH, "//input[@name='code'] | //input[@id='code']")
+            return bool(inputs) and len(inputs[0].get_attribute("value") or "") >= 4
+        return self.interaction.wait_for_human("登入驗證碼",
+                                               "⏰ 請在瀏覽器中輸入登入驗證碼，然後按 Enter 繼續...",
+                                               done=captcha_filled)
+    
+    def wait_for_course_captcha(self, course, verification_input=None):
+        """依介入策略等待使用者在選課彈窗中輸入驗證碼"""
+        def captcha_filled():
+            inputs = [verification_input] if verification_input is not None else [
+                element for xpath in COURSE_CAPTCHA_INPUT_XPATHS
+                for element in self.driver.find_elements(By.XPATH, xpath)]
+            return bool(inputs) and len(inputs[0].get_attribute("value") or "") >= 4
+        return self.interaction.wait_for_human("選課驗證碼",
+                                               f"📝 請在瀏覽器中為課程 '{course['course_name']}' 輸入驗證碼，然後按 Enter 繼續...",
+                                               done=captcha_filled)
+    
+    def start_login_captcha(self):
+        """
+        等待登入驗證碼圖片載入後截圖，並在背景執行緒識別（截圖仍在呼叫端執行緒操作瀏覽器）
+        
+        Returns:
+            Future: 識別結果，圖片未載入或截圖失敗返回None
+        """
+        if not self.waiter.wait_for_captcha_image():
+            return None
+        captcha_image = self.captcha_solver.capture_captcha_image(self.driver)
+        if captcha_image is None:
+            return None
+        executor = ThreadPoolExecutor(max_workers=1)
+        captcha_future = executor.submit(self.captcha_solver.solve_captcha, captcha_image)
+        executor.shutdown(wait=False)
+        return captcha_future
+    
+    def fill_login_captcha(self, captcha_text):
+        """以一次腳本呼叫填入登入驗證碼（與選課彈窗共用 captcha_submit，不點擊按鈕）"""
+        submit_mode = self.config.get('verification', {}).get('submit_mode', 'script')
+        filled = submit_captcha(self.driver, captcha_text, submit_mode,
+                                input_xpaths=LOGIN_CAPTCHA_INPUT_XPATHS, button_xpaths=())["filled"]
+        if filled:
+            logging.info("已填写验证码: %s", captcha_text)
+        return filled
+    
+    def start_watchdog(self):
+        """啟動登入狀態看門狗（session.watchdog_interval 為 0 時停用）"""
+        interval = self.config.get('session', {}).get('watchdog_interval', 60)
+        if interval and self.watchdog is None:
+            from session_watchdog import SessionWatchdog
+            self.watchdog = SessionWatchdog(self, interval).start()
+        return self.watchdog
+    
+    def stop_watchdog(self):
+        """停止登入狀態看門狗"""
+        if self.watchdog:
+            self.watchdog.stop()
+            self.watchdog = None
+    
+    def ensure_session(self):
+        """送出前確認登入狀態（只檢查看門狗旗標，過期才重新登入）"""
+        return self.watchdog.ensure() if self.watchdog else True
+    
+    def session_guard(self):
+        """使用瀏覽器期間阻止看門狗在背景重新登入"""
+        return self.watchdog.hold() if self.watchdog else nullcontext()
+    
+    def save_session(self):
+        """保存目前瀏覽器的登入 cookies"""
+        if self.session_store and self.driver:
+            try:
+                self.session_store.save(self.driver.get_cookies())
+            except Exception as e:
+                logging.warning("保存登入狀態時發生錯誤: %s", e)
+    
+    def restore_session(self):
+        """注入保存的 cookies 並以一次頁面載入驗證是否仍然有效"""
+        if not self.session_store or not self.driver:
+            return False
+        cookies = self.session_store.load()
+        if not cookies:
+            return False
+        
+        started = time.perf_counter()
+        try:
+            # 透過 DevTools 直接寫入 cookies，不需先載入目標網域的頁面
+            self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": [to_cdp_cookie(c) for c in cookies]})
+        except Exception as e:
+            logging.warning("無法透過 DevTools 寫入 cookies: %s", e)
             return False
+        
+        self.driver.get(self.config['course_selection_url'])
+        if self.check_login_status():
+            logging.log(TIMING, "✅ 已恢復保存的登入狀態，耗時 %.2f 秒", time.perf_counter() - started)
+            return True
+        
+        logging.info("保存的登入狀態已失效，需要重新登入")
+        self.session_store.clear()
+        return False
     
     def connect_to_existing_browser(self):
         """連接到已經開啟的Chrome瀏覽器"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        
         try:
             logging.info("正在嘗試連接到已開啟的Chrome瀏覽器...")
             
@@ -277,16 +526,16 @@ class NCKUCourseBot:
             chrome_options.add_experimental_option("debuggerAddress", "127.0.0.1:9222")
             
             # 嘗試連接到現有瀏覽器
-            self.driver = webdriver.Chrome(options=chrome_options)
+            self.driver = instrument_driver(webdriver.Chrome(options=chrome_options))
             
             # 檢查是否成功連接
             current_url = self.driver.current_url
-            logging.info(f"成功連接到現有瀏覽器，當前頁面: {current_url}")
+            logging.info("成功連接到現有瀏覽器，當前頁面: %s", current_url)
             
             return True
             
         except Exception as e:
-            logging.error(f"無法連接到現有瀏覽器: {e}")
+            logging.error("無法連接到現有瀏覽器: %s", e)
             logging.info("连接失败，将返回 False 并继续执行")
             print(f"⚠️  连接现有浏览器失败: {e}")
             print("   程序将尝试开启新浏览器...")
@@ -294,38 +543,36 @@ class NCKUCourseBot:
     
     def start_new_browser(self):
         """開啟新的Chrome瀏覽器"""
+        from selenium import webdriver
+        from browser_profiles import resolve_profile, build_chrome_options, apply_resource_blocking
+        
         try:
             logging.info("正在開啟新的Chrome瀏覽器...")
             
-            chrome_options = Options()
-            
-            # Chrome瀏覽器選項
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
+            # 依配置選擇瀏覽器效能模式（standard / lean）
+            profile = resolve_profile(self.config.get('browser'))
+            profile['user_data_dir'] = self.config.get('session', {}).get('profile_dir')
+            logging.info("瀏覽器配置: %s (headless=%s, page_load_strategy=%s)",
+                         profile['name'], profile['headless'], profile['page_load_strategy'])
+            chrome_options = build_chrome_options(profile)
             
-            # 設定使用者代理
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+            self.driver = instrument_driver(webdriver.Chrome(options=chrome_options))
             
-            # 可選：設定視窗大小
-            chrome_options.add_argument("--window-size=1920,1080")
-            
-            self.driver = webdriver.Chrome(options=chrome_options)
+            # 阻擋非必要資源（驗證碼圖片與腳本永遠放行）
+            apply_resource_blocking(self.driver, profile)
             
             # 隱藏自動化特徵
             self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            self.driver.implicitly_wait(10)
             logging.info("✅ 新的Chrome瀏覽器已開啟")
             
             return True
             
         except Exception as e:
-            logging.error(f"開啟新瀏覽器時發生錯誤: {e}")
+            logging.error("開啟新瀏覽器時發生錯誤: %s", e)
             return False
     
+    @span("browser_start")
     def setup_driver(self):
         """設定瀏覽器驅動，直接開啟新瀏覽器"""
         logging.info("=== 开始设置浏览器驱动 ===")
@@ -346,6 +593,9 @@ class NCKUCourseBot:
         
     def check_login_status(self):
         """檢查是否已經登入並在正確的選課頁面"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
         try:
             # 检查浏览器驱动是否设置
             if not self.driver:
@@ -354,8 +604,8 @@ class NCKUCourseBot:
                 
             current_url = self.driver.current_url
             page_title = self.driver.title
-            logging.info(f"當前頁面標題: {page_title}")
-            logging.info(f"當前頁面URL: {current_url}")
+            logging.info("當前頁面標題: %s", page_title)
+            logging.info("當前頁面URL: %s", current_url)
             
             # 檢查是否在登入頁面
             if "登入" in page_title or "login" in page_title.lower() or "登入" in current_url:
@@ -377,12 +627,12 @@ class NCKUCourseBot:
                 logging.info("✅ 成功載入選課頁面，已登入")
                 return True
             except Exception as e:
-                logging.error(f"無法找到課程表格: {e}")
+                logging.error("無法找到課程表格: %s", e)
                 logging.error("可能未登入或頁面結構有問題")
                 return False
                 
         except Exception as e:
-            logging.error(f"檢查登入狀態時發生錯誤: {e}")
+            logging.error("檢查登入狀態時發生錯誤: %s", e)
             return False
     
     def check_login_status_simple(self):
@@ -390,8 +640,8 @@ class NCKUCourseBot:
         try:
             current_url = self.driver.current_url
             page_title = self.driver.title
-            logging.info(f"簡化檢查 - 頁面標題: {page_title}")
-            logging.info(f"簡化檢查 - 頁面URL: {current_url}")
+            logging.info("簡化檢查 - 頁面標題: %s", page_title)
+            logging.info("簡化檢查 - 頁面URL: %s", current_url)
             
             # 簡單檢查：只要不在登入頁面就認為登入成功
             if "登入" in page_title or "login" in page_title.lower():
@@ -402,13 +652,67 @@ class NCKUCourseBot:
                 return True
                 
         except Exception as e:
-            logging.error(f"簡化登入狀態檢查時發生錯誤: {e}")
+            logging.error("簡化登入狀態檢查時發生錯誤: %s", e)
             return False
     
+    def export_metrics(self):
+        """設定 metrics.enabled 時寫出本次執行的追蹤檔與 Prometheus 指標"""
+        metrics_config = self.config.get('metrics', {})
+        if not metrics_config.get('enabled'):
+            return None
+        try:
+            paths = write_metrics(metrics_config.get('directory', 'metrics'))
+            logging.info("效能指標已寫入: %s", ", ".join(paths))
+            return paths
+        except OSError as e:
+            logging.warning("寫入效能指標失敗: %s", e)
+            return None
+    
+    def save_failure_artifacts(self, name):
+        """選課失敗時在背景保存頁面 HTML（與截圖），供事後分析"""
+        artifacts_config = self.config.get('artifacts', {})
+        if not self.artifacts or not self.driver:
+            return
+        try:
+            if artifacts_config.get('page_on_failure', True):
+                self.artifacts.submit(f"page_{name}", self.driver.page_source, "html")
+            if artifacts_config.get('screenshot_on_failure', False):
+                self.artifacts.submit(f"screen_{name}", self.driver.get_screenshot_as_png(), "png")
+        except Exception as e:
+            logging.warning("保存失敗頁面時發生錯誤: %s", e)
+    
+    def refresh_course_table(self):
+        """以單次 execute_script 重新建立課程表格快照"""
+        try:
+            self.course_table = CourseTable.snapshot(self.driver)
+        except Exception as e:
+            logging.error("建立課程表格快照時發生錯誤: %s", e)
+            self.course_table = None
+        return self.course_table
+    
     def check_course_exists(self, course):
         """檢查特定課程是否存在於頁面中"""
         try:
-            logging.info(f"正在檢查課程: {course['course_name']}")
+            logging.info("正在檢查課程: %s", course['course_name'])
+            
+            # 優先使用課程表格快照（O(1) 查找，不需額外 WebDriver 往返）
+            if self.course_table is None:
+                self.refresh_course_table()
+            if self.course_table is not None:
+                entry = self.course_table.lookup(course)
+                if entry is not None:
+                    logging.info("✅ 快照中找到課程: %s-%s", course['department_code'], course['course_number'])
+                    logging.debug("課程行資訊: %s", entry['cells'])
+                    course['course_row'] = entry['row']
+                    if entry.get('button') is not None:
+                        course['select_button'] = entry['button']
+                        logging.info("選課按鈕文字: %s, 是否可用: %s", entry['button_text'], entry['button_enabled'])
+                    else:
+                        logging.warning("未找到選課按鈕: %s", course['course_name'])
+                    course['seats'] = entry.get('seats')
+                    course['button_data'] = entry.get('button_data') or {}
+                    return True
+                logging.info("快照中未找到課程，改用頁面搜尋")
             
             # 嘗試多種方式查找課程
             course_found = False
@@ -416,34 +720,32 @@ class NCKUCourseBot:
             
             # 方法1: 通過課程名稱查找
             try:
-                course_name_xpath = f"//td[contains(text(), '{course['course_name']}')]"
-                course_element = self.driver.find_element(By.XPATH, course_name_xpath)
-                logging.info(f"✅ 找到課程: {course['course_name']}")
+                course_element = self.driver.find_element(By.XPATH, course['name_xpath'])
+                logging.info("✅ 找到課程: %s", course['course_name'])
                 course_found = True
                 
                 # 獲取該行的完整資訊
                 course_row = course_element.find_element(By.XPATH, "./..")
                 row_text = course_row.text
-                logging.info(f"課程行資訊: {row_text}")
+                logging.debug("課程行資訊: %s", row_text)
                 
             except Exception as e:
-                logging.info(f"通過課程名稱未找到: {course['course_name']}")
+                logging.info("通過課程名稱未找到: %s", course['course_name'])
             
             # 方法2: 通過系所代碼和課程編號查找
             if not course_found:
                 try:
-                    course_code_xpath = f"//td[contains(text(), '{course['department_code']}') and contains(text(), '{course['course_number']}')]"
-                    course_element = self.driver.find_element(By.XPATH, course_code_xpath)
-                    logging.info(f"✅ 通過代碼找到課程: {course['department_code']}-{course['course_number']}")
+                    course_element = self.driver.find_element(By.XPATH, course['code_xpath'])
+                    logging.info("✅ 通過代碼找到課程: %s-%s", course['department_code'], course['course_number'])
                     course_found = True
                     
                     # 獲取該行的完整資訊
                     course_row = course_element.find_element(By.XPATH, "./..")
                     row_text = course_row.text
-                    logging.info(f"課程行資訊: {row_text}")
+                    logging.debug("課程行資訊: %s", row_text)
                     
                 except Exception as e:
-                    logging.info(f"通過代碼未找到: {course['department_code']}-{course['course_number']}")
+                    logging.info("通過代碼未找到: %s-%s", course['department_code'], course['course_number'])
             
             # 方法3: 檢查是否有選課按鈕
             if course_found and course_row:
@@ -451,55 +753,63 @@ class NCKUCourseBot:
                     # 查找該課程行中的選課按鈕
                     select_button_xpath = f".//button[contains(text(), '選課')]"
                     select_button = course_row.find_element(By.XPATH, select_button_xpath)
-                    logging.info(f"✅ 找到選課按鈕: {course['course_name']}")
+                    logging.info("✅ 找到選課按鈕: %s", course['course_name'])
                     
                     # 檢查按鈕狀態
                     button_text = select_button.text
                     button_enabled = select_button.is_enabled()
-                    logging.info(f"選課按鈕文字: {button_text}, 是否可用: {button_enabled}")
+                    logging.info("選課按鈕文字: %s, 是否可用: %s", button_text, button_enabled)
                     
                     # 將課程行和選課按鈕資訊保存到課程物件中
                     course['course_row'] = course_row
                     course['select_button'] = select_button
                     
                 except Exception as e:
-                    logging.warning(f"未找到選課按鈕: {course['course_name']}")
+                    logging.warning("未找到選課按鈕: %s", course['course_name'])
             
             return course_found
             
         except Exception as e:
-            logging.error(f"檢查課程 {course['course_name']} 時發生錯誤: {e}")
+            logging.error("檢查課程 %s 時發生錯誤: %s", course['course_name'], e)
             return False
     
     def select_course(self, course):
         """選課功能：點擊選課按鈕，等待驗證碼輸入，點擊確認"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
         try:
-            logging.info(f"開始選課流程: {course['course_name']}")
+            logging.info("開始選課流程: %s", course['course_name'])
+            self.last_outcome = SelectionOutcome.UNKNOWN
             
             # 檢查是否有選課按鈕
             if 'select_button' not in course:
-                logging.error(f"課程 {course['course_name']} 沒有選課按鈕")
+                logging.error("課程 %s 沒有選課按鈕", course['course_name'])
                 return False
             
             select_button = course['select_button']
             
             # 檢查按鈕是否可用
             if not select_button.is_enabled():
-                logging.warning(f"選課按鈕不可用: {course['course_name']}")
+                # 按鈕不可用：沒有餘額代表已額滿，否則視為尚未開放
+                self.last_outcome = (SelectionOutcome.COURSE_FULL if remaining_seats(course.get('seats')) == 0
+                                     else SelectionOutcome.NOT_YET_OPEN)
+                logging.warning("選課按鈕不可用: %s (%s)", course['course_name'], self.last_outcome.value)
                 return False
             
             # 點擊選課按鈕
-            logging.info(f"點擊選課按鈕: {course['course_name']}")
+            logging.info("點擊選課按鈕: %s", course['course_name'])
             select_button.click()
             
             # 等待頁面變化並尋找驗證碼相關元素
             logging.info("等待驗證碼相關元素出現...")
             try:
-                # 等待一下讓頁面載入
-                time.sleep(1)
+                # 等待選課彈窗出現
+                self.waiter.wait_for_modal()
                 
                 # 檢查是否出現了驗證碼輸入框或其他相關元素
                 verification_found = False
+                captcha_text = None
                 
                 # 嘗試多種可能的驗證碼輸入框定位方式
                 verification_input = None
@@ -608,97 +918,61 @@ class NCKUCourseBot:
                     logging.warning("未找到驗證碼相關元素，可能不需要驗證碼或頁面結構不同")
                     print("⚠️  未找到驗證碼輸入框，可能不需要驗證碼")
                     # 直接嘗試尋找確認按鈕
-                    input("請檢查頁面是否需要其他操作，然後按 Enter 繼續...")
+                    self.interaction.wait_for_human("選課頁面未出現驗證碼", "請檢查頁面是否需要其他操作，然後按 Enter 繼續...")
                 else:
                     # 尝试自动识别验证码
                     if self.captcha_solver and self.config.get('verification', {}).get('auto_captcha', True):
                         print(f"\n🤖 正在使用AI自动识别课程 '{course['course_name']}' 的验证码...")
                         
-                        # 等待页面稳定
-                        time.sleep(1)
+                        # 等待验证码图片载入完成
+                        self.waiter.wait_for_captcha_image(timeout=5)
                         
-                        # 自动识别并填写验证码
-                        if self.captcha_solver.auto_solve_captcha(self.driver):
-                            print("✅ AI成功识别并填写验证码！")
-                            logging.info(f"AI自动识别课程 {course['course_name']} 验证码成功")
+                        # 自动识别验证码，稍后与点击确认在同一次脚本呼叫中填入
+                        captcha_text = self.captcha_solver.recognize_captcha(self.driver)
+                        if captcha_text:
+                            print("✅ AI成功识别验证码！")
+                            logging.info("AI自动识别课程 %s 验证码成功", course['course_name'])
                         else:
                             print("❌ AI识别验证码失败，请手动输入")
-                            logging.warning(f"AI识别课程 {course['course_name']} 验证码失败，切换到手动模式")
-                            print(f"📝 請在瀏覽器中為課程 '{course['course_name']}' 輸入驗證碼")
-                            print("⏰ 程式會等待 5 秒讓你輸入驗證碼...")
-                            time.sleep(5)
-                    else:
-                        # 如果找到驗證碼相關元素，給用戶時間輸入
-                        print(f"\n📝 請在瀏覽器中為課程 '{course['course_name']}' 輸入驗證碼")
-                        print("⏰ 程式會等待 2 秒讓你輸入驗證碼...")
-                        print("🔍 如果看到驗證碼輸入框，請立即輸入驗證碼")
-                        
-                        # 等待 2 秒讓使用者輸入驗證碼
-                        time.sleep(2)
-                    
-                    print("⏱️  時間到！程式將嘗試點擊確認按鈕...")
-                
-                # 查找確認按鈕
-                confirm_button = None
-                
-                # 嘗試多種可能的確認按鈕定位方式
-                try:
-                    # 方法1: 通過確切的 class 名稱查找（根據提供的 HTML）
-                    confirm_button = self.driver.find_element(By.XPATH, "//button[contains(@class, 'addcourse_confirm_save_button')]")
-                    logging.info("找到確認按鈕 (方法1: 特定class)")
-                except:
-                    pass
-                
-                # 方法2: 通過文字內容查找
-                if not confirm_button:
-                    try:
-                        confirm_button = self.driver.find_element(By.XPATH, "//button[contains(text(), '確定') or contains(text(), '確認') or contains(text(), '提交')]")
-                        logging.info("找到確認按鈕 (方法2: 文字)")
-                    except:
-                        pass
+                            logging.warning("AI识别课程 %s 验证码失败，切换到手动模式", course['course_name'])
+                    if not captcha_text:
+                        # 依介入策略等待使用者在瀏覽器中輸入驗證碼，送出時只點擊確認
+                        captcha_text = None
+                        if not self.wait_for_course_captcha(course, verification_input):
+                            logging.warning("等待手動輸入驗證碼逾時: %s", course['course_name'])
+                            return False
+                        print("⏱️  程式將嘗試點擊確認按鈕...")
                 
-                # 方法3: 通過 class 包含 confirm 查找
-                if not confirm_button:
-                    try:
-                        confirm_button = self.driver.find_element(By.XPATH, "//button[contains(@class, 'confirm') or contains(@class, 'save')]")
-                        logging.info("找到確認按鈕 (方法3: 通用class)")
-                    except:
-                        pass
-                
-                # 方法4: 通過按鈕類型和樣式查找（btn btn-danger）
-                if not confirm_button:
-                    try:
-                        confirm_button = self.driver.find_element(By.XPATH, "//button[@type='button' and contains(@class, 'btn-danger')]")
-                        logging.info("找到確認按鈕 (方法4: 按鈕樣式)")
-                    except:
-                        pass
-                
-                # 方法5: 通過 data-dismiss 屬性查找
-                if not confirm_button:
-                    try:
-                        confirm_button = self.driver.find_element(By.XPATH, "//button[@data-dismiss='modal' and contains(text(), '確定')]")
-                        logging.info("找到確認按鈕 (方法5: modal)")
-                    except:
-                        pass
+                # 先清空網路日誌並安裝結果觀察器，再送出，避免錯過結果
+                network_reader = NetworkResultReader(self.driver)
+                network_available = network_reader.reset()
+                if self.recorder:
+                    self.recorder.record_page(self.driver, "modal")
+                    # 驗證碼在送出時才填入，識別結果直接記錄；手動輸入時讀取輸入框
+                    self.recorder.record_captcha(self.driver, "//input[@name='cos_qry_confirm_validation_code']",
+                                                 answer=captcha_text)
+                self.waiter.arm_result_observer()
                 
-                if not confirm_button:
+                # 一次腳本呼叫完成填入驗證碼、觸發 input/change 事件、尋找並點擊確認按鈕
+                submit_mode = self.config.get('verification', {}).get('submit_mode', 'script')
+                logging.info("點擊確認按鈕完成選課")
+                with span("confirm", mode=submit_mode):
+                    submitted = submit_captcha(self.driver, captcha_text, submit_mode, verification_input)
+                if captcha_text is not None and not submitted["filled"]:
+                    logging.error("無法填入驗證碼")
+                    return False
+                if not submitted["clicked"]:
                     logging.error("無法找到確認按鈕")
                     return False
                 
-                # 點擊確認按鈕
-                logging.info("點擊確認按鈕完成選課")
-                
-                # 嘗試滾動到按鈕位置
-                try:
-                    self.driver.execute_script("arguments[0].scrollIntoView(true);", confirm_button)
-                    time.sleep(1)
-                except:
-                    pass
-                
-                confirm_button.click()
-                
-                # 等待選課結果
-                time.sleep(3)
+                # 優先讀取加選請求的回應，無法取得時才等待頁面上的結果訊息
+                with span("result_detection"):
+                    response = network_reader.wait_for_response(timeout=5) if network_available else None
+                    result_message = None
+                    if response is None:
+                        result_message = self.waiter.wait_for_result_message(timeout=5)
+                if self.recorder and network_reader.last_body is not None:
+                    self.recorder.record_response(network_reader.last_body)
                 
                 # 檢查並關閉可能的彈出視窗
                 try:
@@ -707,61 +981,152 @@ class NCKUCourseBot:
                     for btn in close_buttons:
                         if btn.is_displayed():
                             btn.click()
-                            time.sleep(1)
                             break
                 except:
                     pass
                 
-                # 檢查選課是否成功
-                try:
-                    # 檢查是否有成功訊息
-                    success_message = self.driver.find_element(By.XPATH, "//*[contains(text(), '成功') or contains(text(), '完成') or contains(text(), '已選')]")
-                    logging.info(f"✅ 選課成功: {course['course_name']}")
+                # 以加選回應判斷；無法辨識的回應視為失敗，不再猜測成功
+                if response is not None:
+                    success, message = response
+                    self.last_outcome = classify_result(success, message)
+                    if success:
+                        logging.info("✅ 選課成功: %s - %s", course['course_name'], message)
+                        print(f"🎉 課程 '{course['course_name']}' 選課成功！")
+                    else:
+                        logging.warning("選課失敗: %s - %s", course['course_name'], message)
+                        print(f"❌ 課程 '{course['course_name']}' 選課失敗")
+                    return bool(success)
+                
+                # 其次以觀察到的結果訊息判斷（與加選回應使用同一個解析器）
+                observed = parse_result_text(result_message)[0] if result_message else None
+                if observed is False:
+                    self.last_outcome = classify_result(False, result_message)
+                    logging.warning("選課失敗: %s - %s", course['course_name'], result_message)
+                    print(f"❌ 課程 '{course['course_name']}' 選課失敗")
+                    return False
+                if observed is True:
+                    self.last_outcome = SelectionOutcome.SUCCESS
+                    logging.info("✅ 選課成功: %s - %s", course['course_name'], result_message)
                     print(f"🎉 課程 '{course['course_name']}' 選課成功！")
                     return True
-                except:
-                    # 檢查是否有錯誤訊息
-                    try:
-                        error_message = self.driver.find_element(By.XPATH, "//*[contains(text(), '失敗') or contains(text(), '錯誤') or contains(text(), '已滿')]")
-                        logging.warning(f"選課失敗: {course['course_name']} - {error_message.text}")
-                        print(f"❌ 課程 '{course['course_name']}' 選課失敗")
-                        return False
-                    except:
-                        logging.info(f"選課完成，但無法確定結果: {course['course_name']}")
-                        print(f"⚠️  課程 '{course['course_name']}' 選課完成，請檢查結果")
-                        return True
                 
+                # 加選回應與結果訊息都沒有答案：視為未選上，交給佇列或監控重試
+                self.last_outcome = SelectionOutcome.UNKNOWN
+                logging.warning("無法確定選課結果，視為未選上: %s", course['course_name'])
+                print(f"⚠️  課程 '{course['course_name']}' 無法確定選課結果，將視為未選上")
+                return False
+                
+            except HumanInputRequired:
+                raise
             except Exception as e:
-                logging.error(f"選課過程中發生錯誤: {e}")
+                logging.error("選課過程中發生錯誤: %s", e)
                 return False
                 
+        except HumanInputRequired:
+            raise
         except Exception as e:
-            logging.error(f"選課 {course['course_name']} 時發生錯誤: {e}")
+            logging.error("選課 %s 時發生錯誤: %s", course['course_name'], e)
             return False
     
+    def select_course_http(self, course):
+        """以 HTTP 請求直接選課，回應非預期時改走瀏覽器流程"""
+        result = None
+        if self.captcha_solver:
+            try:
+                if self.http_engine is None:
+                    self.http_engine = load_optional_module('http_engine').HttpCourseEngine.from_driver(self.driver, self.config)
+                logging.info("使用 HTTP 快速通道選課: %s", course['course_name'])
+                result = self.http_engine.select_course(course, self.captcha_solver)
+                self.last_outcome = self.http_engine.last_outcome
+            except Exception as e:
+                logging.error("HTTP 選課時發生錯誤: %s", e)
+                result = None
+        else:
+            logging.warning("HTTP 快速通道需要驗證碼識別器")
+        
+        if result is None:
+            logging.warning("HTTP 選課回應非預期，改用瀏覽器流程: %s", course['course_name'])
+            return self.select_course(course)
+        
+        if result:
+            logging.info("✅ 選課成功: %s", course['course_name'])
+            print(f"🎉 課程 '{course['course_name']}' 選課成功！")
+        else:
+            logging.warning("選課失敗: %s", course['course_name'])
+            print(f"❌ 課程 '{course['course_name']}' 選課失敗")
+        return result
+    
     def select_all_courses(self):
         """選取所有配置的課程"""
         logging.info("開始選取所有配置的課程...")
         
         if 'courses' not in self.config or not self.config['courses']:
             logging.warning("配置檔案中沒有課程資訊")
-            return
+            return {}
         
         total_courses = len(self.config['courses'])
-        selected_courses = 0
+        courses = self.config['courses']
+        results = {}
+        self.course_outcomes = {}
         
         print(f"\n=== 開始選課 ===")
         print(f"總共需要選取 {total_courses} 門課程")
         
-        for i, course in enumerate(self.config['courses'], 1):
-            print(f"\n[{i}/{total_courses}] 選取課程: {course['course_name']}")
+        # 多分頁並行模式：每門課程一個分頁，驗證碼識別同時進行
+        if self.config.get('selection', {}).get('concurrent_tabs') and self.captcha_solver:
+            print("🗂️  使用多分頁並行選課")
+            from tab_selection import TabSelector
+            selector = TabSelector(self.driver, self.captcha_solver, self.config['course_selection_url'])
+            results = selector.select_all(courses)
+            self.course_outcomes = dict(selector.outcomes)
+            # 並行分頁每門課程只嘗試一次：未選上且仍可能選上的課程交給佇列，在原分頁依重試策略繼續
+            courses = [c for c in courses if not results.get(c['label'])
+                       and self.course_outcomes.get(c['label'])
+                       not in (SelectionOutcome.COURSE_FULL, SelectionOutcome.TIME_CONFLICT)]
+            if courses:
+                logging.info("多分頁選課後仍有 %d 門課程可重試，交由選課佇列處理", len(courses))
+                self.refresh_course_table()
+                for course in courses:
+                    self.check_course_exists(course)
+        
+        use_http = self.config.get('http_engine', {}).get('enabled', False) and load_optional_module('http_engine') is not None
+        select = self.select_course_http if use_http else self.select_course
+        
+        last_outcomes = {}
+        
+        def attempt(course, attempt_number):
+            print(f"\n選取課程: {course['course_name']}（第 {attempt_number} 次）")
             print(f"系所代碼: {course['department_code']}, 課程編號: {course['course_number']}")
             
-            if self.select_course(course):
-                selected_courses += 1
-                print(f"✅ 選課成功")
-            else:
-                print(f"❌ 選課失敗")
+            # 重試前重新讀取課程表格，取得最新的按鈕狀態
+            if attempt_number > 1 and not use_http:
+                # 尚未開放時按鈕只會在重新載入頁面後改變
+                if last_outcomes.get(course['label']) is SelectionOutcome.NOT_YET_OPEN:
+                    self.driver.refresh()
+                    self.waiter.wait_for_element("//table")
+                self.refresh_course_table()
+                if not self.check_course_exists(course):
+                    return False
+            
+            self.last_outcome = SelectionOutcome.UNKNOWN
+            with span("select_course", course=course['label'], attempt=attempt_number):
+                success = bool(select(course))
+            if not success:
+                self.save_failure_artifacts(course['label'])
+            print("✅ 選課成功" if success else f"❌ 選課失敗（{self.last_outcome.value}）")
+            last_outcomes[course['label']] = SelectionOutcome.SUCCESS if success else self.last_outcome
+            return last_outcomes[course['label']]
+        
+        def relogin():
+            logging.warning("選課時發現 session 已過期，重新登入...")
+            return self.auto_login()
+        
+        # 依優先級與截止時間排程，失敗的課程依結果分類決定是否重試
+        if courses:
+            queue = CourseQueue(courses, self.config.get('retry'))
+            results.update(queue.run(attempt, on_session_expired=relogin))
+            self.course_outcomes.update(queue.outcomes())
+        selected_courses = sum(results.values())
         
         print(f"\n=== 選課完成 ===")
         print(f"成功選取 {selected_courses}/{total_courses} 門課程")
@@ -770,6 +1135,58 @@ class NCKUCourseBot:
             print("🎉 所有課程都已成功選取！")
         else:
             print("⚠️  部分課程選課失敗，請檢查原因")
+        
+        return results
+    
+    def select_at_opening(self):
+        """開放時重新整理課程頁，取得最新按鈕狀態後立即選課"""
+        self.ensure_session()
+        with self.session_guard():
+            self.driver.refresh()
+            self.waiter.wait_for_element("//table")
+            self.check_all_courses()
+            return self.select_all_courses()
+    
+    def run_at_opening_time(self):
+        """依伺服器時鐘在開放時間準時開始選課"""
+        schedule_config = self.config['schedule']
+        opening_time = parse_opening_time(schedule_config['opening_time'])
+        
+        # 估算本機與選課伺服器的時鐘偏差
+        clock = ServerClock(self.config['course_selection_url'], samples=schedule_config.get('clock_samples', 8))
+        clock.estimate()
+        
+        scheduler = PrecisionScheduler(clock, schedule_config.get('spin_window_ms', 20) / 1000)
+        print(f"⏰ 將於伺服器時間 {schedule_config['opening_time']} 開始選課（時鐘偏差 {clock.offset * 1000:+.0f} ms）")
+        
+        # 預備提交：開放前先點選課、識別並填入驗證碼，T0 只送出確認
+        prearm_seconds = schedule_config.get('prearm_seconds', 0)
+        if prearm_seconds and self.captcha_solver and self.config.get('courses'):
+            scheduler.sleep_until(opening_time - prearm_seconds)
+            print(f"🎯 開放前 {prearm_seconds} 秒，預備提交所有課程...")
+            self.ensure_session()
+            from tab_selection import TabSelector
+            selector = TabSelector(self.driver, self.captcha_solver, self.config['course_selection_url'])
+            # 從預備到送出都持有鎖：背景重新登入會離開已填好驗證碼的分頁
+            with self.session_guard():
+                try:
+                    selector.prearm(self.config['courses'])
+                    results = scheduler.fire_at(opening_time, selector.fire_armed, self.config['courses'])
+                finally:
+                    selector.close_tabs()
+            self.course_outcomes = dict(selector.outcomes)
+            return results
+        
+        return scheduler.fire_at(opening_time, self.select_at_opening)
+    
+    def watch_courses(self, courses=None):
+        """監控已滿課程的餘額，一出現空位立即選課"""
+        courses = courses if courses is not None else self.config.get('courses', [])
+        if not courses:
+            logging.info("沒有需要監控的課程")
+            return {}
+        watcher = SeatWatcher(self, courses, self.config.get('watch'))
+        return watcher.run()
     
     def check_all_courses(self):
         """檢查所有配置的課程"""
@@ -782,6 +1199,9 @@ class NCKUCourseBot:
         total_courses = len(self.config['courses'])
         found_courses = 0
         
+        # 一次取得整個課程表格，後續每門課程都只是字典查找
+        self.refresh_course_table()
+        
         print(f"\n=== 課程檢查結果 ===")
         print(f"總共需要檢查 {total_courses} 門課程")
         
@@ -803,8 +1223,21 @@ class NCKUCourseBot:
         else:
             print("⚠️  部分課程未找到，請檢查課程資訊或選課時間")
     
-    def auto_course_selection(self):
-        """自動選課功能 - 完整流程"""
+    def login_failure_code(self):
+        """登入失敗的結束代碼（因介入策略無法等待人工時為 NEEDS_HUMAN）"""
+        return ExitCode.NEEDS_HUMAN if self.interaction.blocked else ExitCode.LOGIN_FAILED
+    
+    def auto_course_selection(self, watch_only=False):
+        """
+        自動選課功能 - 完整流程
+        
+        Args:
+            watch_only (bool): 跳過第一輪選課，直接監控所有課程的餘額
+        
+        Returns:
+            ExitCode: 結束代碼
+        """
+        profiler = SamplingProfiler(self.profile_output).start() if self.profile_output else None
         try:
             logging.info("開始自動選課流程...")
             print("🤖 開始自動選課流程...")
@@ -815,20 +1248,22 @@ class NCKUCourseBot:
                 logging.info("✅ 浏览器驱动设置成功")
                 print("✅ 浏览器驱动设置成功")
             except Exception as e:
-                logging.error(f"设置浏览器驱动失败: {e}")
+                logging.error("设置浏览器驱动失败: %s", e)
                 print(f"❌ 无法设置浏览器驱动: {e}")
-                return
+                return ExitCode.BROWSER_FAILED
             
             # 检查浏览器驱动是否设置成功
             if not self.driver:
                 logging.error("浏览器驱动未设置，无法继续")
                 print("❌ 浏览器驱动未设置，无法继续")
-                return
+                return ExitCode.BROWSER_FAILED
             
             # 步骤2: 检查是否需要登录
             print("\n📋 步骤1: 检查登录状态...")
             try:
-                if self.check_login_status():
+                if self.restore_session():
+                    print("✅ 已恢復保存的登入狀態，跳过登录步骤")
+                elif self.check_login_status():
                     print("✅ 已登录，跳过登录步骤")
                     logging.info("用户已登录，跳过登录步骤")
                 else:
@@ -836,35 +1271,76 @@ class NCKUCourseBot:
                     if not self.auto_login():
                         print("❌ 自动登录失败")
                         logging.error("自动登录失败")
-                        return
+                        return self.login_failure_code()
                     print("✅ 自动登录成功")
                     
             except Exception as e:
                 print("🔐 登录状态检查失败，尝试自动登录...")
-                logging.warning(f"登录状态检查失败: {e}")
+                logging.warning("登录状态检查失败: %s", e)
                 if not self.auto_login():
                     print("❌ 自动登录失败")
                     logging.error("自动登录失败")
-                    return
+                    return self.login_failure_code()
                 print("✅ 自动登录成功")
             
-            # 步骤3: 检查所有课程
-            print("\n📚 步骤2: 检查课程...")
-            self.check_all_courses()
+            # 等待開放或監控期間，由看門狗在背景維持登入狀態
+            watch_enabled = watch_only or self.config.get('watch', {}).get('enabled')
+            if self.config.get('schedule', {}).get('opening_time') or watch_enabled:
+                self.start_watchdog()
             
-            # 步骤4: 自动选课
-            print("\n🎯 步骤3: 开始自动选课...")
-            self.select_all_courses()
-            
-            # 保持瀏覽器開啟一段時間，讓你可以查看結果
+            # 步骤3: 检查所有课程（使用瀏覽器期間不讓看門狗在背景重新登入）
+            print("\n📚 步骤2: 检查课程...")
+            self.ensure_session()
+            with self.session_guard():
+                self.check_all_courses()
+            
+            # 步骤4: 自动选课（有設定開放時間時，依伺服器時間準時開始）
+            if watch_only:
+                results = {c['label']: False for c in self.config['courses']}
+            elif self.config.get('schedule', {}).get('opening_time'):
+                print("\n🎯 步骤3: 开始自动选课...")
+                results = self.run_at_opening_time()
+            else:
+                print("\n🎯 步骤3: 开始自动选课...")
+                self.ensure_session()
+                with self.session_guard():
+                    results = self.select_all_courses()
+            results = dict(results or {})
+            self.last_results = results
+            
+            # 步骤5: 監控未選上的課程，出現空位立即選課
+            if watch_enabled and results:
+                # 額滿的課程交給監控；衝堂等無望的課程不監控
+                remaining = [c for c in self.config['courses']
+                             if not results.get(c['label'])
+                             and self.course_outcomes.get(c['label'])
+                             in (None, SelectionOutcome.COURSE_FULL, SelectionOutcome.UNKNOWN)]
+                if remaining:
+                    print("\n👀 步骤4: 監控未選上課程的餘額...")
+                    for label, success in self.watch_courses(remaining).items():
+                        results[label] = results.get(label) or success
+            logging.log(TIMING, "頁面等待共 %d 次，總耗時 %.2f 秒", self.waiter.wait_count, self.waiter.total_elapsed())
+            
+            # 保持瀏覽器開啟一段時間，讓你可以查看結果（不再需要背景維持登入）
             print("\n🎉 自动选课流程完成！")
-            print("按Enter鍵關閉瀏覽器...")
-            input()
+            self.stop_watchdog()
+            self.interaction.pause("按Enter鍵關閉瀏覽器...")
+            return selection_exit_code(results)
             
+        except HumanInputRequired as e:
+            logging.error("自动选课需要人工操作: %s", e)
+            return ExitCode.NEEDS_HUMAN
         except Exception as e:
-            logging.error(f"自动选课过程中发生错误: {e}")
+            logging.error("自动选课过程中发生错误: %s", e)
             print(f"\n❌ 自动选课过程中发生错误: {e}")
+            return ExitCode.ERROR
         finally:
+            self.stop_watchdog()
+            self.export_metrics()
+            if self.artifacts:
+                self.artifacts.close()
+            if profiler:
+                profiler.stop()
             if self.driver:
                 logging.info("正在關閉瀏覽器...")
                 print("正在關閉瀏覽器...")
@@ -882,7 +1358,7 @@ class NCKUCourseBot:
                 self.setup_driver()
                 logging.info("✅ 浏览器驱动设置成功")
             except Exception as e:
-                logging.error(f"设置浏览器驱动失败: {e}")
+                logging.error("设置浏览器驱动失败: %s", e)
                 print(f"❌ 无法设置浏览器驱动: {e}")
                 return
             
@@ -893,7 +1369,7 @@ class NCKUCourseBot:
                     print("⚠️  登录检查失败，但程序将继续执行...")
                     # 不直接返回，让程序继续执行
             except Exception as e:
-                logging.error(f"检查登录状态时发生错误: {e}")
+                logging.error("检查登录状态时发生错误: %s", e)
                 print(f"⚠️  检查登录状态时发生错误: {e}")
                 print("程序将继续执行...")
             
@@ -901,11 +1377,10 @@ class NCKUCourseBot:
             self.check_all_courses()
             
             # 保持瀏覽器開啟一段時間，讓你可以查看結果
-            print("\n按Enter鍵關閉瀏覽器...")
-            input()
+            self.interaction.pause("\n按Enter鍵關閉瀏覽器...")
             
         except Exception as e:
-            logging.error(f"測試過程中發生錯誤: {e}")
+            logging.error("測試過程中發生錯誤: %s", e)
             print(f"\n❌ 測試過程中發生錯誤: {e}")
         finally:
             if self.driver:
@@ -915,14 +1390,52 @@ class NCKUCourseBot:
     
     def close(self):
         """關閉瀏覽器"""
+        if self.artifacts:
+            self.artifacts.close()
         try:
             if hasattr(self, 'driver') and self.driver:
                 self.driver.quit()
                 logging.info("✅ 瀏覽器已關閉")
         except Exception as e:
-            logging.error(f"關閉瀏覽器時發生錯誤: {e}")
+            logging.error("關閉瀏覽器時發生錯誤: %s", e)
 
-def main():
+def run_bot(bot, watch_only=False):
+    """
+    依配置執行選課（設定開放時間且啟用瀏覽器池時使用預熱的瀏覽器）
+    
+    Args:
+        bot (NCKUCourseBot): 機器人
+        watch_only (bool): 只監控餘額，不執行第一輪選課
+    
+    Returns:
+        ExitCode: 結束代碼
+    """
+    if not watch_only and bot.config.get('pool', {}).get('enabled') and bot.config.get('schedule', {}).get('opening_time'):
+        # 開放時間前預熱已登入的瀏覽器，開放時直接選課
+        print("🔥 使用預熱瀏覽器池，等待開放時間...")
+        
+        def create_bot():
+            pooled = NCKUCourseBot(bot.config_file)
+            pooled.interaction = bot.interaction
+            return pooled
+        
+        try:
+            results = run_with_pool(create_bot, bot.config)
+        except HumanInputRequired as e:
+            logging.error("預熱瀏覽器選課需要人工操作: %s", e)
+            return ExitCode.NEEDS_HUMAN
+        if results is None:
+            return ExitCode.NEEDS_HUMAN if bot.interaction.blocked else ExitCode.BROWSER_FAILED
+        return selection_exit_code(results)
+    return bot.auto_course_selection(watch_only=watch_only)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NCKU 自動選課系統")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--profile", nargs="?", const="profile.folded", default=None,
+                        help="自動選課期間取樣分析，輸出 collapsed stack（可繪製火焰圖）")
+    args = parser.parse_args(argv)
+    
     print("=== NCKU 自動選課系統 ===")
     print("🤖 此程序将自动完成以下步骤：")
     print("   1. 开启浏览器")
@@ -934,20 +1447,27 @@ def main():
     print("   - 使用 GPT-4o-mini 模型")
     print("   - 自动验证码识别已启用")
     print("   - 智能浏览器管理")
-    print("\n按Enter鍵開始自動選課...")
     
     try:
-        input()
+        # 沒有終端（排程或背景執行）時不等待 Enter
+        InteractionPolicy().pause("\n按Enter鍵開始自動選課...")
         print("🚀 開始執行自動選課...")
         
-        bot = NCKUCourseBot()
-        bot.auto_course_selection()
+        bot = NCKUCourseBot(args.config)
+        if args.profile:
+            bot.profile_output = args.profile
+        return run_bot(bot)
         
     except KeyboardInterrupt:
         print("\n程式被使用者中斷")
+        return ExitCode.INTERRUPTED
+    except ConfigError as e:
+        print(f"\n❌ 設定檔錯誤: {e}")
+        return ExitCode.CONFIG_ERROR
     except Exception as e:
         print(f"\n❌ 主程式執行錯誤: {e}")
-        logging.error(f"主程式執行錯誤: {e}")
+        logging.error("主程式執行錯誤: %s", e)
+        return ExitCode.ERROR
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
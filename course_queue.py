@@ -0,0 +1,198 @@
+"""
+选课队列模块
+依优先级与截止时间安排选课，失败的课程以有限退避重新排入，并记录每门课程的尝试时间线
+"""
+
+import itertools
+import logging
+import time
+
+from interaction import HumanInputRequired
+from log_setup import TIMING
+from result_parser import IMMEDIATE_RETRY, SelectionOutcome
+from start_scheduler import parse_opening_time
+
+
+class CourseTask:
+    """队列中的一门课程"""
+
+    def __init__(self, course, order, priority=0, max_attempts=3, deadline=None):
+        """
+        初始化课程任务
+
+        Args:
+            course (dict): 配置中的课程
+            order (int): 在配置中的顺序（同优先级时先到先选）
+            priority (int): 优先级，数字越大越先选
+            max_attempts (int): 最多尝试次数
+            deadline (float, optional): 截止时间（epoch 秒），超过后不再尝试
+        """
+        self.course = course
+        self.order = order
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.next_at = 0.0
+        self.attempts = []
+        self.succeeded = False
+        self.outcome = None
+        self.gave_up = False
+
+    @property
+    def label(self):
+        return self.course.get('label') or f"{self.course['department_code']}-{self.course['course_number']}"
+
+    def can_retry(self, now):
+        """是否还能再尝试"""
+        if self.succeeded or self.gave_up or len(self.attempts) >= self.max_attempts:
+            return False
+        return self.deadline is None or now < self.deadline
+
+    def sort_key(self):
+        # 优先级高者优先；同优先级时尚未尝试过的课程先于重试
+        return (-self.priority, len(self.attempts), self.order)
+
+
+class CourseQueue:
+    """依优先级与截止时间执行选课并重试"""
+
+    def __init__(self, courses, retry_config=None):
+        """
+        初始化选课队列
+
+        Args:
+            courses (list): 配置中的课程（可含 priority、max_attempts、deadline 字段）
+            retry_config (dict, optional): config.json 中的 retry 区块
+        """
+        retry_config = retry_config or {}
+        self.base_backoff = retry_config.get('base_backoff', 0.2)
+        self.max_backoff = retry_config.get('max_backoff', 2)
+        default_attempts = retry_config.get('max_attempts', 3)
+        counter = itertools.count()
+        self.tasks = [
+            CourseTask(course, next(counter),
+                       priority=course.get('priority', 0),
+                       max_attempts=course.get('max_attempts', default_attempts),
+                       deadline=parse_opening_time(course['deadline']) if course.get('deadline') else None)
+            for course in courses
+        ]
+        self.started = None
+        self.logger = logging.getLogger(__name__)
+
+    def backoff(self, task):
+        """第 n 次失败后的退避时间：base * 2^(n-1)，不超过 max_backoff"""
+        return min(self.max_backoff, self.base_backoff * 2 ** (len(task.attempts) - 1))
+
+    def next_task(self, now):
+        """
+        取出下一个要执行的任务
+
+        Returns:
+            tuple: (任务, 需等待秒数)；没有可执行的任务返回 (None, 0)
+        """
+        pending = [task for task in self.tasks if task.can_retry(now)]
+        if not pending:
+            return None, 0
+        ready = [task for task in pending if task.next_at <= now]
+        if ready:
+            return min(ready, key=CourseTask.sort_key), 0
+        # 都在退避中：等待最早可执行者
+        task = min(pending, key=lambda t: (t.next_at, t.sort_key()))
+        return task, task.next_at - now
+
+    def run(self, attempt, on_session_expired=None):
+        """
+        执行队列直到所有课程成功、用尽次数或超过截止时间
+
+        验证码错误立即重试；已额满与冲堂不再重试（额满交给余额监控）；
+        session 过期先调用 on_session_expired 重新登入再立即重试；尚未开放与其他失败以退避重试。
+
+        Args:
+            attempt (callable): attempt(course, attempt_number) -> SelectionOutcome 或 bool
+            on_session_expired (callable, optional): session 过期时调用，返回是否已重新登入
+
+        Returns:
+            dict: 'department_code-course_number' -> 是否成功
+        """
+        self.started = time.perf_counter()
+        while True:
+            task, wait = self.next_task(time.time())
+            if task is None:
+                break
+            if wait > 0:
+                time.sleep(wait)
+                continue
+
+            attempt_started = time.perf_counter()
+            try:
+                outcome = attempt(task.course, len(task.attempts) + 1)
+            except HumanInputRequired:
+                raise
+            except Exception as e:
+                self.logger.error("選課 %s 時發生錯誤: %s", task.course['course_name'], e)
+                outcome = SelectionOutcome.UNKNOWN
+            if isinstance(outcome, bool):
+                outcome = SelectionOutcome.SUCCESS if outcome else SelectionOutcome.UNKNOWN
+            task.outcome = outcome
+            task.attempts.append({
+                "start": attempt_started - self.started,
+                "elapsed": time.perf_counter() - attempt_started,
+                "success": outcome is SelectionOutcome.SUCCESS,
+                "outcome": outcome.value,
+            })
+            self._handle_outcome(task, outcome, on_session_expired)
+
+        self.log_timeline()
+        return {task.label: task.succeeded for task in self.tasks}
+
+    def _handle_outcome(self, task, outcome, on_session_expired):
+        """依结果分类决定是否与何时重试"""
+        name = task.course['course_name']
+        if outcome is SelectionOutcome.SUCCESS:
+            task.succeeded = True
+            return
+        if outcome in (SelectionOutcome.COURSE_FULL, SelectionOutcome.TIME_CONFLICT):
+            task.gave_up = True
+            self.logger.info("課程 %s %s，不再重試", name, outcome.value)
+            return
+        if outcome is SelectionOutcome.SESSION_EXPIRED:
+            if on_session_expired is None or not on_session_expired():
+                task.gave_up = True
+                self.logger.warning("課程 %s session 已過期且無法重新登入", name)
+                return
+        if not task.can_retry(time.time()):
+            return
+        if outcome in IMMEDIATE_RETRY or outcome is SelectionOutcome.SESSION_EXPIRED:
+            task.next_at = 0.0
+            self.logger.info("課程 %s %s，立即重試", name, outcome.value)
+        else:
+            delay = self.backoff(task)
+            task.next_at = time.time() + delay
+            self.logger.info("課程 %s 第 %s 次失敗，%.2f 秒後重試", name, len(task.attempts), delay)
+
+    def outcomes(self):
+        """
+        每门课程最后一次尝试的结果分类
+
+        Returns:
+            dict: 'department_code-course_number' -> SelectionOutcome（未尝试为None）
+        """
+        return {task.label: task.outcome for task in self.tasks}
+
+    def timeline(self):
+        """
+        每门课程的尝试时间线
+
+        Returns:
+            dict: 'department_code-course_number' -> 尝试列表（start/elapsed 为相对队列开始的秒数）
+        """
+        return {task.label: list(task.attempts) for task in self.tasks}
+
+    def log_timeline(self):
+        """在日志中输出每门课程的尝试时间线"""
+        for task in sorted(self.tasks, key=lambda t: t.order):
+            steps = ", ".join(
+                f"#{i} @{a['start']:.3f}s {a['elapsed'] * 1000:.0f}ms {a['outcome']}"
+                for i, a in enumerate(task.attempts, 1)
+            )
+            self.logger.log(TIMING, "課程 %s (優先級 %s): %s", task.label, task.priority, steps or '未嘗試')
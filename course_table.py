@@ -0,0 +1,181 @@
+"""
+课程表格快照模块
+通过一次 execute_script 调用序列化整个选课表格，并在本地建立索引
+"""
+
+import logging
+import time
+
+from metrics import span
+
+# 在浏览器端执行：遍历表格行，提取系所代码、课程编号、座位与按钮状态（includeElements 为真时附上行与按钮元素）
+ROW_EXTRACTOR_JS = r"""
+function extractRows(doc, includeElements) {
+    var codePattern = /([A-Z][A-Z0-9])\s*-?\s*(\d{3})/;
+    var seatPattern = /^\s*\d+\s*\/\s*\d+\s*$|額滿/;
+    var rows = doc.querySelectorAll('table tr');
+    var entries = [];
+    for (var i = 0; i < rows.length; i++) {
+        var row = rows[i];
+        var cells = row.querySelectorAll('td');
+        if (!cells.length) continue;
+        var texts = [];
+        var departmentCode = null, courseNumber = null, seats = null;
+        for (var j = 0; j < cells.length; j++) {
+            var text = (cells[j].innerText || cells[j].textContent || '').trim();
+            texts.push(text);
+            if (departmentCode === null) {
+                var match = text.match(codePattern);
+                if (match) {
+                    departmentCode = match[1];
+                    courseNumber = match[2];
+                }
+            }
+            if (seats === null && seatPattern.test(text)) seats = text;
+        }
+        if (departmentCode === null) continue;
+        var button = null;
+        var buttons = row.querySelectorAll('button');
+        for (var k = 0; k < buttons.length; k++) {
+            if ((buttons[k].textContent || '').indexOf('選課') !== -1) {
+                button = buttons[k];
+                break;
+            }
+        }
+        var entry = {
+            department_code: departmentCode,
+            course_number: courseNumber,
+            cells: texts,
+            seats: seats,
+            button_text: button ? button.textContent.trim() : null,
+            button_enabled: !!button && !button.disabled && !button.classList.contains('disabled'),
+            button_data: button ? Object.assign({}, button.dataset) : {}
+        };
+        if (includeElements) {
+            entry.row = row;
+            entry.button = button;
+        }
+        entries.push(entry);
+    }
+    return entries;
+}
+"""
+
+# 一次 WebDriver 往返取得当前页面的表格（含元素句柄）
+SNAPSHOT_SCRIPT = ROW_EXTRACTOR_JS + "return extractRows(document, true);"
+
+# 一次 WebDriver 往返：在页面内重新抓取课程页并解析（不重新渲染页面）
+FETCH_SNAPSHOT_SCRIPT = ROW_EXTRACTOR_JS + r"""
+var done = arguments[arguments.length - 1];
+fetch(window.location.href, {credentials: 'same-origin', cache: 'no-store'})
+    .then(function (response) {
+        if (response.redirected && response.url.indexOf('cos21322') === -1) {
+            done({status: response.status, expired: true, entries: []});
+            return;
+        }
+        if (!response.ok) {
+            done({status: response.status, expired: false, entries: []});
+            return;
+        }
+        return response.text().then(function (html) {
+            var doc = new DOMParser().parseFromString(html, 'text/html');
+            done({status: response.status, expired: false, entries: extractRows(doc, false)});
+        });
+    })
+    .catch(function (e) { done({status: 0, expired: false, error: String(e), entries: []}); });
+"""
+
+
+class CourseTable:
+    """选课表格的本地快照索引"""
+
+    def __init__(self, entries):
+        """
+        初始化表格索引
+
+        Args:
+            entries (list): SNAPSHOT_SCRIPT 返回的行资料
+        """
+        self.entries = entries or []
+        self.created_at = time.time()
+        self.index = {}
+        self.name_index = {}
+        for entry in self.entries:
+            key = self.make_key(entry.get('department_code'), entry.get('course_number'))
+            self.index.setdefault(key, entry)
+            for text in entry.get('cells') or []:
+                self.name_index.setdefault(text, entry)
+
+    @staticmethod
+    def make_key(department_code, course_number):
+        """
+        生成课程索引键（系所代码 + 课程编号）
+
+        Args:
+            department_code (str): 系所代码，例如 'M1'
+            course_number (str): 课程编号，例如 '023'
+
+        Returns:
+            str: 索引键，例如 'M1023'
+        """
+        return f"{(department_code or '').strip().upper()}{(course_number or '').strip()}"
+
+    @classmethod
+    def course_key(cls, course):
+        """
+        配置课程的索引键（编译后的配置已预先算好）
+
+        Args:
+            course (dict): 配置中的课程
+
+        Returns:
+            str: 索引键，例如 'M1023'
+        """
+        return course.get('key') or cls.make_key(course.get('department_code'), course.get('course_number'))
+
+    @classmethod
+    @span("table_snapshot")
+    def snapshot(cls, driver):
+        """
+        一次 WebDriver 往返取得整个课程表格
+
+        Args:
+            driver: Selenium WebDriver实例
+
+        Returns:
+            CourseTable: 表格索引
+        """
+        started = time.perf_counter()
+        entries = driver.execute_script(SNAPSHOT_SCRIPT)
+        table = cls(entries)
+        logging.info("課程表格快照完成: %s 列, 耗時 %.1f ms", len(table), (time.perf_counter() - started) * 1000)
+        return table
+
+    def lookup(self, course):
+        """
+        查找配置中的课程
+
+        Args:
+            course (dict): 配置中的课程，需包含 department_code 和 course_number
+
+        Returns:
+            dict: 对应的行资料，找不到返回None
+        """
+        entry = self.index.get(self.course_key(course))
+        if entry is not None:
+            return entry
+
+        # 备用：通过课程名称查找（先精确匹配，再包含匹配）
+        course_name = course.get('course_name')
+        if not course_name:
+            return None
+        entry = self.name_index.get(course_name)
+        if entry is not None:
+            return entry
+        for candidate in self.entries:
+            if any(course_name in text for text in candidate.get('cells') or []):
+                return candidate
+        return None
+
+    def __len__(self):
+        return len(self.entries)
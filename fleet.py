@@ -0,0 +1,217 @@
+"""
+多帐号选课模块
+每个帐号在独立进程中执行（独立浏览器、日志档与验证码识别器），由监督者负责重启与汇总结果
+"""
+
+import argparse
+import copy
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from collections import deque
+
+from bot_config import ConfigError, validate_accounts
+from start_scheduler import parse_opening_time
+
+
+def run_account(name, config, log_file, result_queue):
+    """
+    子进程入口：以单一帐号执行与单帐号相同的完整流程（登入、开放时间排程、预备提交与余额监控）
+
+    Args:
+        name (str): 帐号名称
+        config (dict): 该帐号的完整配置
+        log_file (str): 该帐号的日志档
+        result_queue: 回报结果的 multiprocessing.Queue
+    """
+    from course_bot import NCKUCourseBot
+    from interaction import ExitCode
+
+    bot = NCKUCourseBot(config=config, log_file=log_file)
+    try:
+        # 子进程没有终端：需要人工输入验证码时依 interaction 策略失败或等待
+        code = bot.auto_course_selection()
+        status = {ExitCode.LOGIN_FAILED: "login_failed", ExitCode.NEEDS_HUMAN: "needs_human",
+                  ExitCode.BROWSER_FAILED: "error", ExitCode.ERROR: "error"}.get(code, "ok")
+        result_queue.put((name, {"status": status, "exit_code": int(code), "courses": bot.last_results}))
+    except Exception as e:
+        logging.error("帳號 %s 執行時發生錯誤: %s", name, e)
+        result_queue.put((name, {"status": "error", "error": str(e), "courses": {}}))
+
+
+def build_account_configs(base_config, accounts):
+    """
+    将每个帐号的设定合并到基础配置上
+
+    Args:
+        base_config (dict): 共用的基础配置
+        accounts (list): 帐号设定（需包含 name，可覆盖 login_info、courses 等区块）
+
+    Returns:
+        list: (name, config) 列表
+
+    Raises:
+        ConfigError: 帐号设定不合法（例如名称重复）
+    """
+    errors = validate_accounts(accounts)
+    if errors:
+        raise ConfigError(errors, "accounts")
+    configs = []
+    for index, account in enumerate(accounts):
+        config = copy.deepcopy(base_config)
+        name = account.get('name') or f"account{index + 1}"
+        # 每个帐号使用独立的登入状态档与 Chrome 使用者资料目录
+        session_config = config.setdefault('session', {})
+        session_config['cookie_file'] = f"session_{name}.json"
+        if session_config.get('profile_dir'):
+            session_config['profile_dir'] = f"{session_config['profile_dir']}_{name}"
+        for key, value in account.items():
+            if key == 'name':
+                continue
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+        configs.append((name, config))
+    return configs
+
+
+class FleetRunner:
+    """多帐号选课的进程监督者"""
+
+    def __init__(self, account_configs, max_workers=None, max_restarts=2, worker_timeout=600, log_dir="logs"):
+        """
+        初始化监督者
+
+        Args:
+            account_configs (list): build_account_configs 返回的 (name, config) 列表
+            max_workers (int, optional): 同时执行的进程数，默认为 CPU 核心数
+            max_restarts (int): 每个帐号失败后最多重启次数
+            worker_timeout (float): 单一进程的最长执行时间（秒），逾时即终止
+            log_dir (str): 各帐号日志档所在目录
+        """
+        self.account_configs = account_configs
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_restarts = max_restarts
+        self.worker_timeout = worker_timeout
+        self.log_dir = log_dir
+        self.results = {}
+        self.attempts = {}
+
+    def _start(self, context, result_queue, name, config):
+        self.attempts[name] = self.attempts.get(name, 0) + 1
+        log_file = os.path.join(self.log_dir, f"{name}.log")
+        process = context.Process(target=run_account, args=(name, config, log_file, result_queue),
+                                  name=f"fleet-{name}", daemon=True)
+        process.start()
+        logging.info("啟動帳號 %s 的工作進程（第 %s 次，pid=%s）", name, self.attempts[name], process.pid)
+        # 等待开放时间的部分不计入逾时
+        opening_time = config.get('schedule', {}).get('opening_time')
+        waiting = max(0.0, parse_opening_time(opening_time) - time.time()) if opening_time else 0.0
+        return process, time.monotonic() + waiting + self.worker_timeout
+
+    def _drain(self, result_queue, running, pending, configs, timeout):
+        """处理目前已回报的结果，并回收对应的进程"""
+        for name, result in self._collect(result_queue, timeout):
+            if result["status"] in ("ok", "login_failed", "needs_human") or self.attempts[name] > self.max_restarts:
+                self.results[name] = result
+            else:
+                self._handle_failure(pending, name, configs[name], result["status"])
+            process, _ = running.pop(name, (None, None))
+            if process is not None:
+                process.join(timeout=5)
+
+    def _handle_failure(self, pending, name, config, status):
+        if self.attempts[name] <= self.max_restarts:
+            logging.warning("帳號 %s %s，重新啟動", name, status)
+            pending.append((name, config))
+        else:
+            logging.error("帳號 %s %s，已達重啟上限", name, status)
+            self.results[name] = {"status": status, "courses": {}}
+
+    @staticmethod
+    def _collect(result_queue, timeout=0.5):
+        """取出目前所有已回报的结果（第一笔最多等待 timeout 秒）"""
+        collected = []
+        try:
+            collected.append(result_queue.get(timeout=timeout))
+            while True:
+                collected.append(result_queue.get_nowait())
+        except queue.Empty:
+            pass
+        return collected
+
+    def run(self):
+        """
+        执行所有帐号并等待结束
+
+        Returns:
+            dict: 帐号名称 -> 结果（status、courses、attempts）
+        """
+        os.makedirs(self.log_dir, exist_ok=True)
+        context = multiprocessing.get_context("spawn")
+        result_queue = context.Queue()
+        pending = deque(self.account_configs)
+        running = {}
+        configs = dict(self.account_configs)
+        started = time.monotonic()
+
+        while pending or running:
+            while pending and len(running) < self.max_workers:
+                name, config = pending.popleft()
+                running[name] = self._start(context, result_queue, name, config)
+
+            self._drain(result_queue, running, pending, configs, 0.5)
+            if any(not process.is_alive() for process, _ in running.values()):
+                # 进程结束前放入队列的结果可能在上次读取后才到达，先读完再判断是否崩溃
+                self._drain(result_queue, running, pending, configs, 0.2)
+
+            for name, (process, deadline) in list(running.items()):
+                if not process.is_alive():
+                    # 进程结束但没有回报结果（崩溃）
+                    running.pop(name)
+                    self._handle_failure(pending, name, configs[name], f"crashed (exitcode={process.exitcode})")
+                elif time.monotonic() > deadline:
+                    # 单一浏览器卡住不影响其他帐号
+                    process.terminate()
+                    process.join(timeout=5)
+                    running.pop(name)
+                    self._handle_failure(pending, name, configs[name], "timeout")
+
+        for name, result in self.results.items():
+            result["attempts"] = self.attempts.get(name, 0)
+        logging.info("所有帳號執行完成，耗時 %.1f 秒", time.monotonic() - started)
+        return self.results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多帳號選課")
+    parser.add_argument("accounts", help="帳號設定檔（JSON 陣列）")
+    parser.add_argument("--base-config", default="config.json", help="共用的基礎配置檔")
+    parser.add_argument("--workers", type=int, default=None, help="同時執行的進程數")
+    parser.add_argument("--max-restarts", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=600, help="單一帳號的最長執行時間（秒）")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--output", default="fleet_results.json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.base_config, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.accounts, 'r', encoding='utf-8') as f:
+        account_list = json.load(f)
+
+    try:
+        account_configs = build_account_configs(base, account_list)
+    except ConfigError as e:
+        print(f"❌ {e}")
+        raise SystemExit(2)
+    runner = FleetRunner(account_configs, args.workers, args.max_restarts, args.timeout, args.log_dir)
+    summary = runner.run()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    for account_name, account_result in summary.items():
+        print(f"{account_name}: {account_result['status']} {account_result['courses']}")
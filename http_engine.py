@@ -0,0 +1,241 @@
+"""
+HTTP 选课引擎模块
+登入后从浏览器复制 session cookies，直接以表单请求完成验证码与加选，绕过页面渲染
+"""
+
+import io
+import logging
+import time
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+from log_setup import TIMING
+from result_parser import SelectionOutcome, classify_result, parse_result_text
+
+
+def with_query(url, **params):
+    """
+    替换 URL 中的查询参数
+
+    Args:
+        url (str): 原始 URL
+        **params: 要设置的参数
+
+    Returns:
+        str: 新的 URL
+    """
+    parts = urlparse(url)
+    query = dict(parse_qsl(parts.query))
+    query.update(params)
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+class _HiddenInputParser(HTMLParser):
+    """收集页面中的 hidden input（例如 CSRF token）"""
+
+    def __init__(self):
+        super().__init__()
+        self.fields = {}
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'input' and attrs.get('type') == 'hidden' and attrs.get('name'):
+            self.fields[attrs['name']] = attrs.get('value') or ''
+
+
+class HttpCourseEngine:
+    """以直接表单请求进行选课的引擎"""
+
+    def __init__(self, config, user_agent=None):
+        """
+        初始化 HTTP 引擎
+
+        Args:
+            config (dict): 机器人配置（使用 course_selection_url 与 http_engine 区块）
+            user_agent (str, optional): 与浏览器一致的 User-Agent
+        """
+        http_config = config.get('http_engine', {})
+        self.course_url = config['course_selection_url']
+        self.captcha_url = http_config.get('captcha_url') or with_query(self.course_url, m='captcha')
+        self.add_course_url = http_config.get('add_course_url') or with_query(self.course_url, m='add_course')
+        self.captcha_field = http_config.get('captcha_field', 'cos_qry_confirm_validation_code')
+        self.course_fields = http_config.get('course_fields', {
+            'department_code': 'dept_no',
+            'course_number': 'seq_no',
+        })
+        self.timeout = http_config.get('timeout', 5)
+        self.captcha_retries = config.get('verification', {}).get('captcha_retry_count', 3)
+        self.base_fields = {}
+        self.last_outcome = SelectionOutcome.UNKNOWN
+        self.logger = logging.getLogger(__name__)
+
+        # 连接池：同一主机的请求重用 TCP/TLS 连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=http_config.get('pool_size', 8))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+
+    @classmethod
+    def from_driver(cls, driver, config):
+        """
+        从已登入的浏览器建立引擎
+
+        Args:
+            driver: Selenium WebDriver实例
+            config (dict): 机器人配置
+
+        Returns:
+            HttpCourseEngine: 已载入 cookies 的引擎
+        """
+        engine = cls(config, user_agent=driver.execute_script("return navigator.userAgent"))
+        engine.load_cookies(driver.get_cookies())
+        return engine
+
+    def load_cookies(self, cookies):
+        """
+        载入 Selenium 格式的 cookies
+
+        Args:
+            cookies (list): driver.get_cookies() 的返回值
+        """
+        for cookie in cookies:
+            self.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain', '').lstrip('.') or None,
+                path=cookie.get('path', '/'),
+            )
+        self.logger.info("已複製 %s 個 cookies 到 HTTP session", len(cookies))
+
+    def prepare(self):
+        """
+        读取课程页，取得 hidden 表单字段并确认 session 有效
+
+        Returns:
+            bool: session 是否有效
+        """
+        response = self.session.get(self.course_url, timeout=self.timeout, allow_redirects=False)
+        if response.status_code != 200:
+            self.logger.warning("課程頁回應非預期: HTTP %s", response.status_code)
+            return False
+        parser = _HiddenInputParser()
+        parser.feed(response.text)
+        self.base_fields = parser.fields
+        return True
+
+    def fetch_captcha(self):
+        """
+        下载验证码图片
+
+        Returns:
+            PIL.Image.Image: 验证码图片，非图片回应返回None
+        """
+        response = self.session.get(
+            with_query(self.captcha_url, _=str(int(time.time() * 1000))),
+            timeout=self.timeout, allow_redirects=False,
+        )
+        if response.status_code != 200 or not response.headers.get('Content-Type', '').startswith('image/'):
+            self.logger.warning("驗證碼回應非預期: HTTP %s %s",
+                                response.status_code, response.headers.get('Content-Type'))
+            return None
+        return Image.open(io.BytesIO(response.content))
+
+    def build_form(self, course, captcha_text):
+        """组合加选表单"""
+        form = dict(self.base_fields)
+        for course_key, field_name in self.course_fields.items():
+            if course.get(course_key):
+                form[field_name] = course[course_key]
+        form.update(course.get('button_data') or {})
+        form[self.captcha_field] = captcha_text
+        return form
+
+    def submit(self, course, captcha_text):
+        """
+        送出加选请求
+
+        Returns:
+            tuple: (结果, 讯息)；结果为 True/False，非预期回应为 None
+        """
+        response = self.session.post(
+            self.add_course_url, data=self.build_form(course, captcha_text),
+            timeout=self.timeout, allow_redirects=False,
+        )
+        # 送出后 hidden 字段（CSRF token）可能已轮换，被重新导向（例如导向登入页）时 session 已失效：
+        # 两种情况都不能再用旧字段，下次送出前重新读取课程页
+        self.base_fields = {}
+        return self.parse_response(response)
+
+    def parse_response(self, response):
+        """
+        解析加选回应
+
+        Returns:
+            tuple: (结果, 讯息)；结果为 True/False，非预期回应为 None
+        """
+        if response.status_code != 200:
+            return None, f"HTTP {response.status_code}"
+        return parse_result_text(response.text)
+
+    def select_course(self, course, captcha_solver):
+        """
+        以 HTTP 请求完成验证码与加选
+
+        Args:
+            course (dict): 配置中的课程
+            captcha_solver (CaptchaSolver): 验证码识别器
+
+        Returns:
+            bool: 选课结果；非预期回应返回None（由调用方改走浏览器流程）
+        """
+        started = time.perf_counter()
+        self.last_outcome = SelectionOutcome.UNKNOWN
+        for attempt in range(self.captcha_retries):
+            if not self.base_fields and not self.prepare():
+                return None
+            captcha_image = self.fetch_captcha()
+            if captcha_image is None:
+                return None
+            captcha_text = captcha_solver.solve_captcha(captcha_image)
+            if not captcha_text:
+                continue
+
+            result, message = self.submit(course, captcha_text)
+            self.logger.log(TIMING, "HTTP 加選回應 (%s/%s): %s - %s (%.0f ms)", attempt + 1, self.captcha_retries,
+                            result, message, (time.perf_counter() - started) * 1000)
+            self.last_outcome = classify_result(result, message)
+            if self.last_outcome is SelectionOutcome.WRONG_CAPTCHA:
+                continue
+            return result
+        return None
+
+
+if __name__ == "__main__":
+    # 对本地选课替身进行端到端验证：登入 -> 复制 cookies -> 验证码 -> 加选
+    from standin_server import StandinCourseSite
+
+    class _FixedAnswerSolver:
+        def __init__(self, answer):
+            self.answer = answer
+
+        def solve_captcha(self, image, max_retries=3):
+            return self.answer
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    site = StandinCourseSite().start()
+    try:
+        login = requests.post(f"{site.base_url}index.php?c=auth", data={"code": site.captcha_answer}, allow_redirects=False)
+        engine = HttpCourseEngine({"course_selection_url": site.course_url})
+        engine.session.cookies.update(login.cookies)
+        course = {"department_code": "M1", "course_number": "023"}
+        print(f"第一次加選: {engine.select_course(course, _FixedAnswerSolver(site.captcha_answer))}")
+        print(f"第二次加選（已額滿）: {engine.select_course(course, _FixedAnswerSolver(site.captcha_answer))}")
+        engine.session.cookies.clear()
+        print(f"session 失效（應改走瀏覽器）: {engine.select_course(course, _FixedAnswerSolver(site.captcha_answer))}")
+    finally:
+        site.stop()
@@ -0,0 +1,75 @@
+"""
+匯入耗时报告模块
+以 python -X importtime 在独立进程中量测各模块的匯入时间，找出拖慢启动的依赖
+"""
+
+import subprocess
+import sys
+
+# 要量测的专案模块（依启动顺序）
+PROJECT_MODULES = [
+    "course_bot",
+    "captcha_solver",
+    "http_engine",
+    "browser_profiles",
+    "page_waits",
+    "start_scheduler",
+    "session_watchdog",
+    "standin_server",
+]
+
+
+def measure_import(module):
+    """
+    在新进程中匯入模块并解析 -X importtime 的输出
+
+    Args:
+        module (str): 模块名称
+
+    Returns:
+        dict: total_ms（模块累计耗时）与 heaviest（耗时最多的依赖 [(名称, ms)]），失败时包含 error
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        # 名称前的缩排代表匯入层级：每层两个空格
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        entries.append((raw_name.strip(), depth, int(cumulative_us)))
+
+    # importtime 先列出子模块再列出父模块：模块本身之前、上一个顶层项目之后的即为其依赖
+    index = next((i for i, (name, depth, _) in enumerate(entries) if name == module and depth == 0), None)
+    if index is None:
+        return {"total_ms": 0.0, "heaviest": []}
+    total = entries[index][2]
+    start = index
+    while start > 0 and entries[start - 1][1] > 0:
+        start -= 1
+    # 只看模块直接匯入的依赖，避免重复计算
+    direct = [(name, cumulative) for name, depth, cumulative in entries[start:index] if depth == 1]
+    heaviest = sorted(direct, key=lambda item: item[1], reverse=True)[:5]
+    return {"total_ms": round(total / 1000, 1),
+            "heaviest": [(name, round(cumulative / 1000, 1)) for name, cumulative in heaviest]}
+
+
+def print_report(modules=None):
+    """印出各模块的匯入耗时"""
+    for module in modules or PROJECT_MODULES:
+        result = measure_import(module)
+        if "error" in result:
+            print(f"{module:<20} 匯入失敗: {result['error']}")
+            continue
+        heaviest = ", ".join(f"{name} {ms} ms" for name, ms in result["heaviest"])
+        print(f"{module:<20} {result['total_ms']:>8} ms   {heaviest}")
+
+
+if __name__ == "__main__":
+    print_report(sys.argv[1:] or None)
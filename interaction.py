@@ -0,0 +1,155 @@
+"""
+人工介入策略模块
+取代流程中的 input() 等待：有终端时照旧询问，无人值守时依配置立即失败、限时等待或先发出通知再等待，
+并定义命令列的结束代码
+"""
+
+import logging
+import sys
+import time
+from enum import IntEnum
+
+MODES = ("auto", "interactive", "fail", "timeout", "notify")
+
+
+class ExitCode(IntEnum):
+    """命令列结束代码"""
+
+    OK = 0                  # 所有课程都已选上
+    ERROR = 1               # 未预期的错误
+    CONFIG_ERROR = 2        # 设定档不合法
+    LOGIN_FAILED = 3        # 无法登入
+    NEEDS_HUMAN = 4         # 需要人工操作但策略为 fail
+    PARTIAL = 5             # 部分课程未选上
+    NONE_SELECTED = 6       # 没有选上任何课程
+    BROWSER_FAILED = 7      # 无法开启浏览器
+    INTERRUPTED = 130       # 被 Ctrl+C 中断
+
+
+def selection_exit_code(results):
+    """
+    依选课结果决定结束代码
+
+    Args:
+        results (dict): 'department_code-course_number' -> 是否成功
+
+    Returns:
+        ExitCode: OK、PARTIAL 或 NONE_SELECTED
+    """
+    if results and all(results.values()):
+        return ExitCode.OK
+    if any(results.values()):
+        return ExitCode.PARTIAL
+    return ExitCode.NONE_SELECTED
+
+
+class HumanInputRequired(RuntimeError):
+    """需要人工操作，但目前的策略不允许等待"""
+
+    def __init__(self, reason):
+        self.reason = reason
+        super().__init__(f"需要人工操作: {reason}")
+
+
+class InteractionPolicy:
+    """需要人工操作时的处理方式"""
+
+    def __init__(self, mode="auto", timeout=60, notify_url=None, poll_interval=0.5):
+        """
+        初始化策略
+
+        Args:
+            mode (str): auto（有终端时 interactive，否则 fail）/ interactive / fail / timeout / notify
+            timeout (float): timeout 与 notify 模式的最长等待时间（秒）
+            notify_url (str, optional): notify 模式通知的 webhook（POST JSON）
+            poll_interval (float): 限时等待时检查是否已完成的间隔（秒）
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知的介入策略 {mode}，可用: {', '.join(MODES)}")
+        if mode == "auto":
+            mode = "interactive" if sys.stdin is not None and sys.stdin.isatty() else "fail"
+        self.mode = mode
+        self.timeout = timeout
+        self.notify_url = notify_url
+        self.poll_interval = poll_interval
+        self.blocked = None
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, interaction_config=None):
+        """
+        由 config.json 的 interaction 区块建立
+
+        Args:
+            interaction_config (dict, optional): interaction 区块
+
+        Returns:
+            InteractionPolicy: 策略
+        """
+        interaction_config = interaction_config or {}
+        return cls(interaction_config.get('mode', 'auto'),
+                   interaction_config.get('timeout', 60),
+                   interaction_config.get('notify_url') or None)
+
+    @property
+    def interactive(self):
+        return self.mode == "interactive"
+
+    def notify(self, reason, prompt):
+        """发出通知（webhook 失败不影响流程）"""
+        self.logger.warning("需要人工操作: %s", reason)
+        if not self.notify_url:
+            return
+        import requests  # 只有设定 webhook 时才需要，命令列的 check 不必载入
+        try:
+            requests.post(self.notify_url, json={"reason": reason, "message": prompt, "timeout": self.timeout},
+                          timeout=5)
+        except requests.RequestException as e:
+            self.logger.warning("發送通知失敗: %s", e)
+
+    def wait_for_human(self, reason, prompt, done=None):
+        """
+        等待人工完成某项操作（例如在浏览器中输入验证码）
+
+        Args:
+            reason (str): 简短原因，用于日志与通知
+            prompt (str): 显示给使用者的提示
+            done (callable, optional): 返回真值表示已完成，限时等待时可提前结束
+
+        Returns:
+            bool: 已完成（或互动模式下使用者按下 Enter）返回True，超时返回False
+
+        Raises:
+            HumanInputRequired: 策略为 fail
+        """
+        if self.interactive:
+            print(prompt)
+            input()
+            return True
+        if self.mode == "fail":
+            self.blocked = reason
+            self.logger.error("需要人工操作，但介入策略為 fail: %s", reason)
+            raise HumanInputRequired(reason)
+        if self.mode == "notify":
+            self.notify(reason, prompt)
+        else:
+            self.logger.warning("需要人工操作，最多等待 %s 秒: %s", self.timeout, reason)
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            try:
+                if done is not None and done():
+                    return True
+            except Exception as e:
+                self.logger.debug("檢查人工操作狀態失敗: %s", e)
+            time.sleep(self.poll_interval)
+        if done is None:
+            return True
+        self.blocked = reason
+        self.logger.error("等待人工操作逾時: %s", reason)
+        return False
+
+    def pause(self, prompt):
+        """只在互动模式下暂停（例如结束前让使用者查看浏览器）"""
+        if self.interactive:
+            print(prompt)
+            input()
@@ -0,0 +1,65 @@
+"""
+日志设置模块
+日志经由 QueueHandler 交给背景线程写入档案与终端，热路径只需把记录放进队列
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# 介于 INFO 与 WARNING 之间：只保留与耗时相关的事件
+TIMING = 25
+logging.addLevelName(TIMING, "TIMING")
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "timing": TIMING,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+def setup_queued_logging(log_file, level="info"):
+    """
+    设置非阻塞日志（同一进程只设置一次，与 logging.basicConfig 相同）
+
+    Args:
+        log_file (str): 日志档案路径
+        level (str): debug / info / timing / warning / error；timing 只保留耗时事件与警告
+
+    Returns:
+        QueueListener: 背景写入器
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(LEVELS.get(str(level).lower(), logging.INFO))
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    atexit.register(stop_queued_logging)
+    return _listener
+
+
+def stop_queued_logging():
+    """写完队列中剩余的日志并停止背景写入器"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,293 @@
+"""
+效能指标模块
+记录各阶段的区间（span）、计数器与直方图，执行结束后输出 JSON 追踪档与 Prometheus 文字格式
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# 直方图分桶上限（秒），涵盖单次 WebDriver 往返到整个登入流程
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "ncku_course_bot"
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """执行期间的区间、计数器与直方图（线程安全）"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        初始化指标
+
+        Args:
+            buckets (tuple): 直方图分桶上限（秒）
+        """
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # 各线程目前所在的区间（由内到外），供取样分析器标记阶段
+        self.active = {}
+        self.reset()
+
+    def reset(self):
+        """清空所有记录，开始新的一次执行"""
+        with self.lock:
+            self.started_at = time.time()
+            self.origin = time.perf_counter()
+            self.spans = []
+            self.counters = defaultdict(float)
+            self.histograms = {}
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        记录一段区间的耗时，并计入 phase_duration_seconds 直方图（也可作为函数装饰器）
+
+        Args:
+            name (str): 阶段名称，例如 login、captcha_api
+            **labels: 附加标签，例如 course='M1-023'
+        """
+        started = time.perf_counter()
+        ok = True
+        active = self.active.setdefault(threading.get_ident(), [])
+        active.append(name)
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            active.pop()
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.spans.append({
+                    "name": name,
+                    "start": started - self.origin,
+                    "duration": elapsed,
+                    "thread": threading.current_thread().name,
+                    "ok": ok,
+                    "labels": labels,
+                })
+            self.observe("phase_duration_seconds", elapsed, phase=name)
+
+    def current_phase(self, thread_id):
+        """
+        线程目前最内层的区间名称
+
+        Args:
+            thread_id (int): threading.get_ident() 的值
+
+        Returns:
+            str: 区间名称，不在任何区间内返回None
+        """
+        try:
+            return self.active[thread_id][-1]
+        except (KeyError, IndexError):
+            return None
+
+    def count(self, name, amount=1, **labels):
+        """
+        计数器加上 amount
+
+        Args:
+            name (str): 指标名称，例如 openai_requests_total
+            amount (float): 增加量
+            **labels: 标签
+        """
+        with self.lock:
+            self.counters[(name, _label_key(labels))] += amount
+
+    def observe(self, name, value, **labels):
+        """
+        把一个观测值（秒）放入直方图
+
+        Args:
+            name (str): 指标名称
+            value (float): 观测值
+            **labels: 标签
+        """
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def summary(self):
+        """
+        各阶段耗时与计数器摘要
+
+        Returns:
+            dict: phases（阶段 -> {count, total_s, max_s}）与 counters（'名称{标签}' -> 值）
+        """
+        phases = {}
+        with self.lock:
+            for item in self.spans:
+                phase = phases.setdefault(item["name"], {"count": 0, "total_s": 0.0, "max_s": 0.0})
+                phase["count"] += 1
+                phase["total_s"] += item["duration"]
+                phase["max_s"] = max(phase["max_s"], item["duration"])
+            counters = {name + _format_labels(label_key): value
+                        for (name, label_key), value in self.counters.items()}
+        for phase in phases.values():
+            phase["total_s"] = round(phase["total_s"], 4)
+            phase["max_s"] = round(phase["max_s"], 4)
+        return {"phases": phases, "counters": counters}
+
+    def to_trace(self):
+        """
+        转为 Chrome 追踪格式（可在 chrome://tracing 或 Perfetto 开启）
+
+        Returns:
+            dict: traceEvents 与 metadata
+        """
+        threads = {}
+        events = []
+        with self.lock:
+            spans = list(self.spans)
+        for item in spans:
+            tid = threads.setdefault(item["thread"], len(threads) + 1)
+            events.append({
+                "name": item["name"],
+                "ph": "X",
+                "ts": round(item["start"] * 1e6),
+                "dur": round(item["duration"] * 1e6),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": dict(item["labels"], ok=item["ok"]),
+            })
+        for thread_name, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                           "args": {"name": thread_name}})
+        return {"traceEvents": events,
+                "metadata": {"started_at": self.started_at, "summary": self.summary()}}
+
+    def to_prometheus(self):
+        """
+        转为 Prometheus 文字格式（可交给 node_exporter 的 textfile collector）
+
+        Returns:
+            str: 指标文字
+        """
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        declared = set()
+        for (name, label_key), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(label_key)} {value:g}")
+
+        for (name, label_key), histogram in histograms:
+            metric = f"{METRIC_PREFIX}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                lines.append(f"{metric}_bucket{_format_labels(label_key, [('le', f'{bound:g}')])} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(label_key, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{metric}_sum{_format_labels(label_key)} {histogram['sum']:.6f}")
+            lines.append(f"{metric}_count{_format_labels(label_key)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory="metrics", prefix="run"):
+        """
+        写出追踪档与 Prometheus 文字档
+
+        Args:
+            directory (str): 输出目录
+            prefix (str): 档名前缀
+
+        Returns:
+            tuple: (追踪档路径, Prometheus 档路径)
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.started_at))
+        trace_path = os.path.join(directory, f"{prefix}_{stamp}.trace.json")
+        prom_path = os.path.join(directory, f"{prefix}_{stamp}.prom")
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_trace(), f, ensure_ascii=False)
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        return trace_path, prom_path
+
+
+# 进程内共用的指标；各模块通过 span / count / observe 记录，不需传递实例
+metrics = Metrics()
+
+
+def span(name, **labels):
+    """在共用指标上记录区间"""
+    return metrics.span(name, **labels)
+
+
+def count(name, amount=1, **labels):
+    """在共用指标上增加计数"""
+    metrics.count(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    """在共用指标上记录观测值"""
+    metrics.observe(name, value, **labels)
+
+
+def reset_metrics():
+    """开始新的一次执行（例如基准测试的每一轮）"""
+    metrics.reset()
+    return metrics
+
+
+def write_metrics(directory="metrics", prefix="run"):
+    """写出共用指标的追踪档与 Prometheus 文字档"""
+    return metrics.write(directory, prefix)
+
+
+def instrument_driver(driver):
+    """
+    计算 WebDriver 往返次数与耗时（find_element、execute_script、click 等全部经由 driver.execute）
+
+    Args:
+        driver: Selenium WebDriver实例
+
+    Returns:
+        WebDriver: 同一个 driver
+    """
+    if getattr(driver, "_metrics_instrumented", False):
+        return driver
+    original_execute = driver.execute
+
+    def execute(driver_command, params=None):
+        started = time.perf_counter()
+        try:
+            return original_execute(driver_command, params)
+        finally:
+            metrics.count("webdriver_commands_total", command=driver_command)
+            metrics.observe("webdriver_command_seconds", time.perf_counter() - started, command=driver_command)
+
+    driver.execute = execute
+    driver._metrics_instrumented = True
+    return driver
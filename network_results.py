@@ -0,0 +1,115 @@
+"""
+网络回应读取模块
+通过 Chrome 的 performance 日志捕获加选请求的回应，直接解析结果，不必搜寻页面文字
+"""
+
+import json
+import logging
+import time
+
+from log_setup import TIMING
+from result_parser import parse_result_text
+
+# 加选请求 URL 的特征片段
+ADD_COURSE_URL_FRAGMENT = "m=add_course"
+
+
+def enable_performance_logging(chrome_options):
+    """
+    开启 performance 日志（包含 Network 事件）
+
+    Args:
+        chrome_options (Options): Chrome 选项
+    """
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+class NetworkResultReader:
+    """从 performance 日志读取加选回应"""
+
+    def __init__(self, driver, url_fragment=ADD_COURSE_URL_FRAGMENT, poll_interval=0.02):
+        """
+        初始化读取器
+
+        Args:
+            driver: Selenium WebDriver实例（需开启 performance 日志）
+            url_fragment (str): 要捕获的请求 URL 片段
+            poll_interval (float): 轮询日志的间隔（秒）
+        """
+        self.driver = driver
+        self.url_fragment = url_fragment
+        self.poll_interval = poll_interval
+        self.last_body = None
+        self.logger = logging.getLogger(__name__)
+
+    def _read_events(self):
+        events = []
+        for entry in self.driver.get_log("performance"):
+            try:
+                events.append(json.loads(entry["message"])["message"])
+            except (KeyError, ValueError):
+                continue
+        return events
+
+    def reset(self):
+        """
+        清空送出前累积的日志，避免读到旧的回应
+
+        Returns:
+            bool: performance 日志是否可用
+        """
+        try:
+            self.driver.get_log("performance")
+            return True
+        except Exception as e:
+            self.logger.warning("performance 日誌不可用: %s", e)
+            return False
+
+    def wait_for_response(self, timeout=5):
+        """
+        等待加选请求完成并解析回应
+
+        Args:
+            timeout (float): 超时时间（秒）
+
+        Returns:
+            tuple: (结果, 讯息)，结果为 True/False/None；超时或无法读取返回None
+        """
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        request_id = None
+        status = None
+        url = ""
+        while time.monotonic() < deadline:
+            for event in self._read_events():
+                method, params = event.get("method"), event.get("params", {})
+                if method == "Network.requestWillBeSent" and self.url_fragment in params.get("request", {}).get("url", ""):
+                    request_id = params["requestId"]
+                elif method == "Network.responseReceived" and params.get("requestId") == request_id:
+                    # 重新导向（例如 session 过期被导回登入页）时回报的是最终回应
+                    status = params["response"].get("status")
+                    url = params["response"].get("url", "")
+                elif method == "Network.loadingFailed" and params.get("requestId") == request_id:
+                    self.logger.warning("加選請求失敗: %s", params.get('errorText'))
+                    return None
+                elif method == "Network.loadingFinished" and params.get("requestId") == request_id:
+                    return self._parse(request_id, status, url, started)
+            time.sleep(self.poll_interval)
+        self.logger.warning("等待加選回應超时 (%ss)", timeout)
+        return None
+
+    def _parse(self, request_id, status, url, started):
+        if "c=auth" in url:
+            # 加选请求被导回登入页
+            return False, "session 已過期，已被導向登入頁"
+        try:
+            body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception as e:
+            self.logger.warning("無法讀取加選回應內容: %s", e)
+            return None
+        self.last_body = body.get("body", "")
+        if status != 200:
+            return None, f"HTTP {status}"
+        result = parse_result_text(self.last_body)
+        self.logger.log(TIMING, "取得加選回應，耗时 %.0f ms: %s", (time.perf_counter() - started) * 1000, result[1])
+        return result
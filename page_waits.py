@@ -0,0 +1,193 @@
+"""
+页面等待模块
+根据页面实际状态（URL 变化、弹窗可见、验证码图片载入、结果讯息出现）进行等待，取代固定的 time.sleep
+"""
+
+import logging
+import time
+from collections import deque
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from log_setup import TIMING
+from metrics import observe
+
+# 轮询间隔（秒），远小于 WebDriverWait 默认的 0.5 秒
+POLL_INTERVAL = 0.05
+
+# 保留的等待记录笔数；长时间监控时不会无限增长，次数与总耗时另外累计
+MAX_TIMINGS = 1000
+
+# 验证码图片的选择器（与 CaptchaSolver 保持一致）
+CAPTCHA_IMAGE_CSS = "img[src*='verifycode'], img[src*='captcha'], img[class*='captcha'], div[class*='captcha'] img"
+
+# 检查验证码图片是否已完整载入
+CAPTCHA_READY_SCRIPT = """
+var images = document.querySelectorAll(arguments[0]);
+for (var i = 0; i < images.length; i++) {
+    if (images[i].complete && images[i].naturalWidth > 0) return true;
+}
+return false;
+"""
+
+# 检查是否有可见的 Bootstrap 弹窗
+MODAL_VISIBLE_SCRIPT = """
+var modals = document.querySelectorAll('.modal');
+for (var i = 0; i < modals.length; i++) {
+    var style = window.getComputedStyle(modals[i]);
+    if (style.display !== 'none' && style.visibility !== 'hidden' && modals[i].offsetHeight > 0) return true;
+}
+return false;
+"""
+
+# 安装 MutationObserver，记录第一个插入页面且包含选课结果关键字的文字
+RESULT_OBSERVER_SCRIPT = r"""
+if (window.__nckuResultObserver) window.__nckuResultObserver.disconnect();
+window.__nckuResult = null;
+var pattern = /成功|完成|已選|失敗|錯誤|已滿/;
+var observer = new MutationObserver(function (mutations) {
+    for (var i = 0; i < mutations.length; i++) {
+        var nodes = mutations[i].addedNodes;
+        for (var j = 0; j < nodes.length; j++) {
+            var text = (nodes[j].textContent || '').trim();
+            if (text && pattern.test(text)) {
+                window.__nckuResult = text.substring(0, 500);
+                observer.disconnect();
+                return;
+            }
+        }
+        if (mutations[i].type === 'characterData') {
+            var data = (mutations[i].target.textContent || '').trim();
+            if (pattern.test(data)) {
+                window.__nckuResult = data.substring(0, 500);
+                observer.disconnect();
+                return;
+            }
+        }
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+window.__nckuResultObserver = observer;
+return true;
+"""
+
+
+class PageWaiter:
+    """基于页面状态的等待器，并记录每次等待的耗时"""
+
+    def __init__(self, driver, poll_interval=POLL_INTERVAL, max_timings=MAX_TIMINGS):
+        """
+        初始化等待器
+
+        Args:
+            driver: Selenium WebDriver实例
+            poll_interval (float): 轮询间隔（秒）
+            max_timings (int): 保留最近几笔等待记录
+        """
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.timings = deque(maxlen=max_timings)
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.logger = logging.getLogger(__name__)
+
+    def wait_until(self, name, condition, timeout=10):
+        """
+        轮询直到条件成立
+
+        Args:
+            name (str): 等待名称（用于记录耗时）
+            condition (callable): 接收 driver 的条件函数，返回真值表示完成
+            timeout (float): 超时时间（秒）
+
+        Returns:
+            条件函数的返回值，超时返回None
+
+        Raises:
+            NoSuchWindowException, InvalidSessionIdException: 分页已关闭或浏览器已结束，继续等待没有意义
+        """
+        started = time.perf_counter()
+        result = None
+        try:
+            result = WebDriverWait(self.driver, timeout, poll_frequency=self.poll_interval).until(condition)
+        except (NoSuchWindowException, InvalidSessionIdException):
+            raise
+        except Exception:
+            result = None
+        elapsed = time.perf_counter() - started
+        self.timings.append({"name": name, "elapsed": elapsed, "ok": bool(result)})
+        self.wait_count += 1
+        self.wait_seconds += elapsed
+        observe("page_wait_seconds", elapsed, wait=name.split(":")[0])
+        if result:
+            self.logger.log(TIMING, "等待 %s 完成，耗时 %.0f ms", name, elapsed * 1000)
+        else:
+            self.logger.warning("等待 %s 超时 (%ss)", name, timeout)
+        return result
+
+    def wait_for_document_ready(self, timeout=10):
+        """等待文档可操作（readyState 为 interactive 或 complete）"""
+        return self.wait_until(
+            "document_ready",
+            lambda d: d.execute_script("return document.readyState") in ("interactive", "complete"),
+            timeout,
+        )
+
+    def wait_for_url_change(self, old_url, timeout=10):
+        """等待 URL 离开 old_url"""
+        return self.wait_until("url_change", lambda d: d.current_url != old_url, timeout)
+
+    def wait_for_url_contains(self, fragment, timeout=10):
+        """等待 URL 包含指定片段"""
+        return self.wait_until(f"url_contains:{fragment}", EC.url_contains(fragment), timeout)
+
+    def wait_for_element(self, xpath, timeout=10):
+        """等待元素出现在 DOM 中"""
+        return self.wait_until(
+            f"element:{xpath}", EC.presence_of_element_located((By.XPATH, xpath)), timeout
+        )
+
+    def wait_for_visible(self, xpath, timeout=10):
+        """等待元素可见（例如选课弹窗）"""
+        return self.wait_until(
+            f"visible:{xpath}", EC.visibility_of_element_located((By.XPATH, xpath)), timeout
+        )
+
+    def wait_for_modal(self, timeout=5):
+        """等待选课弹窗可见"""
+        return self.wait_until("modal", lambda d: d.execute_script(MODAL_VISIBLE_SCRIPT), timeout)
+
+    def wait_for_captcha_image(self, timeout=10):
+        """等待验证码图片载入完成（complete 且 naturalWidth 非零）"""
+        return self.wait_until(
+            "captcha_image",
+            lambda d: d.execute_script(CAPTCHA_READY_SCRIPT, CAPTCHA_IMAGE_CSS),
+            timeout,
+        )
+
+    def arm_result_observer(self):
+        """在送出前安装结果观察器，避免错过讯息插入"""
+        try:
+            return self.driver.execute_script(RESULT_OBSERVER_SCRIPT)
+        except Exception as e:
+            self.logger.warning("安装结果观察器失败: %s", e)
+            return False
+
+    def wait_for_result_message(self, timeout=10):
+        """
+        等待观察器捕获到选课结果讯息
+
+        Returns:
+            str: 结果讯息文字，超时返回None
+        """
+        return self.wait_until(
+            "result_message",
+            lambda d: d.execute_script("return window.__nckuResult"),
+            timeout,
+        )
+
+    def total_elapsed(self):
+        """所有等待的总耗时（秒），包含已不在 timings 中的较早记录"""
+        return self.wait_seconds
@@ -0,0 +1,155 @@
+"""
+取样分析模块
+以背景线程定期读取各线程的调用栈，按阶段（metrics 的区间）标记，输出可绘制火焰图的 collapsed stack 格式
+未启用时不建立任何线程，对选课流程没有额外负担
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import metrics
+
+# 启用取样分析的环境变量，值为输出档路径（设为 1 时使用 DEFAULT_OUTPUT）
+PROFILE_ENV = "NCKU_PROFILE"
+PROFILE_INTERVAL_ENV = "NCKU_PROFILE_INTERVAL"
+DEFAULT_OUTPUT = "profile.folded"
+DEFAULT_INTERVAL = 0.005
+
+# 栈上超过此深度的帧不记录（避免极深递归产生过长的行）
+MAX_DEPTH = 128
+
+
+def profile_output_from_env():
+    """
+    读取 NCKU_PROFILE 环境变量
+
+    Returns:
+        str: 输出档路径，未启用返回None
+    """
+    value = os.environ.get(PROFILE_ENV, "").strip()
+    if not value or value == "0":
+        return None
+    return DEFAULT_OUTPUT if value == "1" else value
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """定期取样所有线程调用栈的分析器"""
+
+    def __init__(self, output=DEFAULT_OUTPUT, interval=None):
+        """
+        初始化分析器
+
+        Args:
+            output (str): collapsed stack 输出档路径
+            interval (float, optional): 取样间隔（秒），默认读取 NCKU_PROFILE_INTERVAL（毫秒）或 5 ms
+        """
+        if interval is None:
+            interval = float(os.environ.get(PROFILE_INTERVAL_ENV, DEFAULT_INTERVAL * 1000)) / 1000
+        self.output = output
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+        self.logger = logging.getLogger(__name__)
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            phase = metrics.metrics.current_phase(thread_id) or "idle"
+            # 根节点依序为阶段与线程，火焰图中每个阶段各自成为一棵子树
+            stack.append(names.get(thread_id, str(thread_id)))
+            stack.append(f"phase:{phase}")
+            self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self._sample()
+            except Exception as e:
+                self.logger.debug("取样失败: %s", e)
+
+    def start(self):
+        """开始在背景取样"""
+        self.stop_event.clear()
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        self.logger.info("取样分析已启动，每 %.1f ms 取样一次，输出到 %s", self.interval * 1000, self.output)
+        return self
+
+    def stop(self):
+        """停止取样并写出结果"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+        paths = self.write()
+        elapsed = time.perf_counter() - self.started if self.started else 0
+        self.logger.info("取样分析结束：%.1f 秒内取样 %d 次，已写入 %s",
+                         elapsed, self.sample_count, ", ".join(paths))
+        return paths
+
+    def phase_totals(self):
+        """
+        各阶段的取样数
+
+        Returns:
+            dict: 阶段 -> 取样数
+        """
+        totals = Counter()
+        for stack, samples in self.samples.items():
+            totals[stack.split(";", 1)[0][len("phase:"):]] += samples
+        return dict(totals)
+
+    def write(self):
+        """
+        写出合并档与各阶段各一个档案（<名称>.<阶段>.folded）
+
+        Returns:
+            list: 写出的档案路径
+        """
+        by_phase = {}
+        for stack, samples in self.samples.items():
+            phase, _, rest = stack.partition(";")
+            by_phase.setdefault(phase[len("phase:"):], []).append(f"{rest} {samples}")
+
+        directory = os.path.dirname(self.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.output, 'w', encoding='utf-8') as f:
+            f.writelines(f"{stack} {samples}\n" for stack, samples in sorted(self.samples.items()))
+        paths = [self.output]
+
+        stem, extension = os.path.splitext(self.output)
+        for phase, lines in sorted(by_phase.items()):
+            path = f"{stem}.{phase}{extension or '.folded'}"
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(line + "\n" for line in sorted(lines))
+            paths.append(path)
+        return paths
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
@@ -0,0 +1,109 @@
+"""
+选课结果解析模块
+将加选回应（JSON 或纯文字）解析为结果与讯息，浏览器与 HTTP 流程共用
+"""
+
+import json
+from enum import Enum
+
+# 「已選」单独出现不代表成功（例如「與已選課程衝堂」），不列入
+SUCCESS_KEYWORDS = ('成功', '完成')
+FAILURE_KEYWORDS = ('失敗', '錯誤', '已滿', '額滿')
+
+
+class SelectionOutcome(Enum):
+    """选课结果分类"""
+    SUCCESS = "success"
+    WRONG_CAPTCHA = "wrong_captcha"
+    COURSE_FULL = "course_full"
+    TIME_CONFLICT = "time_conflict"
+    NOT_YET_OPEN = "not_yet_open"
+    SESSION_EXPIRED = "session_expired"
+    UNKNOWN = "unknown"
+
+
+# 依序比对的失败分类关键字（先比对较明确的分类）
+OUTCOME_KEYWORDS = [
+    (SelectionOutcome.SESSION_EXPIRED, ('重新登入', '登入逾時', '未登入', 'session 已過期')),
+    (SelectionOutcome.WRONG_CAPTCHA, ('驗證碼',)),
+    (SelectionOutcome.NOT_YET_OPEN, ('尚未開放', '未開放', '非選課時間', '不在選課時間')),
+    (SelectionOutcome.TIME_CONFLICT, ('衝堂', '時間衝突')),
+    (SelectionOutcome.COURSE_FULL, ('額滿', '已滿', '名額不足')),
+]
+
+# JSON 回应中 status 字段的文字取值
+TRUE_STATUSES = ('true', 'ok', 'success', '1')
+FALSE_STATUSES = ('false', 'fail', 'failed', 'error', '0')
+
+
+def _status_result(status):
+    """把 JSON 回应的 status 转为 True/False，无法辨识返回None"""
+    if isinstance(status, bool):
+        return status
+    if isinstance(status, (int, float)):
+        return bool(status)
+    if isinstance(status, str):
+        value = status.strip().lower()
+        if value in TRUE_STATUSES:
+            return True
+        if value in FALSE_STATUSES:
+            return False
+    return None
+
+
+# 可以立即重试的分类（重试前不需退避）；尚未开放要等页面重新载入才会改变，以退避重试
+IMMEDIATE_RETRY = (SelectionOutcome.WRONG_CAPTCHA,)
+
+
+def parse_result_text(text):
+    """
+    解析加选回应内容
+
+    Args:
+        text (str): 回应内容，JSON（{status, msg}）或纯文字
+
+    JSON 回应有 status 字段时以其为准；否则先比对明确的失败分类（衝堂、尚未開放、驗證碼等），
+    再比对一般的失败与成功关键字
+
+    Returns:
+        tuple: (结果, 讯息)；结果为 True/False，无法判断为 None
+    """
+    message = text or ""
+    status = None
+    try:
+        payload = json.loads(message)
+        if isinstance(payload, dict):
+            message = str(payload.get('msg') or payload.get('message') or payload)
+            status = _status_result(payload.get('status'))
+    except ValueError:
+        pass
+    message = message.strip()[:500]
+    if status is not None:
+        return status, message
+    if any(keyword in message for _, keywords in OUTCOME_KEYWORDS for keyword in keywords):
+        return False, message
+    if any(keyword in message for keyword in FAILURE_KEYWORDS):
+        return False, message
+    if any(keyword in message for keyword in SUCCESS_KEYWORDS):
+        return True, message
+    return None, message
+
+
+def classify_result(result, message):
+    """
+    将选课结果与讯息分类
+
+    Args:
+        result (bool): parse_result_text 的结果（True/False/None）
+        message (str): 结果讯息
+
+    Returns:
+        SelectionOutcome: 结果分类
+    """
+    if result is True:
+        return SelectionOutcome.SUCCESS
+    message = message or ""
+    for outcome, keywords in OUTCOME_KEYWORDS:
+        if any(keyword in message for keyword in keywords):
+            return outcome
+    return SelectionOutcome.UNKNOWN
@@ -0,0 +1,192 @@
+"""
+余额监控模块
+长时间轮询课程表格，只比对目标课程的座位与按钮状态，一出现空位立即选课
+"""
+
+import logging
+import re
+import time
+
+from course_table import FETCH_SNAPSHOT_SCRIPT, CourseTable
+from interaction import HumanInputRequired
+from start_scheduler import parse_opening_time
+
+SEATS_PATTERN = re.compile(r"(\d+)\s*/\s*(\d+)")
+
+
+def remaining_seats(seats):
+    """
+    解析座位栏位（'已选/余额'），无法解析返回None
+
+    Args:
+        seats (str): 座位栏位文字，例如 '45/0' 或 '額滿'
+
+    Returns:
+        int: 剩余名额
+    """
+    if not seats:
+        return None
+    if '額滿' in seats:
+        return 0
+    match = SEATS_PATTERN.search(seats)
+    return int(match.group(2)) if match else None
+
+
+class SeatWatcher:
+    """已满课程的余额监控器"""
+
+    def __init__(self, bot, courses, watch_config=None):
+        """
+        初始化监控器
+
+        Args:
+            bot (NCKUCourseBot): 已登入并停在选课页面的机器人
+            courses (list): 要监控的课程
+            watch_config (dict, optional): config.json 中的 watch 区块
+        """
+        self.bot = bot
+        self.courses = list(courses)
+        # 开始监控时配置中的课程；重载后新增的课程也会加入监控
+        self.config_keys = {CourseTable.course_key(course) for course in bot.config.get('courses', [])}
+        self.configure(watch_config)
+        self.previous = {}
+        self.backoff = 0
+        self.polls = 0
+        self.logger = logging.getLogger(__name__)
+
+    def configure(self, watch_config=None):
+        """
+        套用 watch 区块的轮询设定
+
+        Args:
+            watch_config (dict, optional): config.json 中的 watch 区块
+        """
+        watch_config = watch_config or {}
+        self.interval = watch_config.get('interval', 5)
+        self.fast_interval = watch_config.get('fast_interval', 1)
+        self.fast_window = watch_config.get('fast_window_seconds', 120)
+        self.max_backoff = watch_config.get('max_backoff', 60)
+        self.max_duration = watch_config.get('max_duration', 0)
+        self.release_times = [parse_opening_time(value) for value in watch_config.get('release_times', [])]
+
+    def apply_reload(self, results):
+        """
+        设定档重新载入后更新轮询设定与课程（已选上或已从配置移除的课程不再监控）
+
+        Args:
+            results (dict): run 的结果，新增的课程会加入
+        """
+        self.configure(self.bot.config.get('watch'))
+        watched = {CourseTable.course_key(course) for course in self.courses}
+        courses = []
+        for course in self.bot.config.get('courses', []):
+            key = CourseTable.course_key(course)
+            label = f"{course['department_code']}-{course['course_number']}"
+            if results.get(label) or (key not in watched and key in self.config_keys):
+                continue
+            results.setdefault(label, False)
+            courses.append(course)
+        self.courses = courses
+        self.config_keys = {CourseTable.course_key(course) for course in self.bot.config.get('courses', [])}
+        self.logger.info("重新載入設定後監控 %s 門課程，輪詢間隔 %s 秒", len(self.courses), self.interval)
+
+    def next_interval(self):
+        """依是否接近已知释出时间与错误退避计算下一次轮询间隔"""
+        if self.backoff:
+            return self.backoff
+        now = time.time()
+        if any(abs(now - release) <= self.fast_window for release in self.release_times):
+            return self.fast_interval
+        return self.interval
+
+    def _on_error(self, reason):
+        self.backoff = min(self.max_backoff, max(self.interval, self.backoff * 2))
+        self.logger.warning("監控輪詢異常（%s），%s 秒後重試", reason, self.backoff)
+
+    def poll(self):
+        """
+        一次 WebDriver 往返取得最新表格并比对
+
+        Returns:
+            list: 出现空位的课程
+        """
+        self.polls += 1
+        snapshot = self.bot.driver.execute_async_script(FETCH_SNAPSHOT_SCRIPT)
+        if snapshot.get('expired'):
+            self._on_error("session 已過期")
+            self.bot.auto_login()
+            return []
+        if snapshot.get('status') in (429, 503) or not snapshot.get('entries'):
+            self._on_error(f"HTTP {snapshot.get('status')} {snapshot.get('error', '')}".strip())
+            return []
+        self.backoff = 0
+
+        table = CourseTable(snapshot['entries'])
+        opened = []
+        for course in self.courses:
+            entry = table.lookup(course)
+            if entry is None:
+                continue
+            key = CourseTable.course_key(course)
+            state = (entry.get('seats'), entry.get('button_enabled'))
+            if state != self.previous.get(key):
+                self.logger.info("課程狀態變化 %s: %s -> %s", course['course_name'], self.previous.get(key), state)
+                self.previous[key] = state
+                remaining = remaining_seats(entry.get('seats'))
+                if entry.get('button_enabled') and (remaining is None or remaining > 0):
+                    opened.append(course)
+        return opened
+
+    def _select_opened(self, opened, results):
+        """出现空位：重新载入页面取得元素后立即选课"""
+        self.bot.driver.refresh()
+        self.bot.waiter.wait_for_element("//table")
+        self.bot.refresh_course_table()
+        for course in opened:
+            print(f"🔔 發現空位: {course['course_name']}")
+            if self.bot.check_course_exists(course) and self.bot.select_course(course):
+                results[f"{course['department_code']}-{course['course_number']}"] = True
+                self.courses.remove(course)
+            else:
+                # 没抢到：清除记录，下一次轮询重新判断
+                self.previous.pop(CourseTable.course_key(course), None)
+
+    def run(self):
+        """
+        持续监控直到所有课程选上或超过 max_duration
+
+        Returns:
+            dict: 'department_code-course_number' -> 是否成功
+        """
+        results = {f"{c['department_code']}-{c['course_number']}": False for c in self.courses}
+        started = time.monotonic()
+        print(f"👀 開始監控 {len(self.courses)} 門課程的餘額...")
+        while self.courses:
+            if self.max_duration and time.monotonic() - started > self.max_duration:
+                self.logger.info("已達監控時間上限")
+                break
+            # 设定档修改时套用新的课程与轮询间隔，不重新启动浏览器
+            if self.bot.reload_config():
+                self.apply_reload(results)
+                if not self.courses:
+                    break
+            # 看门狗发现 session 过期时先重新登入；轮询与选课期间不让看门狗在背景操作浏览器
+            self.bot.ensure_session()
+            with self.bot.session_guard():
+                opened = []
+                try:
+                    opened = self.poll()
+                    if opened:
+                        self._select_opened(opened, results)
+                except HumanInputRequired:
+                    raise
+                except Exception as e:
+                    # 重新载入或选课失败与轮询失败同样退避；尚未选上的课程下一次轮询重新判断
+                    self._on_error(e)
+                    for course in opened:
+                        if course in self.courses:
+                            self.previous.pop(CourseTable.course_key(course), None)
+
+            time.sleep(self.next_interval())
+        self.logger.info("監控結束：共輪詢 %s 次，耗時 %.0f 秒", self.polls, time.monotonic() - started)
+        return results
@@ -0,0 +1,97 @@
+"""
+登入状态保存模块
+保存已登入浏览器的 cookies，重新启动时直接注入，省去登入流程
+"""
+
+import json
+import logging
+import os
+import time
+
+
+def to_cdp_cookie(cookie):
+    """
+    将 Selenium 格式的 cookie 转为 DevTools Network.setCookies 的格式
+
+    Args:
+        cookie (dict): driver.get_cookies() 中的一项
+
+    Returns:
+        dict: CookieParam
+    """
+    param = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain", ""),
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    if "expiry" in cookie:
+        param["expires"] = cookie["expiry"]
+    if cookie.get("sameSite"):
+        param["sameSite"] = cookie["sameSite"]
+    return param
+
+
+class SessionStore:
+    """cookies 的本地保存与读取"""
+
+    def __init__(self, path="session_cookies.json", max_age=6 * 3600):
+        """
+        初始化保存位置
+
+        Args:
+            path (str): cookies 档案路径
+            max_age (float): 超过此秒数的保存视为过期
+        """
+        self.path = path
+        self.max_age = max_age
+        self.logger = logging.getLogger(__name__)
+
+    def save(self, cookies):
+        """
+        保存 cookies
+
+        Args:
+            cookies (list): driver.get_cookies() 的返回值
+        """
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({"saved_at": time.time(), "cookies": cookies}, f, ensure_ascii=False)
+            # cookies 等同登入凭据，仅限本人读取
+            os.chmod(self.path, 0o600)
+            self.logger.info("已保存 %s 個 cookies 到 %s", len(cookies), self.path)
+        except Exception as e:
+            self.logger.warning("保存登入狀態失敗: %s", e)
+
+    def load(self):
+        """
+        读取仍在有效期内的 cookies
+
+        Returns:
+            list: cookies，没有或已过期返回None
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning("讀取登入狀態失敗: %s", e)
+            return None
+
+        age = time.time() - data.get("saved_at", 0)
+        if age > self.max_age:
+            self.logger.info("保存的登入狀態已超過 %s 秒，不再使用", self.max_age)
+            return None
+        now = time.time()
+        cookies = [c for c in data.get("cookies", []) if c.get("expiry", now + 1) > now]
+        return cookies or None
+
+    def clear(self):
+        """删除保存的 cookies"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,127 @@
+"""
+登入状态看门狗模块
+在等待开放或监控余额期间，以轻量 HTTP 请求定期检查 session，过期时在背景重新登入
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+import requests
+
+
+class SessionWatchdog:
+    """session 过期检测与背景重新登入"""
+
+    def __init__(self, bot, interval=60, timeout=5):
+        """
+        初始化看门狗
+
+        Args:
+            bot (NCKUCourseBot): 已登入的机器人
+            interval (float): 检查间隔（秒）
+            timeout (float): 检查请求的超时（秒）
+        """
+        self.bot = bot
+        self.interval = interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.expired = threading.Event()
+        # 主线程使用浏览器时持有；背景线程只在浏览器闲置时重新登入
+        self.busy = threading.RLock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.checks = 0
+        self.relogins = 0
+        self.logger = logging.getLogger(__name__)
+
+    def sync_cookies(self):
+        """从浏览器复制 cookies 与 User-Agent（需在主线程或持有 busy 时调用）"""
+        self.session.cookies.clear()
+        for cookie in self.bot.driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.session.headers['User-Agent'] = self.bot.driver.execute_script("return navigator.userAgent")
+
+    def check(self):
+        """
+        以一次不跟随重新导向的请求检查 session
+
+        Returns:
+            bool: session 有效返回True，已过期返回False，网络错误返回None
+        """
+        self.checks += 1
+        try:
+            response = self.session.get(self.bot.config['course_selection_url'],
+                                        timeout=self.timeout, allow_redirects=False)
+        except requests.RequestException as e:
+            self.logger.warning("檢查登入狀態失敗: %s", e)
+            return None
+        if response.is_redirect:
+            return 'auth' not in response.headers.get('Location', '')
+        return response.status_code == 200 and 'name="passwd"' not in response.text
+
+    def relogin(self):
+        """
+        重新登入并更新 cookies
+
+        Returns:
+            bool: 是否成功
+        """
+        with self.busy:
+            if not self.expired.is_set():
+                return True
+            self.logger.warning("登入狀態已過期，重新登入...")
+            if not self.bot.auto_login():
+                return False
+            self.sync_cookies()
+            self.relogins += 1
+            self.expired.clear()
+            return True
+
+    def ensure(self):
+        """
+        送出前确认 session（只检查旗标，过期时才重新登入）
+
+        Returns:
+            bool: session 是否可用
+        """
+        if not self.expired.is_set():
+            return True
+        return self.relogin()
+
+    @contextmanager
+    def hold(self):
+        """主线程使用浏览器期间阻止背景重新登入"""
+        with self.busy:
+            yield
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            if self.check() is not False:
+                continue
+            self.expired.set()
+            # 浏览器闲置时立即在背景重新登入，否则留给主线程的 ensure 处理
+            if self.busy.acquire(blocking=False):
+                try:
+                    self.relogin()
+                except Exception as e:
+                    self.logger.error("背景重新登入時發生錯誤: %s", e)
+                finally:
+                    self.busy.release()
+
+    def start(self):
+        """开始背景检查"""
+        self.sync_cookies()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name="session-watchdog", daemon=True)
+        self.thread.start()
+        self.logger.info("登入狀態看門狗已啟動，每 %s 秒檢查一次", self.interval)
+        return self
+
+    def stop(self):
+        """停止背景检查"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.timeout + 1)
+        self.logger.info("看門狗共檢查 %s 次，重新登入 %s 次", self.checks, self.relogins)
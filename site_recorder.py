@@ -0,0 +1,108 @@
+"""
+选课网站录制模块
+在真实选课过程中保存登入页、课程页、选课弹窗、验证码图片与加选回应，供本地替身重放
+"""
+
+import json
+import logging
+import os
+import time
+from selenium.webdriver.common.by import By
+
+from page_waits import CAPTCHA_IMAGE_CSS
+
+MANIFEST_FILE = "manifest.json"
+
+
+def load_recording(directory):
+    """
+    读取录制内容
+
+    Args:
+        directory (str): 录制目录
+
+    Returns:
+        dict: pages（名称 -> HTML）、captchas（[(PNG, 答案)]）、responses（[回应内容]）
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    pages = {}
+    for name, filename in manifest.get("pages", {}).items():
+        with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+            pages[name] = f.read()
+    captchas = []
+    for item in manifest.get("captchas", []):
+        with open(os.path.join(directory, item["file"]), 'rb') as f:
+            captchas.append((f.read(), item.get("answer")))
+    responses = [item["body"] for item in manifest.get("responses", [])]
+    return {"pages": pages, "captchas": captchas, "responses": responses}
+
+
+class SiteRecorder:
+    """选课网站录制器"""
+
+    def __init__(self, directory="recordings"):
+        """
+        初始化录制器
+
+        Args:
+            directory (str): 录制目录
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = {"recorded_at": time.time(), "pages": {}, "captchas": [], "responses": []}
+        self.logger = logging.getLogger(__name__)
+
+    def _save_manifest(self):
+        with open(os.path.join(self.directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+
+    def record_page(self, driver, name):
+        """
+        保存当前页面的 HTML
+
+        Args:
+            driver: Selenium WebDriver实例
+            name (str): 页面名称（login、course、modal）
+        """
+        try:
+            filename = f"{name}.html"
+            with open(os.path.join(self.directory, filename), 'w', encoding='utf-8') as f:
+                f.write(driver.page_source)
+            self.manifest["pages"][name] = filename
+            self._save_manifest()
+            self.logger.info("已錄製頁面 %s", name)
+        except Exception as e:
+            self.logger.warning("錄製頁面 %s 失敗: %s", name, e)
+
+    def record_captcha(self, driver, input_xpath=None, answer=None):
+        """
+        保存当前验证码图片与答案
+
+        Args:
+            driver: Selenium WebDriver实例
+            input_xpath (str, optional): 验证码输入框，未提供 answer 时读取已填入的答案
+            answer (str, optional): 已知的答案（例如识别结果，填入前就能记录）
+        """
+        try:
+            png = driver.find_element(By.CSS_SELECTOR, CAPTCHA_IMAGE_CSS).screenshot_as_png
+            if answer is None and input_xpath:
+                inputs = driver.find_elements(By.XPATH, input_xpath)
+                answer = inputs[0].get_attribute("value") if inputs else None
+            filename = f"captcha_{len(self.manifest['captchas']) + 1:03d}.png"
+            with open(os.path.join(self.directory, filename), 'wb') as f:
+                f.write(png)
+            self.manifest["captchas"].append({"file": filename, "answer": answer})
+            self._save_manifest()
+        except Exception as e:
+            self.logger.warning("錄製驗證碼失敗: %s", e)
+
+    def record_response(self, body):
+        """
+        保存加选回应内容
+
+        Args:
+            body (str): 回应内容
+        """
+        self.manifest["responses"].append({"at": time.time(), "body": body})
+        self._save_manifest()
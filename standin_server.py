@@ -0,0 +1,353 @@
+"""
+本地选课网站替身模块
+模拟成功大学选课系统的登入页、课程页、验证码图片与加选回应，用于离线测试；
+也可以重放 site_recorder 录制的真实页面、验证码与加选回应
+"""
+
+import argparse
+import io
+import json
+import logging
+import secrets
+import struct
+import threading
+import time
+import zlib
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from site_recorder import load_recording
+
+SESSION_COOKIE = "PHPSESSID"
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>登入 - 國立成功大學選課系統</title></head>
+<body>
+<form method="post" action="index.php?c=auth">
+  <input type="text" name="user_id" id="user_id" class="form-control acpwd_input rwd_input1_3" placeholder="學號/識別證號" maxlength="9">
+  <input type="password" name="passwd" id="passwd" class="form-control acpwd_input rwd_input1_3" placeholder="同成功入口">
+  <img src="index.php?c=auth&m=verifycode" alt="captcha">
+  <input type="text" name="code" id="code" maxlength="4">
+  <button type="submit" id="submit_by_acpw" class="btn btn-default">登入</button>
+  <div class="error">{error}</div>
+</form>
+</body></html>
+"""
+
+COURSE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>預排選課 - 國立成功大學選課系統</title>
+<style>.modal {{ display: none; }}</style></head>
+<body>
+<form id="cos_form"><input type="hidden" name="csrf_token" value="{token}"></form>
+<table class="table">
+  <tr><th>系號-序號</th><th>課程名稱</th><th>已選/餘額</th><th>操作</th></tr>
+{rows}
+</table>
+<div class="modal" id="addcourse_modal">
+  <div class="modal-body">
+    <img id="cos_captcha" src="about:blank" alt="captcha">
+    <input type="text" name="cos_qry_confirm_validation_code" id="cos_qry_confirm_validation_code" class="form-control" maxlength="4" placeholder="請輸入驗證碼">
+    <button type="button" class="btn btn-danger addcourse_confirm_save_button">確定</button>
+  </div>
+</div>
+<script>
+var current = null;
+document.querySelectorAll('.select_course_btn').forEach(function (btn) {{
+  btn.addEventListener('click', function () {{
+    current = btn.dataset;
+    document.getElementById('cos_captcha').src = 'index.php?c=cos21322&m=captcha&_=' + Date.now();
+    document.getElementById('addcourse_modal').style.display = 'block';
+  }});
+}});
+document.querySelector('.addcourse_confirm_save_button').addEventListener('click', function () {{
+  var data = new FormData();
+  data.append('csrf_token', document.querySelector('input[name=csrf_token]').value);
+  data.append('dept_no', current.dept_no);
+  data.append('seq_no', current.seq_no);
+  data.append('cos_qry_confirm_validation_code', document.getElementById('cos_qry_confirm_validation_code').value);
+  fetch('index.php?c=cos21322&m=add_course', {{method: 'POST', body: new URLSearchParams(data)}})
+    .then(function (r) {{ return r.json(); }})
+    .then(function (result) {{
+      document.getElementById('addcourse_modal').style.display = 'none';
+      var message = document.createElement('div');
+      message.className = 'alert';
+      message.textContent = result.msg;
+      document.body.appendChild(message);
+    }});
+}});
+</script>
+</body></html>
+"""
+
+COURSE_ROW = """  <tr><td>{dept}-{seq}</td><td>{name}</td><td>{enrolled}/{remaining}</td>
+    <td><button type="button" class="btn btn-primary select_course_btn" data-dept_no="{dept}" data-seq_no="{seq}"{disabled}>選課</button></td></tr>"""
+
+
+def render_captcha_png(text, size=(120, 40)):
+    """
+    产生验证码 PNG 图片（有 Pillow 时绘制文字，否则为空白图片）
+
+    Args:
+        text (str): 验证码文字
+        size (tuple): 图片尺寸
+
+    Returns:
+        bytes: PNG 图片内容
+    """
+    try:
+        from PIL import Image, ImageDraw
+        image = Image.new('RGB', size, 'white')
+        ImageDraw.Draw(image).text((10, 12), text, fill='black')
+        buffered = io.BytesIO()
+        image.save(buffered, format="PNG")
+        return buffered.getvalue()
+    except ImportError:
+        width, height = size
+        raw = b"".join(b"\x00" + b"\xff\xff\xff" * width for _ in range(height))
+
+        def chunk(tag, data):
+            return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+        return (b"\x89PNG\r\n\x1a\n"
+                + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(raw))
+                + chunk(b"IEND", b""))
+
+
+class StandinCourseSite:
+    """本地选课网站替身"""
+
+    def __init__(self, courses=None, captcha_answer="A1B2", username="", password="",
+                 latency=0.0, host="127.0.0.1", port=0, clock_skew=0.0, recording=None):
+        """
+        初始化替身网站
+
+        Args:
+            courses (list, optional): 课程列表（department_code, course_number, course_name, seats）
+            captcha_answer (str): 所有验证码的正确答案
+            username (str): 允许登入的帐号（空字串表示接受任何帐号）
+            password (str): 允许登入的密码
+            latency (float): 每个请求额外的服务器延迟（秒）
+            host (str): 监听地址
+            port (int): 监听端口（0 表示自动分配）
+            clock_skew (float): 服务器时钟相对本机的偏差（秒），反映在 Date 标头
+            recording (str, optional): site_recorder 的录制目录，提供时重放录制的页面与回应
+        """
+        self.captcha_answer = captcha_answer
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.clock_skew = clock_skew
+        self.sessions = set()
+        self.token = secrets.token_hex(8)
+        self.seats = {}
+        self.courses = []
+        self.enrolled = []
+        self.requests = []
+        self.lock = threading.Lock()
+        self.replay = load_recording(recording) if recording else None
+        self.replay_captcha = 0
+        self.replay_response = 0
+        self.expected_answer = captcha_answer
+        for course in courses or [{"department_code": "M1", "course_number": "023",
+                                   "course_name": "射頻振盪器電路設計專論", "seats": 1}]:
+            self.add_course(course)
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.thread = None
+
+    def add_course(self, course):
+        """新增一门课程到课程页"""
+        key = f"{course['department_code']}{course['course_number']}"
+        self.courses.append(course)
+        self.seats[key] = course.get("seats", 1)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def course_url(self):
+        return f"{self.base_url}index.php?c=cos21322"
+
+    def start(self):
+        """在背景线程启动服务器"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logging.info("本地選課替身已啟動: %s", self.course_url)
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def now(self):
+        """服务器时间（包含模拟的时钟偏差）"""
+        return time.time() + self.clock_skew
+
+    def replay_page(self, name):
+        """录制的页面，没有录制时返回None"""
+        return self.replay["pages"].get(name) if self.replay else None
+
+    def next_captcha(self):
+        """
+        下一张验证码图片，并记住其答案
+
+        Returns:
+            bytes: PNG 图片内容
+        """
+        if self.replay and self.replay["captchas"]:
+            with self.lock:
+                png, answer = self.replay["captchas"][self.replay_captcha % len(self.replay["captchas"])]
+                self.replay_captcha += 1
+                self.expected_answer = answer or self.captcha_answer
+            return png
+        return render_captcha_png(self.captcha_answer)
+
+    def captcha_matches(self, value):
+        return (value or "").upper() == self.expected_answer.upper()
+
+    def render_course_page(self):
+        rows = []
+        for course in self.courses:
+            key = f"{course['department_code']}{course['course_number']}"
+            remaining = self.seats[key]
+            rows.append(COURSE_ROW.format(
+                dept=course['department_code'], seq=course['course_number'], name=course['course_name'],
+                enrolled=course.get("enrolled", 0), remaining=remaining,
+                disabled="" if remaining > 0 else " disabled"))
+        return COURSE_PAGE.format(token=self.token, rows="\n".join(rows))
+
+    def add_course_result(self, form):
+        """
+        处理加选请求
+
+        Returns:
+            dict: status 与 msg
+        """
+        # 重放录制的课程页时，页面中的 token 来自真实网站，不做比对
+        if not self.replay_page("course") and form.get("csrf_token") != self.token:
+            return {"status": False, "msg": "錯誤：頁面已過期，請重新整理"}
+        if not self.captcha_matches(form.get("cos_qry_confirm_validation_code")):
+            return {"status": False, "msg": "驗證碼錯誤"}
+        if self.replay and self.replay["responses"]:
+            with self.lock:
+                responses = self.replay["responses"]
+                body = responses[min(self.replay_response, len(responses) - 1)]
+                self.replay_response += 1
+            return body
+        key = f"{form.get('dept_no', '')}{form.get('seq_no', '')}"
+        with self.lock:
+            if key not in self.seats:
+                return {"status": False, "msg": "錯誤：查無此課程"}
+            if self.seats[key] <= 0:
+                return {"status": False, "msg": "加選失敗：課程已額滿"}
+            self.seats[key] -= 1
+            self.enrolled.append(key)
+        return {"status": True, "msg": "加選成功"}
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logging.debug("替身請求: %s", format % args)
+
+            def _session(self):
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                morsel = cookie.get(SESSION_COOKIE)
+                return morsel.value if morsel and morsel.value in site.sessions else None
+
+            def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+                if site.latency:
+                    time.sleep(site.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def date_time_string(self, timestamp=None):
+                return super().date_time_string(site.now() if timestamp is None else timestamp)
+
+            def _redirect(self, location, headers=None):
+                self._send(302, headers=dict(headers or {}, Location=location))
+
+            def _route(self):
+                query = parse_qs(urlparse(self.path).query)
+                site.requests.append((self.command, self.path))
+                return query.get("c", [""])[0], query.get("m", [""])[0]
+
+            def do_GET(self):
+                controller, method = self._route()
+                if method in ("captcha", "verifycode"):
+                    self._send(200, site.next_captcha(), "image/png")
+                elif controller == "auth" or not controller:
+                    page = site.replay_page("login") or LOGIN_PAGE.format(error="")
+                    self._send(200, page.encode("utf-8"))
+                elif controller == "cos21322":
+                    if not self._session():
+                        self._redirect("index.php?c=auth")
+                    else:
+                        page = site.replay_page("course") or site.render_course_page()
+                        self._send(200, page.encode("utf-8"))
+                else:
+                    self._send(404, b"not found")
+
+            def do_HEAD(self):
+                self._route()
+                self._send(200)
+
+            def do_POST(self):
+                controller, method = self._route()
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+                if controller == "auth":
+                    valid_user = not site.username or (form.get("user_id") == site.username
+                                                       and form.get("passwd") == site.password)
+                    if site.replay_page("login"):
+                        # 录制的登入表单字段名称可能不同：任一字段等于验证码答案即视为通过
+                        valid_code = any(site.captcha_matches(value) for value in form.values())
+                    else:
+                        valid_code = site.captcha_matches(form.get("code"))
+                    if valid_user and valid_code:
+                        session_id = secrets.token_hex(16)
+                        site.sessions.add(session_id)
+                        self._redirect("index.php?c=cos21322",
+                                       {"Set-Cookie": f"{SESSION_COOKIE}={session_id}; Path=/"})
+                    else:
+                        self._send(200, LOGIN_PAGE.format(error="登入失敗").encode("utf-8"))
+                elif controller == "cos21322" and method == "add_course":
+                    if not self._session():
+                        self._redirect("index.php?c=auth")
+                    else:
+                        result = site.add_course_result(form)
+                        if not isinstance(result, str):
+                            result = json.dumps(result, ensure_ascii=False)
+                        self._send(200, result.encode("utf-8"), "application/json; charset=utf-8")
+                else:
+                    self._send(404, b"not found")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地選課網站替身")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--captcha", default="A1B2", help="驗證碼正確答案")
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的伺服器延遲（秒）")
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="伺服器時鐘偏差（秒）")
+    parser.add_argument("--recording", help="重放 site_recorder 錄製的目錄")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    site = StandinCourseSite(captcha_answer=args.captcha, latency=args.latency, port=args.port,
+                             clock_skew=args.clock_skew, recording=args.recording).start()
+    print(f"課程頁面: {site.course_url}")
+    try:
+        site.thread.join()
+    except KeyboardInterrupt:
+        site.stop()
@@ -0,0 +1,182 @@
+"""
+精准开始排程模块
+以 HTTP Date 标头与往返时间估算本机与选课服务器的时钟偏差，在服务器时间 T0 准时触发选课
+"""
+
+import logging
+import math
+import statistics
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from log_setup import TIMING
+
+
+def parse_opening_time(value):
+    """
+    解析配置中的开放时间
+
+    Args:
+        value (str): ISO 格式时间，例如 '2026-02-10 09:00:00' 或 '2026-02-10 09:00:00+08:00'（无时区视为本地时间）
+
+    Returns:
+        float: Unix 时间戳
+    """
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ServerClock:
+    """估算选课服务器的时钟偏差（服务器时间 - 本机时间）"""
+
+    def __init__(self, url, samples=8, timeout=5, session=None):
+        """
+        初始化服务器时钟
+
+        Args:
+            url (str): 用于取得 Date 标头的 URL
+            samples (int): 取样次数
+            timeout (float): 单次请求逾时（秒）
+            session (requests.Session, optional): 重用的 HTTP session
+        """
+        self.url = url
+        self.samples = samples
+        self.timeout = timeout
+        if session is None:
+            import requests  # 只有估算时钟时才需要，解析开放时间的模块不必载入
+            session = requests.Session()
+        self.session = session
+        self.offset = 0.0
+        self.jitter = None
+        self.rtts = []
+        self.logger = logging.getLogger(__name__)
+
+    def sample(self):
+        """
+        发出一次请求
+
+        Returns:
+            tuple: (发送时间, 接收时间, 服务器 Date 时间戳)
+        """
+        sent = time.time()
+        response = self.session.head(self.url, timeout=self.timeout, allow_redirects=False)
+        received = time.time()
+        server_time = parsedate_to_datetime(response.headers['Date']).timestamp()
+        return sent, received, server_time
+
+    def estimate(self):
+        """
+        估算时钟偏差
+
+        Date 标头只有秒级精度：服务器在 [sent, received] 之间某一刻的时间落在 [date, date + 1) 内，
+        因此每个样本给出偏差的区间 [date - received, date + 1 - sent]，取所有区间的交集。
+        第一个样本之后，每次都安排在预估的服务器整秒附近发出请求，使区间持续缩小。
+
+        Returns:
+            float: 估算的偏差（秒）
+        """
+        lower, upper = -math.inf, math.inf
+        midpoints = []
+        self.rtts = []
+        for index in range(self.samples):
+            if index > 0 and not math.isinf(lower) and not math.isinf(upper):
+                # 等到预估服务器时间接近整秒时再取样
+                guess = (lower + upper) / 2
+                rtt = statistics.median(self.rtts)
+                now = time.time()
+                target = math.ceil(now + guess + rtt) - guess - rtt / 2
+                time.sleep(max(0.0, target - time.time()))
+            try:
+                sent, received, server_time = self.sample()
+            except Exception as e:
+                self.logger.warning("伺服器時間取樣失敗: %s", e)
+                continue
+            self.rtts.append(received - sent)
+            midpoints.append(server_time + 0.5 - (sent + received) / 2)
+            lower = max(lower, server_time - received)
+            upper = min(upper, server_time + 1 - sent)
+
+        if not midpoints:
+            self.logger.error("無法取得伺服器時間，假設時鐘無偏差")
+            self.offset, self.jitter = 0.0, None
+        elif lower <= upper:
+            self.offset = (lower + upper) / 2
+            self.jitter = (upper - lower) / 2
+        else:
+            # 区间互相矛盾（网络异常），改用往返中点的中位数
+            self.offset = statistics.median(midpoints)
+            self.jitter = statistics.pstdev(midpoints) if len(midpoints) > 1 else 0.5
+        self.logger.info("伺服器時鐘偏差: %+.1f ms, 不確定度 ±%.1f ms, RTT 中位數 %.1f ms (%s/%s 個樣本)",
+                         self.offset * 1000, (self.jitter or 0) * 1000,
+                         statistics.median(self.rtts) * 1000 if self.rtts else 0, len(self.rtts), self.samples)
+        return self.offset
+
+    def server_now(self):
+        """目前的服务器时间（Unix 时间戳）"""
+        return time.time() + self.offset
+
+
+class PrecisionScheduler:
+    """先粗略睡眠，最后数毫秒忙等，在服务器时间 T0 触发"""
+
+    def __init__(self, clock, spin_window=0.02):
+        """
+        初始化排程器
+
+        Args:
+            clock (ServerClock): 已估算偏差的服务器时钟
+            spin_window (float): 最后忙等的时间窗口（秒）
+        """
+        self.clock = clock
+        self.spin_window = spin_window
+        self.logger = logging.getLogger(__name__)
+
+    def sleep_until(self, server_time):
+        """粗略睡眠到服务器时间 server_time 前 spin_window 秒"""
+        while True:
+            remaining = server_time - self.clock.server_now() - self.spin_window
+            if remaining <= 0:
+                return
+            # 长时间等待时分段睡眠，避免系统休眠或时钟调整造成过度延迟
+            time.sleep(min(remaining, 1.0))
+
+    def fire_at(self, server_time, callback, *args, **kwargs):
+        """
+        在服务器时间 server_time 执行 callback
+
+        Args:
+            server_time (float): 服务器时间的 Unix 时间戳
+            callback (callable): 要执行的函数
+
+        Returns:
+            callback 的返回值
+        """
+        remaining = server_time - self.clock.server_now()
+        self.logger.info("將於伺服器時間 %s 觸發（%.1f 秒後）", datetime.fromtimestamp(server_time), remaining)
+        self.sleep_until(server_time)
+
+        # 以 perf_counter 忙等最后几毫秒
+        target = time.perf_counter() + (server_time - self.clock.server_now())
+        while time.perf_counter() < target:
+            pass
+        fire_error = self.clock.server_now() - server_time
+        self.logger.log(TIMING, "已觸發：誤差 %+.2f ms（時鐘偏差 %+.1f ms, 不確定度 ±%.1f ms）",
+                        fire_error * 1000, self.clock.offset * 1000, (self.clock.jitter or 0) * 1000)
+        return callback(*args, **kwargs)
+
+
+if __name__ == "__main__":
+    # 对时钟偏差 +3.4 秒的本地替身进行验证
+    from standin_server import StandinCourseSite
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    site = StandinCourseSite(clock_skew=3.4).start()
+    try:
+        server_clock = ServerClock(site.course_url, samples=10)
+        server_clock.estimate()
+        print(f"實際偏差: +3400.0 ms, 估算偏差: {server_clock.offset * 1000:+.1f} ms ±{server_clock.jitter * 1000:.1f} ms")
+        t0 = math.ceil(site.now()) + 2
+        fired_at = PrecisionScheduler(server_clock).fire_at(t0, site.now)
+        print(f"替身伺服器觸發誤差: {(fired_at - t0) * 1000:+.2f} ms")
+    finally:
+        site.stop()
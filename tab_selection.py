@@ -0,0 +1,273 @@
+"""
+多分页并行选课模块
+在同一个已登入的浏览器中为每门课程开一个分页，WebDriver 指令以锁串行化，验证码识别并行执行
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from selenium.common.exceptions import WebDriverException
+
+from captcha_submit import submit_captcha
+from course_table import CourseTable
+from interaction import HumanInputRequired
+from log_setup import TIMING
+from page_waits import PageWaiter
+from result_parser import SelectionOutcome, classify_result, parse_result_text
+
+
+class TabSelector:
+    """每门课程一个分页的并行选课器"""
+
+    def __init__(self, driver, captcha_solver, course_url, result_timeout=10):
+        """
+        初始化并行选课器
+
+        Args:
+            driver: 已登入的 Selenium WebDriver实例
+            captcha_solver (CaptchaSolver): 验证码识别器
+            course_url (str): 选课页面 URL
+            result_timeout (float): 等待结果讯息的最长时间（秒）
+        """
+        self.driver = driver
+        self.captcha_solver = captcha_solver
+        self.course_url = course_url
+        self.result_timeout = result_timeout
+        self.driver_lock = threading.Lock()
+        self.main_handle = None
+        self.handles = {}
+        self.armed = {}
+        self.timeline = []
+        # 'department_code-course_number' -> 最后一次的结果分类
+        self.outcomes = {}
+        self.logger = logging.getLogger(__name__)
+
+    def _record(self, key, step, started):
+        self.timeline.append({"course": key, "step": step, "at": time.perf_counter() - started})
+
+    def open_tabs(self, courses):
+        """
+        以 window.open 同时开启所有分页（页面并行载入）
+
+        Args:
+            courses (list): 配置中的课程
+        """
+        with self.driver_lock:
+            self.main_handle = self.driver.current_window_handle
+            existing = set(self.driver.window_handles)
+            for _ in courses:
+                self.driver.execute_script("window.open(arguments[0], '_blank');", self.course_url)
+            new_handles = [h for h in self.driver.window_handles if h not in existing]
+            for course, handle in zip(courses, new_handles):
+                self.handles[CourseTable.course_key(course)] = handle
+            self.driver.switch_to.window(self.main_handle)
+        self.logger.info("已開啟 %s 個選課分頁", len(self.handles))
+
+    def close_tabs(self):
+        """关闭所有选课分页并切回原本的分页（可重复调用）"""
+        with self.driver_lock:
+            for handle in self.handles.values():
+                try:
+                    self.driver.switch_to.window(handle)
+                    self.driver.close()
+                except WebDriverException as e:
+                    self.logger.debug("關閉分頁失敗: %s", e)
+            if self.handles and self.main_handle is not None:
+                self.driver.switch_to.window(self.main_handle)
+            self.handles = {}
+            self.armed = {}
+
+    def _arm_tab(self, course, started):
+        """
+        在专属分页中点击选课按钮、识别并填入验证码，停在按下确认之前
+
+        Returns:
+            dict: 已就绪的提交（course、handle、captcha_text），失败返回None
+        """
+        key = CourseTable.course_key(course)
+        handle = self.handles.get(key)
+        if handle is None:
+            return None
+
+        # 阶段1：切换分页、点击选课按钮并截取验证码（需要 WebDriver）
+        with self.driver_lock:
+            self.driver.switch_to.window(handle)
+            waiter = PageWaiter(self.driver)
+            waiter.wait_for_element("//table")
+            entry = CourseTable.snapshot(self.driver).lookup(course)
+            if entry is None or entry.get('button') is None or not entry.get('button_enabled'):
+                self.logger.warning("分頁中找不到可用的選課按鈕: %s", course['course_name'])
+                return None
+            entry['button'].click()
+            waiter.wait_for_modal()
+            waiter.wait_for_captcha_image(timeout=5)
+            captcha_image = self.captcha_solver.capture_captcha_image(self.driver)
+        self._record(key, "captcha_captured", started)
+        if captcha_image is None:
+            return None
+
+        # 阶段2：识别验证码（不需要 WebDriver，各课程并行）
+        captcha_text = self.captcha_solver.solve_captcha(captcha_image)
+        self._record(key, "captcha_solved", started)
+        if not captcha_text:
+            self.logger.warning("驗證碼識別失敗: %s", course['course_name'])
+            return None
+
+        # 阶段3：填入验证码（需要 WebDriver，一次脚本呼叫）
+        with self.driver_lock:
+            self.driver.switch_to.window(handle)
+            filled = submit_captcha(self.driver, captcha_text, self.captcha_solver.submit_mode, button_xpaths=())
+            if not filled["filled"]:
+                self.logger.error("找不到驗證碼輸入框: %s", course['course_name'])
+                return None
+        self._record(key, "armed", started)
+        return {"course": course, "key": key, "handle": handle, "captcha_text": captcha_text}
+
+    def _confirm_tab(self, armed, started):
+        """
+        按下确认并等待结果讯息
+
+        Returns:
+            str: 结果讯息，无法取得返回None；找不到确认按钮返回False
+        """
+        key, handle = armed["key"], armed["handle"]
+        with self.driver_lock:
+            self.driver.switch_to.window(handle)
+            waiter = PageWaiter(self.driver)
+            waiter.arm_result_observer()
+            submitted = submit_captcha(self.driver, None, self.captcha_solver.submit_mode)
+            if not submitted["clicked"]:
+                self.logger.error("找不到確認按鈕: %s", armed['course']['course_name'])
+                return False
+        self._record(key, "confirmed", started)
+
+        # 阶段4：短暂持锁轮询结果，让其他分页的指令可以穿插执行
+        deadline = time.monotonic() + self.result_timeout
+        message = None
+        while message is None and time.monotonic() < deadline:
+            with self.driver_lock:
+                self.driver.switch_to.window(handle)
+                message = self.driver.execute_script("return window.__nckuResult")
+            if message is None:
+                time.sleep(waiter.poll_interval)
+        self._record(key, "result", started)
+        return message
+
+    def _judge(self, course, message):
+        """以 result_parser 判断结果讯息；没有讯息（逾时或找不到确认按钮）视为未选上"""
+        label = f"{course['department_code']}-{course['course_number']}"
+        if not message:
+            self.outcomes[label] = SelectionOutcome.UNKNOWN
+            if message is None:
+                self.logger.warning("等待結果逾時，視為未選上: %s", course['course_name'])
+            return False
+        result, message = parse_result_text(message)
+        self.outcomes[label] = classify_result(result, message)
+        self.logger.info("分頁選課結果 %s: %s (%s)", course['course_name'], message, self.outcomes[label].value)
+        return result is True
+
+    def _select_in_tab(self, course, started):
+        """在专属分页中完成一门课程的选课"""
+        armed = self._arm_tab(course, started)
+        if armed is None:
+            return False
+        return self._judge(course, self._confirm_tab(armed, started))
+
+    def prearm(self, courses):
+        """
+        开放前为每门课程开启分页、识别并填入验证码，只保留确认动作
+
+        Args:
+            courses (list): 配置中的课程
+
+        Returns:
+            int: 成功预备的课程数
+        """
+        started = time.perf_counter()
+        self.open_tabs(courses)
+        self.armed = {}
+        with ThreadPoolExecutor(max_workers=len(courses)) as executor:
+            futures = [executor.submit(self._arm_tab, course, started) for course in courses]
+            for future in futures:
+                try:
+                    armed = future.result()
+                except HumanInputRequired:
+                    raise
+                except Exception as e:
+                    self.logger.error("預備提交時發生錯誤: %s", e)
+                    armed = None
+                if armed is not None:
+                    self.armed[armed["key"]] = armed
+        self.logger.info("已預備 %s/%s 門課程，等待開放時間", len(self.armed), len(courses))
+        return len(self.armed)
+
+    def _fire_one(self, course, started):
+        """送出预备好的确认；验证码过期或未能预备时立即改走完整流程"""
+        key = CourseTable.course_key(course)
+        armed = self.armed.get(key)
+        if armed is not None:
+            message = self._confirm_tab(armed, started)
+            if not (isinstance(message, str)
+                    and classify_result(False, message) is SelectionOutcome.WRONG_CAPTCHA):
+                return self._judge(course, message)
+            self.logger.warning("預備的驗證碼被拒絕（%s），立即重新選課: %s", message, course['course_name'])
+        else:
+            self.logger.info("課程未預備，開放後執行完整流程: %s", course['course_name'])
+            with self.driver_lock:
+                self.driver.switch_to.window(self.handles[key])
+                self.driver.refresh()
+        return self._select_in_tab(course, started)
+
+    def fire_armed(self, courses):
+        """
+        在开放时间送出所有预备好的确认
+
+        Args:
+            courses (list): 配置中的课程
+
+        Returns:
+            dict: 'department_code-course_number' -> 是否成功
+        """
+        started = time.perf_counter()
+        try:
+            results = self._run_all(self._fire_one, courses, started)
+        finally:
+            self.close_tabs()
+        self.logger.log(TIMING, "預備提交完成，總耗時 %.3f 秒", time.perf_counter() - started)
+        return results
+
+    def _run_all(self, worker, courses, started):
+        """以每门课程一个线程执行 worker 并收集结果"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(courses)) as executor:
+            futures = {executor.submit(worker, course, started): course for course in courses}
+            for future, course in futures.items():
+                label = f"{course['department_code']}-{course['course_number']}"
+                try:
+                    results[label] = bool(future.result())
+                except HumanInputRequired:
+                    raise
+                except Exception as e:
+                    self.logger.error("分頁選課 %s 時發生錯誤: %s", course['course_name'], e)
+                    results[label] = False
+        return results
+
+    def select_all(self, courses):
+        """
+        并行对所有课程执行选课
+
+        Args:
+            courses (list): 配置中的课程
+
+        Returns:
+            dict: 'department_code-course_number' -> 是否成功
+        """
+        started = time.perf_counter()
+        self.open_tabs(courses)
+        try:
+            results = self._run_all(self._select_in_tab, courses, started)
+        finally:
+            self.close_tabs()
+        self.logger.log(TIMING, "所有課程皆已嘗試，總耗時 %.2f 秒", time.perf_counter() - started)
+        return results
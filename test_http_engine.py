@@ -0,0 +1,93 @@
+"""
+HTTP 选课引擎测试
+对本地替身网站执行 prepare -> fetch_captcha -> submit -> parse_result_text，
+并检查 session 失效或回应非预期时返回 None（由调用方改走浏览器流程）
+
+执行: python test_http_engine.py
+"""
+
+import unittest
+
+import requests
+
+from http_engine import HttpCourseEngine
+from result_parser import SelectionOutcome
+from standin_server import StandinCourseSite
+
+
+class _FixedAnswerSolver:
+    """总是返回同一个答案的验证码识别器"""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def solve_captcha(self, image, max_retries=3):
+        self.calls += 1
+        return self.answer
+
+
+class HttpCourseEngineTest(unittest.TestCase):
+    """已登入的引擎对替身网站加选"""
+
+    def setUp(self):
+        self.site = StandinCourseSite(courses=[
+            {"department_code": "M1", "course_number": "023", "course_name": "射頻振盪器電路設計專論", "seats": 1},
+            {"department_code": "M1", "course_number": "024", "course_name": "微波工程", "seats": 1},
+        ]).start()
+        self.addCleanup(self.site.stop)
+        login = requests.post(f"{self.site.base_url}index.php?c=auth", data={"code": self.site.captcha_answer},
+                              allow_redirects=False)
+        self.engine = HttpCourseEngine({"course_selection_url": self.site.course_url})
+        self.engine.session.cookies.update(login.cookies)
+        self.solver = _FixedAnswerSolver(self.site.captcha_answer)
+
+    def test_steps(self):
+        self.assertTrue(self.engine.prepare())
+        self.assertEqual(self.engine.base_fields.get("csrf_token"), self.site.token)
+        self.assertIsNotNone(self.engine.fetch_captcha())
+        result, message = self.engine.submit({"department_code": "M1", "course_number": "023"},
+                                             self.site.captcha_answer)
+        self.assertIs(result, True)
+        self.assertEqual(message, "加選成功")
+        self.assertEqual(self.engine.base_fields, {}, "送出後沒有清除舊的表單字段")
+
+    def test_select_then_full(self):
+        course = {"department_code": "M1", "course_number": "023"}
+        self.assertIs(self.engine.select_course(course, self.solver), True)
+        self.assertIs(self.engine.last_outcome, SelectionOutcome.SUCCESS)
+        self.assertIs(self.engine.select_course(course, self.solver), False)
+        self.assertIs(self.engine.last_outcome, SelectionOutcome.COURSE_FULL)
+        self.assertEqual(self.site.enrolled, ["M1023"])
+
+    def test_rotated_token(self):
+        self.assertIs(self.engine.select_course({"department_code": "M1", "course_number": "023"}, self.solver), True)
+        self.site.token = "rotated"
+        self.assertIs(self.engine.select_course({"department_code": "M1", "course_number": "024"}, self.solver), True)
+        self.assertEqual(self.site.enrolled, ["M1023", "M1024"])
+
+    def test_wrong_captcha(self):
+        solver = _FixedAnswerSolver("ZZZZ")
+        self.assertIsNone(self.engine.select_course({"department_code": "M1", "course_number": "023"}, solver))
+        self.assertIs(self.engine.last_outcome, SelectionOutcome.WRONG_CAPTCHA)
+        self.assertEqual(solver.calls, self.engine.captcha_retries)
+        self.assertEqual(self.site.enrolled, [])
+
+    def test_expired_session(self):
+        self.engine.session.cookies.clear()
+        self.assertIsNone(self.engine.select_course({"department_code": "M1", "course_number": "023"}, self.solver))
+        self.assertEqual(self.solver.calls, 0)
+
+    def test_redirect_on_submit(self):
+        self.assertTrue(self.engine.prepare())
+        self.site.sessions.clear()
+        result, message = self.engine.submit({"department_code": "M1", "course_number": "023"},
+                                             self.site.captcha_answer)
+        self.assertIsNone(result)
+        self.assertEqual(message, "HTTP 302")
+        self.assertEqual(self.engine.base_fields, {})
+        self.assertIsNone(self.engine.select_course({"department_code": "M1", "course_number": "023"}, self.solver))
+
+
+if __name__ == "__main__":
+    unittest.main()
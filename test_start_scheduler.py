@@ -0,0 +1,47 @@
+"""
+精准开始排程测试
+对时钟偏差已知的本地替身网站估算偏差并准时触发，检查误差落在估算回报的不确定度内
+
+执行: python test_start_scheduler.py
+"""
+
+import math
+import unittest
+
+from standin_server import StandinCourseSite
+from start_scheduler import PrecisionScheduler, ServerClock
+
+# 忙等结束到回调读取时间之间的执行耗时（秒），不属于时钟估算的误差
+SCHEDULING_SLACK = 0.005
+
+
+class ServerClockSkewTest(unittest.TestCase):
+    """替身网站的 Date 标头带有已知偏差"""
+
+    def check_skew(self, skew):
+        site = StandinCourseSite(clock_skew=skew).start()
+        try:
+            clock = ServerClock(site.course_url, samples=6)
+            clock.estimate()
+            self.assertIsNotNone(clock.jitter, "沒有取得任何樣本")
+            self.assertLess(clock.jitter, 0.5, "不確定度沒有隨取樣縮小")
+            self.assertLessEqual(abs(clock.offset - skew), clock.jitter,
+                                 f"估算偏差 {clock.offset:+.4f} 秒超出不確定度 ±{clock.jitter:.4f} 秒")
+
+            t0 = math.ceil(site.now()) + 1
+            fired_at = PrecisionScheduler(clock).fire_at(t0, site.now)
+            self.assertLessEqual(abs(fired_at - t0), clock.jitter + SCHEDULING_SLACK,
+                                 f"觸發誤差 {(fired_at - t0) * 1000:+.2f} ms 超出不確定度 "
+                                 f"±{clock.jitter * 1000:.2f} ms")
+        finally:
+            site.stop()
+
+    def test_server_ahead(self):
+        self.check_skew(3.4)
+
+    def test_server_behind(self):
+        self.check_skew(-1.75)
+
+
+if __name__ == "__main__":
+    unittest.main()